@@ -1,24 +1,58 @@
 __all__ = [
     "Layer",
     "Raster",
+    "GridSpec",
     "composite",
     "index",
+    "index_batch",
     "slope",
     "aspect",
+    "terrain",
     "height",
     "distance",
+    "distance_tiled",
+    "reclassify",
     "fuel",
+    "fuel_sweep",
+    "fuel_tiled",
+    "iter_fuel_sweep",
+    "run_tiled",
+    "defer",
+    "compute",
+    "enable_cache",
+    "disable_cache",
+    "enable_disk_cache",
+    "disable_disk_cache",
+    "set_precision",
+    "get_precision",
     "gui",
 ]
 
 from rforge.library.containers.layer import Layer
 from rforge.library.containers.raster import Raster
+from rforge.library.containers.grid import GridSpec
 
 from rforge.library.processes.composite import composite
-from rforge.library.processes.index import index
-from rforge.library.processes.topography import slope, aspect
+from rforge.library.processes.index import index, index_batch
+from rforge.library.processes.topography import slope, aspect, terrain
 from rforge.library.processes.height import height
-from rforge.library.processes.distance import distance
-from rforge.library.processes.fuel import fuel
+from rforge.library.processes.distance import distance, distance_tiled
+from rforge.library.processes.reclassify import reclassify
+from rforge.library.processes.fuel import (
+    fuel,
+    fuel_sweep,
+    fuel_tiled,
+    iter_fuel_sweep,
+)
+
+from rforge.library.tools.tiling import run_tiled
+from rforge.library.tools.lazy import defer, compute
+from rforge.library.tools.cache import (
+    enable_cache,
+    disable_cache,
+    enable_disk_cache,
+    disable_disk_cache,
+)
+from rforge.library.tools.precision import set_precision, get_precision
 
 from rforge.gui.gui import gui
@@ -9,7 +9,7 @@ from rforge.gui.data import _data
 
 def _save_as_layer():
     if _data.viewer is not None and _data.raster is not None:
-        _data.raster.add_layer(_data.viewer, "Layer")
+        _data.raster.add_layer(_data.viewer.copy(), "Layer")
     _data.raster_changed.emit()
 
 
@@ -19,7 +19,6 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QWidget,
 )
-from rasterio.transform import from_origin
 from rforge.gui.common.layer_information import _LayerInfoWindow
 from rforge.gui.data import _data
 
@@ -228,15 +227,8 @@ class _ViewerPanel(QWidget):
                     self.pixel_coordinates_y.setText(f"{int(pos_in_original.y())}")
 
                     if _data.viewer.transform is not None:
-                        transform = from_origin(
-                            _data.viewer.transform[0],
-                            _data.viewer.transform[3],
-                            _data.viewer.transform[1],
-                            _data.viewer.transform[5],
-                        )
-                        pos_transformed = transform * (
-                            pos_in_scene.x(),
-                            pos_in_scene.y(),
+                        pos_transformed = _data.viewer.pixel_to_world(
+                            pos_in_original.y(), pos_in_original.x(), center=False
                         )
 
                         self.lat_coordinates_label.setText(f"{pos_transformed[0]}")
@@ -0,0 +1,303 @@
+import numbers
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from rforge.library.tools.exceptions import Errors
+
+
+class GridSpec:
+    """Represents the pixel grid shared by co-registered layers.
+
+    A grid is defined by its shape, its affine transformation parameters and its
+    coordinate reference system (CRS). Instances are immutable, hashable and interned:
+    building a GridSpec with the same definition as an existing one returns the existing
+    object, so layers on the same grid share a single instance and alignment checks
+    reduce to identity comparisons.
+
+    Attributes:
+        _shape (Tuple[int, int]): Number of rows and columns of the grid.
+        _transform (Optional[Tuple[float, float, float, float, float, float]]): Affine
+            transformation parameters.
+        _crs (Optional[str]): The coordinate reference system (CRS) of the grid.
+
+    Methods:
+        __new__: Returns the interned GridSpec instance for the given definition.
+        __eq__: Checks equality between two GridSpec instances.
+        __hash__: Returns the hash of the grid definition.
+        shape: Getter for the grid shape.
+        height: Getter for the number of rows.
+        width: Getter for the number of columns.
+        transform: Getter for the affine transformation parameters.
+        crs: Getter for the CRS.
+        resolution: Computes the resolution of the grid.
+        bounds: Computes the spatial bounds of the grid.
+        aligned: Checks whether another grid is co-registered with this one.
+        window: Derives the sub-grid covering a window of this grid.
+        world_to_pixel: Converts batches of world coordinates to pixel indices.
+        pixel_to_world: Converts batches of pixel indices to world coordinates.
+    """
+
+    __slots__ = ("_shape", "_transform", "_crs", "_hash", "__weakref__")
+
+    _instances: "weakref.WeakValueDictionary[tuple, GridSpec]" = (
+        weakref.WeakValueDictionary()
+    )
+    _lock = threading.Lock()
+
+    def __new__(
+        cls,
+        shape: Tuple[int, int],
+        transform: Optional[Tuple[float, float, float, float, float, float]] = None,
+        crs: Optional[str] = None,
+    ):
+        if not (
+            isinstance(shape, tuple)
+            and len(shape) == 2
+            and all(
+                isinstance(value, numbers.Integral) and value >= 0 for value in shape
+            )
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name="shape", expected_type="a tuple of two non-negative integers"
+                )
+            )
+        if transform is not None and not (
+            isinstance(transform, tuple)
+            and len(transform) == 6
+            and all(isinstance(value, (int, float)) for value in transform)
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name="transform", expected_type="a tuple of six floats"
+                )
+            )
+        if crs is not None and not isinstance(crs, str):
+            raise TypeError(Errors.bad_input(name="crs", expected_type="a string"))
+
+        shape = (int(shape[0]), int(shape[1]))
+        if transform is not None:
+            transform = tuple(float(value) for value in transform)
+        key = (shape, transform, crs)
+
+        with cls._lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = super().__new__(cls)
+                object.__setattr__(instance, "_shape", shape)
+                object.__setattr__(instance, "_transform", transform)
+                object.__setattr__(instance, "_crs", crs)
+                object.__setattr__(instance, "_hash", hash(key))
+                cls._instances[key] = instance
+        return instance
+
+    def __setattr__(self, name, value):
+        raise AttributeError("GridSpec instances are immutable.")
+
+    def __reduce__(self):
+        return GridSpec, (self._shape, self._transform, self._crs)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, GridSpec):
+            return (
+                self._shape == other.shape
+                and self._transform == other.transform
+                and self._crs == other.crs
+            )
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return (
+            f"GridSpec(shape={self._shape}, transform={self._transform}, "
+            f"crs={self._crs!r})"
+        )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    @property
+    def height(self) -> int:
+        return self._shape[0]
+
+    @property
+    def width(self) -> int:
+        return self._shape[1]
+
+    @property
+    def transform(self) -> Optional[Tuple[float, float, float, float, float, float]]:
+        return self._transform
+
+    @property
+    def crs(self) -> Optional[str]:
+        return self._crs
+
+    @property
+    def resolution(self) -> float:
+        if self._transform is not None:
+            return self._transform[1]
+        else:
+            return 0
+
+    @property
+    def bounds(self) -> Optional[Dict[str, float]]:
+        if self._transform is None:
+            return None
+
+        x_origin, x_col, x_row, y_origin, y_col, y_row = self._transform
+        corners = [(0, 0), (0, self.width), (self.height, 0), (self.height, self.width)]
+        xs = [x_origin + x_col * col + x_row * row for row, col in corners]
+        ys = [y_origin + y_col * col + y_row * row for row, col in corners]
+
+        return {"left": min(xs), "bottom": min(ys), "right": max(xs), "top": max(ys)}
+
+    def aligned(self, other: "GridSpec") -> bool:
+        """Check whether another grid is co-registered with this one.
+
+        Grids without georeferencing only need to match in shape. When both grids are
+        georeferenced, their transforms and CRS must also match.
+
+        Args:
+          other:
+            Grid to compare against.
+
+        Returns:
+          True if both grids cover the same pixels.
+        """
+        if self is other:
+            return True
+        if self._shape != other.shape:
+            return False
+        if self._transform is not None and other.transform is not None:
+            if self._transform != other.transform:
+                return False
+        if self._crs is not None and other.crs is not None:
+            if self._crs != other.crs:
+                return False
+        return True
+
+    def window(self, row_off: int, col_off: int, height: int, width: int) -> "GridSpec":
+        """Derive the sub-grid covering a window of this grid.
+
+        Args:
+          row_off:
+            Index of the first row of the window.
+          col_off:
+            Index of the first column of the window.
+          height:
+            Number of rows of the window.
+          width:
+            Number of columns of the window.
+
+        Returns:
+          Grid of the window, with its transform origin moved to the window corner.
+
+        Raises:
+          TypeError:
+            If the window does not fit inside the grid.
+        """
+        if not (
+            0 <= row_off
+            and 0 <= col_off
+            and 0 < height
+            and 0 < width
+            and row_off + height <= self.height
+            and col_off + width <= self.width
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name="window", expected_type="a region inside the grid"
+                )
+            )
+
+        transform = self._transform
+        if transform is not None:
+            x_origin, x_col, x_row, y_origin, y_col, y_row = transform
+            transform = (
+                x_origin + x_col * col_off + x_row * row_off,
+                x_col,
+                x_row,
+                y_origin + y_col * col_off + y_row * row_off,
+                y_col,
+                y_row,
+            )
+
+        return GridSpec((height, width), transform, self._crs)
+
+    def world_to_pixel(
+        self, xs: np.ndarray, ys: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert batches of world coordinates to the indices of their pixels.
+
+        Args:
+          xs:
+            Array-like of X world coordinates.
+          ys:
+            Array-like of Y world coordinates, with the same shape as xs.
+
+        Returns:
+          Tuple with the arrays of row and column indices. Points outside the grid yield
+          indices outside the valid range.
+
+        Raises:
+          TypeError:
+            If the grid has no transform.
+        """
+        x_origin, x_col, x_row, y_origin, y_col, y_row = self._affine()
+        dx = np.asarray(xs, dtype=np.float64) - x_origin
+        dy = np.asarray(ys, dtype=np.float64) - y_origin
+
+        determinant = x_col * y_row - x_row * y_col
+        cols = np.floor((y_row * dx - x_row * dy) / determinant).astype(np.int64)
+        rows = np.floor((x_col * dy - y_col * dx) / determinant).astype(np.int64)
+
+        return rows, cols
+
+    def pixel_to_world(
+        self, rows: np.ndarray, cols: np.ndarray, center: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert batches of pixel indices to world coordinates.
+
+        Args:
+          rows:
+            Array-like of row indices (or fractional row positions).
+          cols:
+            Array-like of column indices (or fractional column positions).
+          center:
+            If True, returns the coordinates of the pixel centers. Otherwise, the
+            positions are transformed as given. Defaults to True.
+
+        Returns:
+          Tuple with the arrays of X and Y world coordinates.
+
+        Raises:
+          TypeError:
+            If the grid has no transform.
+        """
+        x_origin, x_col, x_row, y_origin, y_col, y_row = self._affine()
+        rows = np.asarray(rows, dtype=np.float64)
+        cols = np.asarray(cols, dtype=np.float64)
+        if center:
+            rows = rows + 0.5
+            cols = cols + 0.5
+
+        xs = x_origin + x_col * cols + x_row * rows
+        ys = y_origin + y_col * cols + y_row * rows
+
+        return xs, ys
+
+    def _affine(self) -> Tuple[float, float, float, float, float, float]:
+        if self._transform is None:
+            raise TypeError(
+                Errors.bad_input(
+                    name="transform", expected_type="defined to convert coordinates"
+                )
+            )
+        return self._transform
@@ -1,8 +1,10 @@
 import os
+import weakref
 from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import rasterio
+from rforge.library.containers.grid import GridSpec
 from rforge.library.tools.exceptions import Errors
 from rforge.library.tools.rescale_dataset import rescale_dataset
 
@@ -19,26 +21,50 @@ ERROR_MESSAGES = {
     "no_data": "ERROR: 'no_data' argument is {no_data_type}, but it must be an integer or float.",
     "transform": "ERROR: 'transform' argument is {transform_type}, but it must be a tuple of six floats.",
     "units": "ERROR: 'units' argument is {units_type}, but it must be a string.",
+    "mask": (
+        "ERROR: 'mask' argument is {mask_type}, but it must be a boolean or uint8 NumPy"
+        " array with the rows and columns of the layer."
+    ),
 }
 
 
 class Layer:
     """Represents a data layer in a geospatial dataset.
 
+    Layers duplicated with copy share their data until one of them is changed. The
+    duplicate holds a read-only view of the data and is changed through modify, which
+    copies it first. The original stays writable: the first time its array is accessed
+    while a duplicate still shares the data, it moves to a copy of its own, so later
+    writes through the array never reach the duplicates.
+
     Attributes:
         _array (Optional[np.ndarray[np.int32]]): The array data of the layer.
         _bounds (Optional[Dict[str, float]]): The spatial bounds of the layer.
         _crs (Optional[str]): The coordinate reference system (CRS) of the layer.
         _driver (Optional[str]): The driver used for data storage.
-        _no_data (Optional[Union[int, float]]): The value representing no data in the layer.
-        _transform (Optional[Tuple[float, float, float, float, float, float]]): Affine transformation parameters.
+        _no_data (Optional[Union[int, float]]): The value representing no data in the
+            layer.
+        _transform (Optional[Tuple[float, float, float, float, float, float]]): Affine
+            transformation parameters.
         _units (Optional[str]): The units of the layer data.
+        _mask (Optional[np.ndarray[Union[np.bool_, np.uint8]]]): Read-only view of the
+            validity mask or alpha band of the layer, stored apart from the data and
+            shared by reference.
+        _grid (Optional[GridSpec]): Grid specification of the layer, kept up to date by
+            the array, transform and crs setters.
+        _sharing (Optional[List[weakref.ref]]): Weak references to the layers sharing
+            the array of the layer through copy, including the layer itself.
 
     Methods:
         __init__: Initializes a Layer instance.
-        __eq__: Checks equality between two Layer instances or a Layer and a numpy array.
+        __eq__: Checks equality between two Layer instances or a Layer and a numpy
+            array.
         __str__: Returns a string representation of the layer attributes.
         import_layer: Imports layer data from a file.
+        copy: Creates a copy-on-write duplicate of the layer.
+        modify: Returns the layer array for in-place changes, copying it first if
+            shared.
+        window: Creates a read-only layer view of a window of the layer.
         array: Getter and setter for the layer array data.
         bounds: Getter and setter for the spatial bounds.
         crs: Getter and setter for the CRS.
@@ -46,6 +72,13 @@ class Layer:
         no_data: Getter and setter for the no_data value.
         transform: Getter and setter for the affine transformation parameters.
         units: Getter and setter for the units.
+        mask: Getter and setter for the validity mask or alpha band.
+        stack_mask: Returns the array with the mask appended as its last band, for
+            export.
+        grid: Getter for the shared grid specification of the layer.
+        world_to_pixel: Converts batches of world coordinates to pixel indices.
+        pixel_to_world: Converts batches of pixel indices to world coordinates.
+        sample: Gathers the layer values at batches of world coordinates.
         resolution: Computes the resolution of the layer.
         width: Computes the width of the layer.
         height: Computes the height of the layer.
@@ -65,6 +98,9 @@ class Layer:
     _no_data: Optional[Union[int, float]] = None
     _transform: Optional[Tuple[float, float, float, float, float, float]] = None
     _units: Optional[str] = None
+    _mask: Optional[np.ndarray[Union[np.bool_, np.uint8]]] = None
+    _grid: Optional[GridSpec] = None
+    _sharing: Optional[List[weakref.ref]] = None
 
     def __init__(
         self,
@@ -75,6 +111,8 @@ class Layer:
         no_data: Optional[Union[int, float]] = None,
         transform: Optional[Tuple[float, float, float, float, float, float]] = None,
         units: Optional[str] = None,
+        mask: Optional[np.ndarray[Union[np.bool_, np.uint8]]] = None,
+        grid: Optional[GridSpec] = None,
     ):
         if array is not None and not (
             isinstance(array, np.ndarray) and np.issubdtype(array.dtype, np.number)
@@ -126,6 +164,23 @@ class Layer:
         if units is not None and not isinstance(units, str):
             raise TypeError(ERROR_MESSAGES["units"].format(units_type=type(units)))
 
+        _check_mask(mask, array)
+
+        if grid is not None and not (
+            isinstance(grid, GridSpec)
+            and array is not None
+            and grid.shape == array.shape[:2]
+            and grid.transform == transform
+            and grid.crs == crs
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name="grid",
+                    provided_type=type(grid),
+                    expected_type="the grid of the array, transform and crs",
+                )
+            )
+
         self._array = array
         self._bounds = bounds
         self._crs = crs
@@ -133,6 +188,12 @@ class Layer:
         self._no_data = no_data
         self._transform = transform
         self._units = units
+        if mask is not None:
+            self._mask = _read_only_mask(mask)
+        if grid is None:
+            self._update_grid()
+        else:
+            self._grid = grid
 
     def __eq__(self, other):
         if isinstance(other, Layer):
@@ -144,6 +205,7 @@ class Layer:
                 and self._no_data == other.no_data
                 and self._transform == other.transform
                 and self._units == other.units
+                and _same_mask(self._mask, other.mask)
             )
         elif isinstance(other, np.ndarray):
             return (
@@ -218,8 +280,134 @@ class Layer:
             self.transform = transform
             self.units = units
 
+    def copy(self) -> "Layer":
+        """
+        Create a copy-on-write duplicate of the layer.
+
+        The duplicate holds a read-only view of the data and is changed through modify.
+        The original layer stays writable.
+
+        Returns:
+          The duplicate layer.
+        """
+        duplicate = Layer(
+            array=None if self._array is None else _read_only(self._array),
+            bounds=None if self._bounds is None else dict(self._bounds),
+            crs=self._crs,
+            driver=self._driver,
+            no_data=self._no_data,
+            transform=self._transform,
+            units=self._units,
+            mask=self._mask,
+            grid=self.grid,
+        )
+
+        # Layers Sharing the Buffer Are Tracked Without Keeping Them Alive
+        if self._array is not None:
+            if self._sharing is None:
+                self._sharing = [weakref.ref(self)]
+            self._sharing.append(weakref.ref(duplicate))
+            duplicate._sharing = self._sharing
+        return duplicate
+
+    def modify(self) -> Optional[np.ndarray[np.int32]]:
+        """
+        Get the layer array for in-place changes, copying it first if it is shared.
+
+        The array is copied when other layers share it through copy, or when it is a
+        read-only view.
+
+        Returns:
+          The writable layer array.
+        """
+        if self._array is not None and (
+            self._release() or not self._array.flags.writeable
+        ):
+            self._array = self._array.copy()
+        return self._array
+
+    def _release(self) -> bool:
+        # Leave the Layers Sharing the Buffer, Reporting Whether Any Remain
+        if self._sharing is None:
+            return False
+        self._sharing[:] = [
+            reference
+            for reference in self._sharing
+            if reference() is not None and reference() is not self
+        ]
+        shared = len(self._sharing) > 0
+        self._sharing = None
+        return shared
+
+    def __getstate__(self) -> dict:
+        # The Grid Is Rebuilt on Access and Sharing Only Holds Within a Process
+        state = self.__dict__
+        if "_grid" not in state and "_sharing" not in state:
+            return state
+        return {
+            key: value
+            for key, value in state.items()
+            if key not in ("_grid", "_sharing")
+        }
+
+    def _update_grid(self):
+        # Interned Grid of the Layer, or None Without a Two-Dimensional Array
+        if self._array is not None and len(self._array.shape) >= 2:
+            self._grid = GridSpec(self._array.shape[:2], self._transform, self._crs)
+        else:
+            self._grid = None
+
+    def window(self, row_off: int, col_off: int, height: int, width: int) -> "Layer":
+        if self._array is None:
+            raise TypeError(
+                Errors.bad_input(name="layer", expected_type="a layer with array data")
+            )
+        grid = self.grid.window(row_off, col_off, height, width)
+
+        return Layer(
+            array=_read_only(
+                self._array[row_off : row_off + height, col_off : col_off + width]
+            ),
+            bounds=grid.bounds if self._bounds is not None else None,
+            crs=self._crs,
+            driver=self._driver,
+            no_data=self._no_data,
+            transform=grid.transform,
+            units=self._units,
+            grid=grid,
+            mask=(
+                None
+                if self._mask is None
+                else self._mask[row_off : row_off + height, col_off : col_off + width]
+            ),
+        )
+
+    def stack_mask(self) -> Optional[np.ndarray]:
+        """
+        Append the mask to the layer data as its last band, like an alpha layer.
+
+        Boolean masks become 255 where the data is valid and 0 elsewhere. This is meant
+        to be called once, when the layer is rendered or exported.
+
+        Returns:
+          The stacked array, or the layer array itself if the layer has no mask.
+        """
+        if self._array is None or self._mask is None:
+            return self._array
+        alpha = self._mask
+        if alpha.dtype == np.bool_:
+            alpha = np.where(alpha, np.uint8(255), np.uint8(0))
+        return np.dstack([self._array, alpha])
+
     @property
     def array(self) -> Optional[np.ndarray[np.int32]]:
+        # A Writable Original Moves to Its Own Copy Before Its Duplicates Can See Writes
+        if (
+            self._sharing is not None
+            and self._array.flags.writeable
+            and self._release()
+        ):
+            self._array = self._array.copy()
         return self._array
 
     @array.setter
@@ -228,7 +416,18 @@ class Layer:
             isinstance(value, np.ndarray) and np.issubdtype(value.dtype, np.number)
         ):
             raise TypeError(ERROR_MESSAGES["array"].format(array_type=type(value)))
+        self._release()
         self._array = value
+        self._update_grid()
+
+    @property
+    def mask(self) -> Optional[np.ndarray[Union[np.bool_, np.uint8]]]:
+        return self._mask
+
+    @mask.setter
+    def mask(self, value: Optional[np.ndarray[Union[np.bool_, np.uint8]]]):
+        _check_mask(value, self._array)
+        self._mask = _read_only_mask(value)
 
     @property
     def bounds(self) -> Optional[Dict[str, float]]:
@@ -258,6 +457,7 @@ class Layer:
         if value is not None and not isinstance(value, str):
             raise TypeError(ERROR_MESSAGES["crs"].format(crs_type=type(value)))
         self._crs = value
+        self._update_grid()
 
     @property
     def driver(self) -> Optional[str]:
@@ -294,6 +494,7 @@ class Layer:
                 ERROR_MESSAGES["transform"].format(transform_type=type(value))
             )
         self._transform = value
+        self._update_grid()
 
     @property
     def units(self) -> Optional[str]:
@@ -305,6 +506,12 @@ class Layer:
             raise TypeError(ERROR_MESSAGES["units"].format(units_type=type(value)))
         self._units = value
 
+    @property
+    def grid(self) -> Optional[GridSpec]:
+        if "_grid" not in self.__dict__:
+            self._update_grid()
+        return self._grid
+
     @property
     def resolution(self) -> float:
         if self._array is not None and self._transform is not None:
@@ -402,3 +609,81 @@ class Layer:
             )
         else:
             return None
+
+    def world_to_pixel(
+        self, xs: np.ndarray, ys: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self._georeferenced_grid().world_to_pixel(xs, ys)
+
+    def pixel_to_world(
+        self, rows: np.ndarray, cols: np.ndarray, center: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self._georeferenced_grid().pixel_to_world(rows, cols, center)
+
+    def sample(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        fill: Optional[Union[int, float]] = None,
+    ) -> np.ndarray:
+        rows, cols = self.world_to_pixel(xs, ys)
+        return self._gather(rows, cols, fill)
+
+    def _georeferenced_grid(self) -> GridSpec:
+        grid = self.grid
+        if grid is None or grid.transform is None:
+            raise TypeError(
+                Errors.bad_input(
+                    name="layer",
+                    expected_type="a layer with array and transform data",
+                )
+            )
+        return grid
+
+    def _gather(
+        self,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        fill: Optional[Union[int, float]] = None,
+    ) -> np.ndarray:
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        if inside.all():
+            return self._array[rows, cols]
+
+        if fill is None:
+            fill = self._no_data
+        if fill is None:
+            fill = np.nan
+
+        dtype = np.result_type(self._array.dtype, np.min_scalar_type(fill))
+        values = np.full(rows.shape + self._array.shape[2:], fill, dtype=dtype)
+        values[inside] = self._array[rows[inside], cols[inside]]
+        return values
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _check_mask(mask: Optional[np.ndarray], array: Optional[np.ndarray]):
+    if mask is not None and not (
+        isinstance(mask, np.ndarray)
+        and mask.dtype in (np.bool_, np.uint8)
+        and mask.ndim == 2
+        and (array is None or array.shape[:2] == mask.shape)
+    ):
+        raise TypeError(ERROR_MESSAGES["mask"].format(mask_type=type(mask)))
+
+
+def _read_only_mask(mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    if mask is None or not mask.flags.writeable:
+        return mask
+    return _read_only(mask)
+
+
+def _same_mask(mask: Optional[np.ndarray], other: Optional[np.ndarray]) -> bool:
+    if mask is None or other is None:
+        return mask is other
+    return mask is other or np.array_equal(mask, other)
@@ -1,11 +1,13 @@
 import os
-from typing import Dict, Optional, TypedDict, Union
+from typing import Dict, List, Optional, TypedDict, Union
 
+import numpy as np
 import rasterio
 
 from rforge.library.tools.rescale_dataset import rescale_dataset
 from rforge.library.tools.exceptions import Errors
 
+from rforge.library.containers.grid import GridSpec
 from rforge.library.containers.layer import Layer
 
 
@@ -31,6 +33,11 @@ class Raster:
         add_layer: Adds a layer to the raster dataset.
         remove_layer: Removes a layer from the raster dataset.
         edit_layer: Renames a layer in the raster dataset.
+        duplicate_layer: Adds a copy-on-write duplicate of a layer to the raster
+            dataset, whose data is changed through Layer.modify while the original stays
+            writable.
+        group_by_grid: Groups the layer names by the grid they lie on.
+        sample: Gathers the values of all layers at batches of world coordinates.
     """
 
     _layers: Dict[str, Layer]
@@ -93,40 +100,43 @@ class Raster:
                     }
                     config.append(aux_config)
 
+            # Grid Metadata Is Read Once for All Bands of the Dataset
+            bounds = {
+                "left": dataset.bounds[0],
+                "bottom": dataset.bounds[1],
+                "right": dataset.bounds[2],
+                "top": dataset.bounds[3],
+            }
+            crs = (
+                str(dataset.crs.to_epsg())
+                if dataset.crs.to_epsg() is not None
+                else "4326"
+            )
+            driver = dataset.meta["driver"].upper()
+            no_data = dataset.nodata
+            transform = (
+                dataset.transform.c,
+                dataset.transform.a,
+                dataset.transform.b,
+                dataset.transform.f,
+                dataset.transform.d,
+                dataset.transform.e,
+            )
+            grid = GridSpec((dataset.height, dataset.width), transform, crs)
+
             for item in config:
                 array = dataset.read(item["id"])
-
-                bounds = {
-                    "left": dataset.bounds[0],
-                    "bottom": dataset.bounds[1],
-                    "right": dataset.bounds[2],
-                    "top": dataset.bounds[3],
-                }
-                crs = (
-                    str(dataset.crs.to_epsg())
-                    if dataset.crs.to_epsg() is not None
-                    else "4326"
-                )
-                driver = dataset.meta["driver"].upper()
-                no_data = dataset.nodata
-                transform = (
-                    dataset.transform.c,
-                    dataset.transform.a,
-                    dataset.transform.b,
-                    dataset.transform.f,
-                    dataset.transform.d,
-                    dataset.transform.e,
-                )
                 units = dataset.units[int(item["id"]) - 1]
 
                 layer = Layer(
                     array=array,
-                    bounds=bounds,
+                    bounds=dict(bounds),
                     crs=crs,
                     driver=driver,
                     no_data=no_data,
                     transform=transform,
                     units=units,
+                    grid=grid,
                 )
 
                 self._layers[str(item["name"])] = layer
@@ -160,3 +170,37 @@ class Raster:
             )
         if current_name in self._layers.keys():
             self._layers[new_name] = self._layers.pop(current_name)
+
+    def duplicate_layer(self, current_name: str, new_name: str):
+        if not isinstance(current_name, str):
+            raise TypeError(
+                Errors.bad_input(name="current layer name", expected_type="a string")
+            )
+        if not isinstance(new_name, str):
+            raise TypeError(
+                Errors.bad_input(name="new layer name", expected_type="a string")
+            )
+        if current_name in self._layers.keys() and new_name not in self._layers.keys():
+            self._layers[new_name] = self._layers[current_name].copy()
+
+    def group_by_grid(self) -> Dict[Optional[GridSpec], List[str]]:
+        groups: Dict[Optional[GridSpec], List[str]] = {}
+        for name, layer in self._layers.items():
+            groups.setdefault(layer.grid, []).append(name)
+        return groups
+
+    def sample(
+        self,
+        xs: np.ndarray,
+        ys: np.ndarray,
+        fill: Optional[Union[int, float]] = None,
+    ) -> Dict[str, np.ndarray]:
+        values = {}
+        for grid, names in self.group_by_grid().items():
+            if grid is None or grid.transform is None:
+                continue
+            # Pixel Indices Are Computed Once per Grid
+            rows, cols = grid.world_to_pixel(xs, ys)
+            for name in names:
+                values[name] = self._layers[name]._gather(rows, cols, fill)
+        return values
@@ -1,21 +1,51 @@
-from typing import Optional, Union
+import functools
+from typing import Any, Dict, Optional, Union
 
+import cv2
 import numpy as np
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.blocks import block_rows, row_blocks
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.formulas import convert_band
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.precision import cast, check_precision
+from rforge.library.tools.registry import register_process
 
 PRESET_COMPOSITES = {
     "True Color": ["Red", "Green", "Blue"],
     "CIR": ["NIR", "Red", "Green"],
 }
 
+LOOKUP_TYPES = (np.dtype(np.uint8), np.dtype(np.uint16))
 
+RENDER_CHANNELS = {"RGBA": (0, 1, 2), "BGRA": (2, 1, 0)}
+
+
+def _stretched_by_data(arguments: Dict[str, Any]) -> bool:
+    # Renders Without a Fixed Stretch Take It From the Range of the Whole Raster
+    return arguments.get("render") is not None and arguments.get("stretch") is None
+
+
+@register_process(halo=0, releases_gil=True, whole_raster=_stretched_by_data)
 def composite(
     layers: Union[list[Layer], list[np.ndarray]],
     alpha: Optional[Union[Layer, np.ndarray]] = None,
     gamma: Optional[Union[list, tuple]] = None,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
+    scales: Optional[Union[list, tuple]] = None,
+    offsets: Optional[Union[list, tuple]] = None,
+    render: Optional[str] = None,
+    stretch: Optional[Union[list, tuple]] = None,
 ) -> Union[np.ndarray, Layer]:
     """Stacks all provided layers into a single array in order, including alpha. Applies gamma correction if provided.
 
@@ -25,9 +55,38 @@ def composite(
       alpha:
         Alpha layer. Defaults to None.
       gamma:
-        List of gamma values to apply to each layer. Defaults to None.
+        List of gamma values to apply to each layer. Unsigned 8 and 16-bit layers
+        without precision, scales or offsets keep their data type, with gamma applied to
+        values normalized to the range of the type through a lookup table. Defaults to
+        None.
       as_array:
         If True, returns the distance field as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        Not supported, as the composite has one band per layer, and must be False. Use
+        out to write into a preallocated array. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
+      scales:
+        List of factors each layer is multiplied by before gamma correction, such as the
+        reflectance scale of integer digital numbers. Defaults to None.
+      offsets:
+        List of values added to each layer after scaling. Defaults to None.
+      render:
+        If 'RGBA' or 'BGRA', returns a render-ready interleaved uint8 image of one gray
+        or three color layers, with the alpha layer (clipped to 0-255) in the last
+        channel. Without an alpha layer, the mask of the first masked input Layer is
+        used, and 255 if there is none. Each layer is stretched to 0-255 and gamma
+        corrected in the same pass, straight into the output. 'BGRA' has the byte order
+        of QImage.Format_ARGB32 and 'RGBA' that of QImage.Format_RGBA8888. Defaults to
+        None.
+      stretch:
+        List of (low, high) values per layer mapped to 0 and 255 when rendering, after
+        scaling. Defaults to None, in which case the minimum and maximum of each layer
+        are used, and tiled or deferred renders run over the whole raster at once.
 
     Returns:
       Stacked composite layer.
@@ -37,9 +96,22 @@ def composite(
         If inputs are not of the accepted type.
     """
     # Data Validation
+    check_alignment(*layers, alpha)
+    if inplace is True:
+        raise TypeError(
+            Errors.bad_input(
+                name="inplace",
+                expected_type=(
+                    "False, as the composite has one band per layer and can't be"
+                    " written into a layer"
+                ),
+            )
+        )
+    destination = check_out(out, inplace, None)
+    dtype = check_precision(precision)
     arrays = [check_layer(layer) for layer in layers]
     if alpha is not None:
-        alpha = check_layer(alpha)
+        alpha = cast(check_layer(alpha), dtype)
     if gamma is not None:
         if (
             not isinstance(gamma, (list, tuple))
@@ -52,16 +124,215 @@ def composite(
                     expected_type="a list or tuple of numeric values with the same amount of elements as there are layers",
                 )
             )
+    for name, scaling in [("scales", scales), ("offsets", offsets)]:
+        if scaling is not None and (
+            not isinstance(scaling, (list, tuple))
+            or len(arrays) != len(scaling)
+            or not all(isinstance(element, (int, float)) for element in scaling)
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name=name,
+                    expected_type="a list or tuple of numeric values with the same amount of elements as there are layers",
+                )
+            )
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    if render is not None and not (render in RENDER_CHANNELS and len(arrays) in [1, 3]):
+        raise TypeError(
+            Errors.bad_input(
+                name="render",
+                expected_type="'RGBA', 'BGRA' or None, with one or three layers",
+            )
+        )
+    if stretch is not None and not (
+        render is not None
+        and isinstance(stretch, (list, tuple))
+        and len(stretch) == len(arrays)
+        and all(
+            isinstance(item, (list, tuple))
+            and len(item) == 2
+            and all(isinstance(value, (int, float)) for value in item)
+            and item[0] < item[1]
+            for item in stretch
+        )
+    ):
+        raise TypeError(
+            Errors.bad_input(
+                name="stretch",
+                expected_type=(
+                    "a list of (low, high) values per layer, used with render"
+                ),
+            )
+        )
 
-    result = np.dstack(arrays)
+    if render is not None:
+        if alpha is None:
+            alpha = next(
+                (
+                    layer.mask
+                    for layer in layers
+                    if isinstance(layer, Layer) and layer.mask is not None
+                ),
+                None,
+            )
+        buffer = output_buffer(destination, arrays[0].shape[:2] + (4,), dtype=np.uint8)
+        result = _render(
+            arrays,
+            alpha,
+            gamma,
+            scales,
+            offsets,
+            stretch,
+            RENDER_CHANNELS[render],
+            buffer,
+            np.dtype(np.float32) if dtype is None else dtype,
+        )
+        return deliver(result, destination, as_array)
 
-    if gamma is not None:
+    scaled = scales is not None or offsets is not None
+    if dtype is None and scaled:
+        dtype = np.result_type(*arrays)
+        dtype = dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+    lookup = (
+        gamma is not None
+        and dtype is None
+        and all(array.dtype in LOOKUP_TYPES for array in arrays)
+    )
+    result_type = np.result_type(*arrays) if dtype is None else dtype
+    if gamma is not None and not lookup:
+        result_type = np.result_type(
+            result_type, np.float64 if dtype is None else dtype
+        )
+
+    shape = arrays[0].shape[:2] + (len(arrays),)
+    buffer = output_buffer(destination, shape, alpha, result_type)
+    result = result_view(buffer, shape, alpha)
+    if result is None:
+        result = np.empty(shape, np.result_type(*arrays) if dtype is None else dtype)
+
+    # Convert and Scale Each Layer Straight Into Its Band of the Result
+    for band, array in enumerate(arrays):
+        if lookup:
+            _apply_table(result[:, :, band], array, float(gamma[band]))
+        else:
+            convert_band(
+                result[:, :, band],
+                array,
+                None if scales is None else scales[band],
+                None if offsets is None else offsets[band],
+            )
+
+    if gamma is not None and not lookup:
         gamma = list(map(float, gamma))
-        result = np.power(result, np.array(gamma))
+        result = np.power(
+            result,
+            np.array(gamma, dtype=dtype),
+            out=None if buffer is None else result,
+        )
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+@functools.lru_cache(maxsize=64)
+def _gamma_table(dtype: np.dtype, gamma: float) -> np.ndarray:
+    # Gamma Correction of Every Value of an Unsigned Type, Normalized to Its Range
+    maximum = np.iinfo(dtype).max
+    with np.errstate(all="ignore"):
+        table = maximum * np.power(np.arange(maximum + 1) / maximum, gamma)
+    table = np.clip(np.nan_to_num(table, posinf=maximum), 0, maximum)
+    table = np.round(table).astype(dtype)
+    table.flags.writeable = False
+    return table
+
+
+def _apply_table(target: np.ndarray, array: np.ndarray, gamma: float):
+    # Look Up Each Value Instead of Raising It to the Gamma
+    table = _gamma_table(array.dtype, gamma)
+    if array.dtype == np.uint8 and array.ndim == 2:
+        target[...] = cv2.LUT(np.ascontiguousarray(array), table)
+        return
+    for block in row_blocks(array.shape):
+        target[block] = table[array[block]]
+
+
+def _render(
+    arrays: list[np.ndarray],
+    alpha: Optional[np.ndarray],
+    gamma: Optional[Union[list, tuple]],
+    scales: Optional[Union[list, tuple]],
+    offsets: Optional[Union[list, tuple]],
+    stretch: Optional[Union[list, tuple]],
+    channels: tuple,
+    buffer: Optional[np.ndarray],
+    dtype: np.dtype,
+) -> np.ndarray:
+    # Stretch, Correct and Interleave Every Layer Into a uint8 Image
+    result = buffer
+    if result is None:
+        result = np.empty(arrays[0].shape[:2] + (4,), dtype=np.uint8)
+    rows = block_rows(arrays[0].shape)
+    scratch = np.empty((rows, arrays[0].shape[1]), dtype=dtype)
+
+    for band, array in enumerate(arrays):
+        scale = 1.0 if scales is None else float(scales[band])
+        offset = 0.0 if offsets is None else float(offsets[band])
+        exponent = 1.0 if gamma is None else float(gamma[band])
+        if stretch is None:
+            ends = [scale * float(np.nanmin(array)) + offset]
+            ends.append(scale * float(np.nanmax(array)) + offset)
+            low, high = min(ends), max(ends)
+        else:
+            low, high = map(float, stretch[band])
+
+        # Normalized Values Are an Affine Function of the Layer Values
+        factor = scale / (high - low) if high > low else 0.0
+        shift = (offset - low) / (high - low) if high > low else 0.0
+        target = result[:, :, channels[band]]
+
+        if array.dtype in LOOKUP_TYPES:
+            values = np.arange(np.iinfo(array.dtype).max + 1, dtype=np.float64)
+            table = _render_values(values * factor + shift, exponent)
+            table = np.floor(table + 0.5).astype(np.uint8)
+            if array.dtype == np.uint8:
+                target[...] = cv2.LUT(np.ascontiguousarray(array), table)
+            else:
+                for block in row_blocks(array.shape, rows):
+                    target[block] = table[array[block]]
+            continue
+
+        for block in row_blocks(array.shape, rows):
+            values = scratch[: block.stop - block.start]
+            np.multiply(array[block], factor, out=values, casting="unsafe")
+            np.add(values, shift, out=values)
+            _render_values(values, exponent)
+            np.add(values, 0.5, out=values)
+            np.copyto(target[block], values, casting="unsafe")
+
+    if len(arrays) == 1:
+        for channel in range(3):
+            if channel != channels[0]:
+                result[:, :, channel] = result[:, :, channels[0]]
+    if alpha is None:
+        result[:, :, 3] = 255
+    elif alpha.dtype == np.uint8:
+        result[:, :, 3] = alpha
+    elif alpha.dtype == np.bool_:
+        np.multiply(alpha, 255, out=result[:, :, 3], casting="unsafe")
+    else:
+        np.copyto(result[:, :, 3], np.clip(alpha, 0, 255), casting="unsafe")
+    return result
 
-    if alpha is not None:
-        result = np.dstack([result, alpha])
 
-    return result if as_array else Layer(result)
+def _render_values(values: np.ndarray, exponent: float) -> np.ndarray:
+    # Clip Normalized Values, NaN Included, and Map Them to 0-255 in Place
+    with np.errstate(all="ignore"):
+        np.fmax(values, 0, out=values)
+        np.fmin(values, 1, out=values)
+        if exponent != 1:
+            np.power(values, exponent, out=values)
+            np.fmin(values, 1, out=values)
+        np.multiply(values, 255, out=values)
+    return values
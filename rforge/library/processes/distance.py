@@ -1,12 +1,26 @@
-from typing import Optional, Union
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Tuple, Union
 
 import cv2
 import numpy as np
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.blocks import row_blocks
+from rforge.library.tools.classification import check_breaks, classify
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.registry import register_process
+from rforge.library.tools.tiling import DatasetBand, window_inputs, write_tile
 
 
+@register_process(halo=None, releases_gil=True)
 def distance(
     layer: Union[Layer, np.ndarray],
     alpha: Optional[Union[Layer, np.ndarray]] = None,
@@ -14,65 +28,468 @@ def distance(
     invert: bool = False,
     mask_size: int = 3,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    workers: Optional[int] = None,
+    labels: bool = False,
+    breaks: Optional[Union[list, tuple]] = None,
 ) -> Union[np.ndarray, Layer]:
     """Calculate the distance field of a geographical region.
 
+    Several distance fields can be computed from the same layer in one call by passing a
+    list of threshold ranges, which returns one band per range. The layer is validated
+    once, 8 and 16-bit layers with ranges that don't overlap are binarized together in a
+    single pass that labels every pixel with its range, and the distance transforms run
+    concurrently on a pool of threads.
+
+    Features are the pixels that are zero after binarization, from which distances are
+    measured. With labels, the connected components of the features are numbered from 1
+    and two bands are appended to the distance field: the allocation band, with the
+    component nearest to every pixel, and the component band, with the component of
+    every feature pixel and 0 elsewhere. Both come from the same OpenCV pass as the
+    distances when mask_size is 5, which OpenCV always uses for labels.
+
     Args:
       layer:
         Binary layer data.
       alpha:
         Alpha layer. Defaults to None.
       thresholds:
-        Thresholds to use for image binarization. Defaults to None.
+        Thresholds to use for image binarization, or a list of them for one distance
+        field per range. Defaults to None.
       invert:
         If True, inverts the binary layer data before processing. Defaults to False.
       mask_size:
-        Size of the mask for distance calculation. Defaults to 3.
+        Size of the mask for distance calculation, 3 or 5, or 0 for the exact Euclidean
+        distance. Defaults to 3.
       as_array:
         If True, returns the distance field as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the binary layer. Defaults to False.
+      workers:
+        Maximum number of threads computing the distance fields of a list of ranges.
+        Defaults to None, in which case it is derived from the number of CPUs.
+      labels:
+        If True, appends the allocation and component bands of the features, which
+        requires a single range. Defaults to False.
+      breaks:
+        Strictly increasing list of class breaks. If given, every distance field is
+        classified into uint8 class codes, from 0 below the first break to len(breaks)
+        at or above the last one. Defaults to None.
 
     Returns:
-      Distance field layer.
+      Distance field layer, with one band per range if a list of thresholds is given, or
+      with the allocation and component bands if labels is True.
 
     Raises:
       TypeError:
         If inputs are not of the accepted type.
     """
     # Data Validation
-
+    check_alignment(layer, alpha)
+    destination = check_out(out, inplace, layer)
     array = check_layer(layer)
     if alpha is not None:
         alpha = check_layer(alpha)
-        print(alpha)
-    if thresholds is not None and not (
-        isinstance(thresholds, (list, tuple))
-        and len(thresholds) == 2
-        and all(isinstance(item, (np.number, int, float)) for item in thresholds)
-        and thresholds[0] < thresholds[1]
-    ):
+    _check_binarization(thresholds, invert, classes=True)
+    if not (isinstance(mask_size, int) and mask_size in [0, 3, 5]):
+        raise TypeError(Errors.bad_input(name="mask_size", expected_type="0, 3 or 5"))
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    if workers is not None and not (isinstance(workers, int) and workers > 0):
+        raise TypeError(
+            Errors.bad_input(name="workers", expected_type="a positive integer")
+        )
+    if not isinstance(labels, bool):
+        raise TypeError(Errors.bad_input(name="labels", expected_type="a boolean"))
+    if labels and thresholds is not None and not _is_range(thresholds):
         raise TypeError(
             Errors.bad_input(
-                name="thresholds", expected_type="a tuple with two numericalw"
+                name="thresholds", expected_type="a single range when labels is True"
             )
         )
-    if not isinstance(invert, bool):
-        raise TypeError(Errors.bad_input(name="invert", expected_type="a boolean"))
-    if not (isinstance(mask_size, int) and mask_size in [3, 5]):
-        raise TypeError(Errors.bad_input(name="mask_size", expected_type="3 or 5"))
+
+    if breaks is not None:
+        if labels:
+            raise TypeError(
+                Errors.bad_input(
+                    name="breaks", expected_type="None when labels is True"
+                )
+            )
+        breaks = check_breaks(breaks)
+
+    if breaks is not None:
+        if thresholds is not None and not _is_range(thresholds):
+            field = _distance_classes(
+                array, None, thresholds, invert, mask_size, None, True, workers
+            )
+        else:
+            binary = _binarize(array, thresholds, invert)
+            field = cv2.distanceTransform(binary, cv2.DIST_L2, mask_size)
+            np.abs(np.subtract(field.max(), field, out=field), out=field)
+        buffer = output_buffer(destination, field.shape, alpha, np.uint8)
+        result = classify(field, breaks, out=result_view(buffer, field.shape, alpha))
+        result = stack_alpha(result, alpha, buffer)
+        return deliver(result, destination, as_array)
+
+    if thresholds is not None and not _is_range(thresholds):
+        return _distance_classes(
+            array,
+            alpha,
+            thresholds,
+            invert,
+            mask_size,
+            destination,
+            as_array,
+            workers,
+        )
+
+    shape = array.shape[:2] + ((3,) if labels else ())
+    buffer = output_buffer(destination, shape, alpha, np.float32)
+
+    binary = _binarize(array, thresholds, invert)
+
+    if labels:
+        field, allocation = cv2.distanceTransformWithLabels(
+            binary, cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_CCOMP
+        )
+        if mask_size != 5:
+            field = cv2.distanceTransform(binary, cv2.DIST_L2, mask_size)
+    else:
+        field = cv2.distanceTransform(binary, cv2.DIST_L2, mask_size)
+    target = result_view(buffer, shape, alpha)
+    if labels:
+        # The Bands Are float32 However the Result Is Delivered
+        bands = np.empty(shape, dtype=np.float32) if target is None else target
+        target = bands[:, :, 0]
+    result = np.subtract(field.max(), field, out=field if target is None else target)
+    np.abs(result, out=result)
+
+    if labels:
+        bands[:, :, 1] = allocation
+        np.multiply(allocation, binary == 0, out=bands[:, :, 2], casting="unsafe")
+        result = bands
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+def distance_tiled(
+    layer: Union[Layer, np.ndarray, DatasetBand],
+    alpha: Optional[Union[Layer, np.ndarray, DatasetBand]] = None,
+    thresholds: Optional[Union[list, tuple]] = None,
+    invert: bool = False,
+    units: str = "pixels",
+    strip_size: int = 512,
+    destination: Optional[Any] = None,
+    workspace: Optional[str] = None,
+    as_array: bool = False,
+) -> Any:
+    """Calculate the exact distance field of a geographical region strip by strip.
+
+    Memory is bounded by the strip size rather than by the size of the layer.
+
+    Distances cross strip borders, so the exact Euclidean distance transform is computed
+    in two separable stages. Columns are swept top-down and bottom-up over strips of
+    rows, keeping the distance to the last feature of every column between strips, and
+    rows are then solved strip by strip with the lower envelope of parabolas of
+    Felzenszwalb and Huttenlocher. Intermediate distances are kept in a temporary file.
+    The result matches distance with a mask_size of 0, up to the float32 rounding of
+    OpenCV.
+
+    Args:
+      layer:
+        Binary layer data.
+      alpha:
+        Alpha layer. Defaults to None.
+      thresholds:
+        Thresholds to use for image binarization. Defaults to None.
+      invert:
+        If True, inverts the binary layer data before processing. Defaults to False.
+      units:
+        Units of the distances, either 'pixels' or 'map' for the units of the layer
+        transform, which may have different column and row resolutions. Defaults to
+        'pixels'.
+      strip_size:
+        Number of rows of each strip. Defaults to 512.
+      destination:
+        Layer, NumPy array (e.g. a memory map) or rasterio dataset opened for writing
+        that receives the result. Defaults to None, in which case the result is
+        allocated in memory.
+      workspace:
+        Directory of the temporary file. Defaults to None, in which case the system
+        default is used.
+      as_array:
+        If True, returns the distance field as a Numpy array when no destination is
+        given. Defaults to False.
+
+    Returns:
+      The destination if one was given. Otherwise, the distance field as a Layer, or as
+      a NumPy array if as_array is True.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    grid = check_alignment(layer, alpha)
+    if grid is None:
+        raise TypeError(Errors.bad_input(name="layer", expected_type="a raster layer"))
+    _check_binarization(thresholds, invert)
+    if units not in ["pixels", "map"]:
+        raise TypeError(
+            Errors.bad_input(name="units", expected_type="'pixels' or 'map'")
+        )
+    if units == "map" and grid.transform is None:
+        raise TypeError(
+            Errors.bad_input(name="layer", expected_type="georeferenced for map units")
+        )
+    if not (isinstance(strip_size, int) and strip_size > 0):
+        raise TypeError(
+            Errors.bad_input(name="strip_size", expected_type="a positive integer")
+        )
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
 
+    rows, cols = grid.shape
+    strips = [
+        (start, 0, min(strip_size, rows - start), cols)
+        for start in range(0, rows, strip_size)
+    ]
+    if units == "map":
+        transform = grid.transform
+        spacing = (
+            np.hypot(transform[2], transform[5]),
+            np.hypot(transform[1], transform[4]),
+        )
+    else:
+        spacing = (1.0, 1.0)
+
+    with tempfile.TemporaryFile(dir=workspace) as file:
+        columns = np.memmap(file, dtype=np.float32, mode="w+", shape=grid.shape)
+
+        # Top-Down Sweep: Rows Since the Last Feature Above
+        carry = np.full(cols, np.inf)
+        found = False
+        for strip in strips:
+            binary = _binarize(
+                check_layer(window_inputs(layer, grid.shape, strip)), thresholds, invert
+            )
+            features = binary == 0
+            found = found or bool(features.any())
+            carry = _sweep_columns(
+                features, carry, columns[strip[0] : strip[0] + strip[2]]
+            )
+
+        # Bottom-Up Sweep: Keep the Nearest of the Features Above and Below
+        carry = np.full(cols, np.inf)
+        for strip in reversed(strips):
+            block = columns[strip[0] : strip[0] + strip[2]]
+            upward = np.empty_like(block)
+            carry = _sweep_columns(block[::-1] == 0, carry, upward[::-1])
+            np.minimum(block, upward, out=block)
+
+        # Row Stage: Exact Distances Along Rows, in Units of the Column Spacing
+        ratio = spacing[0] / spacing[1]
+        ceiling = 4 * ((rows * ratio) ** 2 + cols**2) + 1
+        maximum = np.float32(0)
+        for strip in strips:
+            block = columns[strip[0] : strip[0] + strip[2]]
+            if found:
+                heights = np.square(block * np.float64(ratio))
+                heights[np.isinf(heights)] = ceiling
+                result = np.sqrt(_lower_envelope(heights)) * spacing[1]
+            else:
+                result = 0
+            block[...] = result
+            maximum = max(maximum, block.max())
+
+        # Invert the Distances Like distance Does
+        target = destination.modify() if isinstance(destination, Layer) else destination
+        for strip in strips:
+            block = columns[strip[0] : strip[0] + strip[2]]
+            tile = np.abs(np.subtract(maximum, block))
+            if alpha is not None:
+                tile = stack_alpha(
+                    tile, check_layer(window_inputs(alpha, grid.shape, strip)), None
+                )
+            if target is None:
+                target = np.empty(grid.shape + tile.shape[2:], dtype=tile.dtype)
+            write_tile(target, strip, tile)
+        del columns
+
+    if destination is not None:
+        if isinstance(destination, Layer):
+            destination.array = target
+        return destination
+    return target if as_array else Layer(target)
+
+
+def _distance_classes(
+    array: np.ndarray,
+    alpha: Optional[np.ndarray],
+    thresholds: Union[list, tuple],
+    invert: bool,
+    mask_size: int,
+    destination: Optional[Union[Layer, np.ndarray]],
+    as_array: bool,
+    workers: Optional[int],
+) -> Union[np.ndarray, Layer]:
+    # Distance Fields of Several Threshold Ranges, One Band per Range
+    shape = array.shape[:2] + (len(thresholds),)
+    buffer = output_buffer(destination, shape, alpha, np.float32)
+    result = result_view(buffer, shape, alpha)
+    if result is None:
+        result = np.empty(shape, dtype=np.float32)
+    labels = _label_ranges(array, thresholds)
+
+    def transform(band: int):
+        if labels is None:
+            binary = _binarize(array, thresholds[band], invert)
+        else:
+            mask = labels[0] == labels[1][band]
+            if invert:
+                np.logical_not(mask, out=mask)
+            binary = mask.view(np.uint8)
+            np.multiply(binary, 255, out=binary)
+        field = cv2.distanceTransform(binary, cv2.DIST_L2, mask_size)
+        np.subtract(field.max(), field, out=field)
+        return np.abs(field, out=field)
+
+    # OpenCV Releases the GIL, So the Transforms Run Concurrently
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fields = list(executor.map(transform, range(len(thresholds))))
+
+    # Interleave the Bands Block by Block, So the Result Is Written in One Pass
+    for block in row_blocks(result.shape):
+        np.stack([field[block] for field in fields], axis=-1, out=result[block])
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+def _label_ranges(
+    array: np.ndarray, ranges: Union[list, tuple]
+) -> Optional[Tuple[np.ndarray, list]]:
+    # Label Every Pixel of an 8 or 16-Bit Integer Layer With the Range Holding It in a
+    # Single Pass, Through a Table of the Ranges of Every Possible Value
+    if array.dtype.kind not in "iu" or array.dtype.itemsize > 2:
+        return None
+    order = sorted(range(len(ranges)), key=lambda position: ranges[position][0])
+    edges = []
+    for position in order:
+        edges += [ranges[position][0], np.nextafter(ranges[position][1], np.inf)]
+    if any(upper > lower for upper, lower in zip(edges[1::2], edges[2::2])):
+        return None
+
+    info = np.iinfo(array.dtype)
+    table = np.digitize(np.arange(info.min, info.max + 1), edges).astype(np.uint8)
+    labels = table[array.astype(np.intp) - info.min] if info.min else table[array]
+    codes = [0] * len(ranges)
+    for rank, position in enumerate(order):
+        codes[position] = 2 * rank + 1
+    return labels, codes
+
+
+def _is_range(value: Any) -> bool:
+    return (
+        isinstance(value, (list, tuple))
+        and len(value) == 2
+        and all(isinstance(item, (np.number, int, float)) for item in value)
+        and value[0] < value[1]
+    )
+
+
+def _check_binarization(thresholds: Any, invert: Any, classes: bool = False):
+    if thresholds is not None and not _is_range(thresholds):
+        if not (
+            classes
+            and isinstance(thresholds, (list, tuple))
+            and len(thresholds) > 0
+            and all(_is_range(item) for item in thresholds)
+        ):
+            raise TypeError(
+                Errors.bad_input(
+                    name="thresholds",
+                    expected_type=(
+                        "a tuple with two numerical values or a list of them"
+                        if classes
+                        else "a tuple with two numerical values"
+                    ),
+                )
+            )
+    if not isinstance(invert, bool):
+        raise TypeError(Errors.bad_input(name="invert", expected_type="a boolean"))
+
+
+def _binarize(
+    array: np.ndarray, thresholds: Optional[Union[list, tuple]], invert: bool
+) -> np.ndarray:
+    # Binarize Straight Into an 8-Bit Image, Where Features Are Zero
     if thresholds is not None:
-        mask = np.logical_and(array >= thresholds[0], array <= thresholds[1])
+        mask = array >= thresholds[0]
+        mask &= array <= thresholds[1]
         if invert:
-            array = np.where(mask, 0, 255)
-        else:
-            array = np.where(mask, 255, 0)
+            np.logical_not(mask, out=mask)
+        binary = mask.view(np.uint8)
+        np.multiply(binary, 255, out=binary)
+    else:
+        binary = np.uint8(array)
+    return binary
 
-    result = cv2.distanceTransform(np.uint8(array), cv2.DIST_L2, mask_size)
-    result = abs(result.max() - result)
 
-    if alpha is not None:
-        result = np.dstack([result, alpha])
+def _sweep_columns(
+    features: np.ndarray, carry: np.ndarray, out: np.ndarray
+) -> np.ndarray:
+    # Rows Since the Last Feature of Every Column, Continuing From the Previous Strip
+    steps = np.arange(1, features.shape[0] + 1)[:, None]
+    last = np.maximum.accumulate(np.where(features, steps, 0), axis=0)
+    np.copyto(out, np.where(last > 0, steps - last, carry + steps))
+    return out[-1].astype(np.float64)
+
+
+def _lower_envelope(heights: np.ndarray) -> np.ndarray:
+    # Squared Distances Along Rows, min_q (p - q)^2 + heights[q], for All Rows at Once
+    rows, cols = heights.shape
+    offsets = np.arange(rows) * cols
+    bounds = np.arange(rows) * (cols + 1)
+    shifted = (heights + np.arange(cols, dtype=np.float64) ** 2).ravel()
+    vertices = np.zeros(rows * cols, dtype=np.intp)
+    limits = np.empty(rows * (cols + 1))
+    limits[bounds] = -np.inf
+    limits[bounds + 1] = np.inf
+
+    # Build the Lower Envelope, Dropping Parabolas Hidden by the New One
+    k = np.zeros(rows, dtype=np.intp)
+    for q in range(1, cols):
+        current = shifted[offsets + q]
+        while True:
+            vertex = vertices[offsets + k]
+            crossing = (current - shifted[offsets + vertex]) / (2 * (q - vertex))
+            hidden = crossing <= limits[bounds + k]
+            if not hidden.any():
+                break
+            k -= hidden
+        k += 1
+        vertices[offsets + k] = q
+        limits[bounds + k] = crossing
+        limits[bounds + k + 1] = np.inf
 
-    return result if as_array else Layer(result)
+    # Evaluate the Envelope at Every Column
+    result = np.empty((rows, cols))
+    heights = heights.ravel()
+    k[:] = 0
+    for q in range(cols):
+        while True:
+            beyond = limits[bounds + k + 1] < q
+            if not beyond.any():
+                break
+            k += beyond
+        vertex = vertices[offsets + k]
+        result[:, q] = (q - vertex) ** 2 + heights[offsets + vertex]
+    return result
@@ -1,12 +1,63 @@
 import math
-from typing import Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.blocks import block_rows, row_blocks
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.registry import register_process
+from rforge.library.tools.tiling import (
+    DatasetBand,
+    check_tile_size,
+    tile_windows,
+    window_inputs,
+    write_tile,
+)
 
+FUEL_INPUTS = ["coverage", "height", "distance", "water", "artificial"]
 
+FUEL_REFERENCES = ["tree_height", "understory", "distance_max", "distance_band"]
+
+FUEL_CODES = {"trees": 0, "shrubs": 1, "background": 2}
+
+# References That Change From One Scenario of a Sweep to Another
+SCENARIO_REFERENCES = ["tree_height", "understory"]
+
+FUEL_RULES = [
+    {"code": 98, "when": [("water", ">", 0)]},
+    {
+        "code": 91,
+        "when": [("artificial", ">", 0), ("distance", ">=", "distance_max")],
+    },
+    {"code": 99, "when": [("distance", ">=", "distance_max")]},
+    {"code": 224, "when": [("distance", ">=", "distance_band")]},
+    {
+        "code": "shrubs",
+        "when": [("height", ">=", "tree_height"), ("understory", ">", 100 / 3)],
+    },
+    {"code": "trees", "when": [("height", ">=", "tree_height")]},
+    {"code": "background", "when": []},
+]
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+@register_process(halo=None, releases_gil=True)
 def fuel(
     coverage: Union[Layer, np.ndarray],
     height: Union[Layer, np.ndarray],
@@ -17,9 +68,22 @@ def fuel(
     tree_height: float,
     alpha: Optional[Union[Layer, np.ndarray]] = None,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    rules: Optional[list] = None,
 ) -> Union[np.ndarray, Layer]:
     """Calculate the fuel map of the terrain based on defined fuel models.
 
+    The map is classified by a rule table, in which every pixel receives the code of the
+    first rule whose conditions all hold. Each rule is a dictionary with a 'code' and a
+    'when' list of conditions, which are (operand, operator, operand) tuples. Operands
+    are either input names (coverage, height, distance, water, artificial), references
+    computed from the inputs (tree_height, understory for the average sub-canopy
+    coverage, distance_max for the floor of the largest distance and distance_band for
+    the floor of 95% of it) or numbers. Codes are integers between 0 and 255 or the
+    names of the fuel models (trees, shrubs, background). The default table is
+    FUEL_RULES.
+
     Args:
       coverage:
         Layer data representing vegetation coverage of the terrain.
@@ -39,68 +103,617 @@ def fuel(
         Alpha layer. Defaults to None.
       as_array:
         If True, returns the distance field as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the coverage layer. Defaults to False.
+      rules:
+        Rule table of the classification. Defaults to None, in which case FUEL_RULES is
+        used.
+
+    Returns:
+      Fuel map, with unsigned 8-bit codes.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(coverage, height, distance, water, artificial, alpha)
+    destination = check_out(out, inplace, coverage)
+    layers = _check_inputs(coverage, height, distance, water, artificial)
+    _check_models(models)
+    _check_tree_height(tree_height)
+    if alpha is not None:
+        alpha = check_layer(alpha)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    table = _compile_rules(FUEL_RULES if rules is None else rules)
+
+    # Global Reductions Are Gathered Before Any Pixel Is Classified
+    statistics = _statistics(
+        layers["coverage"], layers["height"], layers["distance"], [tree_height]
+    )
+    references = _references(statistics, tree_height)
+
+    shape = layers["coverage"].shape
+    buffer = output_buffer(destination, shape, alpha, np.uint8)
+    result = result_view(buffer, shape, alpha)
+    if result is None:
+        result = np.zeros(shape, dtype=np.uint8)
+
+    _classify(layers, table, references, models, result)
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+@register_process(halo=None, releases_gil=True)
+def fuel_sweep(
+    coverage: Union[Layer, np.ndarray],
+    height: Union[Layer, np.ndarray],
+    distance: Union[Layer, np.ndarray],
+    water: Union[Layer, np.ndarray],
+    artificial: Union[Layer, np.ndarray],
+    models: list,
+    tree_heights: list,
+    alpha: Optional[Union[Layer, np.ndarray]] = None,
+    as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    rules: Optional[list] = None,
+) -> Union[np.ndarray, Layer]:
+    """Calculate the fuel maps of several scenarios in one call.
+
+    There is one scenario for every combination of tree height and fuel models.
+
+    Work shared by the scenarios is done once: the global reductions are gathered in a
+    single pass, the rules that don't depend on the scenario are classified once, the
+    remaining rules are classified once per tree height and every set of fuel models
+    only relabels that classification.
+
+    Args:
+      coverage:
+        Layer data representing vegetation coverage of the terrain.
+      height:
+        Layer data representing canopy height of the vegetation.
+      distance:
+        Layer data representing distance field of terrain features.
+      water:
+        Layer data representing water presence in the terrain.
+      artificial:
+        Layer data representing artificial structures in the terrain.
+      models:
+        List of tuples of integers representing the fuel models.
+      tree_heights:
+        List of tree heights.
+      alpha:
+        Alpha layer. Defaults to None.
+      as_array:
+        If True, returns the fuel maps as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the coverage layer. Defaults to False.
+      rules:
+        Rule table of the classification, as described in fuel. Defaults to None, in
+        which case FUEL_RULES is used.
+
+    Returns:
+      Stack of fuel maps, with unsigned 8-bit codes and one band per scenario, ordered
+      by tree height and then by fuel models.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(coverage, height, distance, water, artificial, alpha)
+    destination = check_out(out, inplace, coverage)
+    layers = _check_inputs(coverage, height, distance, water, artificial)
+    _check_scenarios(models, tree_heights)
+    if alpha is not None:
+        alpha = check_layer(alpha)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    table = _compile_rules(FUEL_RULES if rules is None else rules)
+
+    shape = layers["coverage"].shape + (len(models) * len(tree_heights),)
+    buffer = output_buffer(destination, shape, alpha, np.uint8)
+    result = result_view(buffer, shape, alpha)
+    if result is None:
+        result = np.empty(shape, dtype=np.uint8)
+
+    # Every Pixel Receives the Codes of All Fuel Models at Once
+    for start, (_, index, lut) in zip(
+        range(0, shape[-1], len(models)), _sweep(layers, table, models, tree_heights)
+    ):
+        result[..., start : start + len(models)] = lut[index]
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+def iter_fuel_sweep(
+    coverage: Union[Layer, np.ndarray],
+    height: Union[Layer, np.ndarray],
+    distance: Union[Layer, np.ndarray],
+    water: Union[Layer, np.ndarray],
+    artificial: Union[Layer, np.ndarray],
+    models: list,
+    tree_heights: list,
+    rules: Optional[list] = None,
+) -> Iterator[Tuple[float, tuple, np.ndarray]]:
+    """Stream the fuel maps of several scenarios one at a time.
+
+    The work shared by the scenarios is done once, as in fuel_sweep.
+
+    Args:
+      coverage:
+        Layer data representing vegetation coverage of the terrain.
+      height:
+        Layer data representing canopy height of the vegetation.
+      distance:
+        Layer data representing distance field of terrain features.
+      water:
+        Layer data representing water presence in the terrain.
+      artificial:
+        Layer data representing artificial structures in the terrain.
+      models:
+        List of tuples of integers representing the fuel models.
+      tree_heights:
+        List of tree heights.
+      rules:
+        Rule table of the classification, as described in fuel. Defaults to None, in
+        which case FUEL_RULES is used.
+
+    Returns:
+      Iterator of (tree height, fuel models, fuel map) tuples, ordered by tree height
+      and then by fuel models.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(coverage, height, distance, water, artificial)
+    layers = _check_inputs(coverage, height, distance, water, artificial)
+    _check_scenarios(models, tree_heights)
+    table = _compile_rules(FUEL_RULES if rules is None else rules)
+
+    return (
+        (tree_height, scenario, lut[index, band])
+        for tree_height, index, lut in _sweep(layers, table, models, tree_heights)
+        for band, scenario in enumerate(models)
+    )
+
+
+def fuel_tiled(
+    coverage: Union[Layer, np.ndarray, DatasetBand],
+    height: Union[Layer, np.ndarray, DatasetBand],
+    distance: Union[Layer, np.ndarray, DatasetBand],
+    water: Union[Layer, np.ndarray, DatasetBand],
+    artificial: Union[Layer, np.ndarray, DatasetBand],
+    models: Union[list, tuple[int, int, int]],
+    tree_height: float,
+    alpha: Optional[Union[Layer, np.ndarray, DatasetBand]] = None,
+    rules: Optional[list] = None,
+    tile_size: Union[int, Tuple[int, int]] = 512,
+    destination: Optional[Any] = None,
+    as_array: bool = False,
+) -> Any:
+    """Calculate the fuel map of the terrain tile by tile.
+
+    Memory is bounded by the tile size rather than by the size of the inputs.
+
+    The fuel map depends on reductions over the whole raster, so it is built in two
+    passes. The first pass gathers the reductions of every tile and merges them, and the
+    second one classifies every tile with the merged values and writes it into the
+    destination. The result is identical to fuel. Integer coverage is summed exactly;
+    floating-point coverage is summed with math.fsum over partial sums, so its average
+    can differ in the last bit, which only matters if it lies exactly on a rule
+    threshold.
+
+    Args:
+      coverage:
+        Layer data representing vegetation coverage of the terrain.
+      height:
+        Layer data representing canopy height of the vegetation.
+      distance:
+        Layer data representing distance field of terrain features.
+      water:
+        Layer data representing water presence in the terrain.
+      artificial:
+        Layer data representing artificial structures in the terrain.
+      models:
+        Tuple of integers representing the fuel models.
+      tree_height:
+        Height of the trees.
+      alpha:
+        Alpha layer. Defaults to None.
+      rules:
+        Rule table of the classification, as described in fuel. Defaults to None, in
+        which case FUEL_RULES is used.
+      tile_size:
+        Number of rows and columns of each tile, or a single value for square tiles.
+        Defaults to 512.
+      destination:
+        Layer, NumPy array (e.g. a memory map) or rasterio dataset opened for writing
+        that receives the result. Defaults to None, in which case the result is
+        allocated in memory.
+      as_array:
+        If True, returns the fuel map as a Numpy array when no destination is given.
+        Defaults to False.
 
     Returns:
-      Fuel map.
+      The destination if one was given. Otherwise, the fuel map as a Layer, or as a
+      NumPy array if as_array is True.
 
     Raises:
       TypeError:
         If inputs are not of the accepted type.
     """
-    coverage = check_layer(coverage)
-    height = check_layer(height)
-    distance = check_layer(distance)
-    water = check_layer(water)
-    artificial = check_layer(artificial)
+    # Data Validation
+    inputs = {
+        "coverage": coverage,
+        "height": height,
+        "distance": distance,
+        "water": water,
+        "artificial": artificial,
+    }
+    grid = check_alignment(*inputs.values(), alpha)
+    if grid is None:
+        raise TypeError(Errors.bad_input(name="inputs", expected_type="raster layers"))
+    _check_models(models)
+    _check_tree_height(tree_height)
+    check_tile_size(tile_size)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    table = _compile_rules(FUEL_RULES if rules is None else rules)
+    windows = list(tile_windows(grid.shape, tile_size))
+
+    # First Pass: Merge the Reductions of Every Tile, Which Only Need Three Inputs
+    parts = []
+    for window in windows:
+        parts.append(
+            _statistics(
+                *[
+                    check_layer(window_inputs(inputs[name], grid.shape, window))
+                    for name in ["coverage", "height", "distance"]
+                ],
+                [tree_height],
+            )
+        )
+    references = _references(_merge_statistics(parts), tree_height)
+
+    # Second Pass: Classify Every Tile With the Merged Reductions
+    target = destination.modify() if isinstance(destination, Layer) else destination
+    for window in windows:
+        layers = _check_inputs(**window_inputs(inputs, grid.shape, window))
+        tile = np.zeros(layers["coverage"].shape, dtype=np.uint8)
+        _classify(layers, table, references, models, tile)
+        if alpha is not None:
+            tile = stack_alpha(
+                tile, check_layer(window_inputs(alpha, grid.shape, window)), None
+            )
+        if target is None:
+            target = np.empty(grid.shape + tile.shape[2:], dtype=tile.dtype)
+        write_tile(target, window, tile)
+
+    if destination is not None:
+        if isinstance(destination, Layer):
+            destination.array = target
+        return destination
+    return target if as_array else Layer(target)
+
+
+def _check_inputs(
+    coverage: Union[Layer, np.ndarray],
+    height: Union[Layer, np.ndarray],
+    distance: Union[Layer, np.ndarray],
+    water: Union[Layer, np.ndarray],
+    artificial: Union[Layer, np.ndarray],
+) -> Dict[str, np.ndarray]:
+    # Arrays of the Fuel Inputs, by Name
+    return {
+        "coverage": check_layer(coverage),
+        "height": check_layer(height),
+        "distance": check_layer(distance),
+        "water": check_layer(water),
+        "artificial": check_layer(artificial),
+    }
+
+
+def _check_tree_height(tree_height: Any):
+    if not isinstance(tree_height, (float, int)):
+        raise TypeError(
+            Errors.bad_input(name="tree_height", expected_type="an int or float")
+        )
+
+
+def _check_scenarios(models: Any, tree_heights: Any):
+    if not isinstance(models, (list, tuple)) or len(models) == 0:
+        raise TypeError(
+            Errors.bad_input(
+                name="models", expected_type="a non-empty list of fuel model tuples"
+            )
+        )
+    for item in models:
+        _check_models(item)
+    if not isinstance(tree_heights, (list, tuple)) or len(tree_heights) == 0:
+        raise TypeError(
+            Errors.bad_input(name="tree_heights", expected_type="a non-empty list")
+        )
+    for item in tree_heights:
+        _check_tree_height(item)
+
+
+def _check_models(models: Any):
+    """
+    Check that the fuel models are three integer codes between 0 and 255.
+
+    Args:
+      models:
+        Fuel models to check.
+
+    Raises:
+      TypeError:
+        If the models are not valid.
+    """
     if models is None or not (
         isinstance(models, (list, tuple))
         and len(models) == 3
-        and all(isinstance(item, int) for item in models)
+        and all(isinstance(item, int) and 0 <= item <= 255 for item in models)
     ):
         raise TypeError(
             Errors.bad_input(
-                name="thresholds", expected_type="a tuple or list with three floats"
+                name="models",
+                expected_type="a tuple or list with three integers between 0 and 255",
             )
         )
-    if not isinstance(tree_height, (float, int)):
-        raise TypeError(
-            Errors.bad_input(name="tree_height", expected_type="an int or float")
+
+
+def _compile_rules(rules: list) -> List[Tuple[Union[int, str], list]]:
+    """
+    Check a fuel rule table and compile it into (code, conditions) pairs.
+
+    Operators are resolved to NumPy functions.
+
+    Args:
+      rules:
+        Rule table, as described in fuel.
+
+    Returns:
+      Compiled rule table.
+
+    Raises:
+      TypeError:
+        If the rule table is not valid.
+    """
+    error = TypeError(
+        Errors.bad_input(
+            name="rules",
+            expected_type=(
+                "a list of dictionaries with a 'code' and a 'when' list of"
+                " (operand, operator, operand) conditions"
+            ),
         )
-    if alpha is not None:
-        alpha = check_layer(alpha)
-    if not isinstance(as_array, bool):
-        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    )
+    if not isinstance(rules, (list, tuple)) or len(rules) == 0:
+        raise error
 
-    # Estimate Sub Layer Average
-    sub_coverage_average = np.mean(np.where(height < tree_height, coverage, 0))
+    operands = FUEL_INPUTS + FUEL_REFERENCES
+    table = []
+    for rule in rules:
+        if not isinstance(rule, dict) or set(rule) != {"code", "when"}:
+            raise error
+        code = rule["code"]
+        if isinstance(code, str):
+            if code not in FUEL_CODES:
+                raise error
+        elif (
+            isinstance(code, bool) or not isinstance(code, int) or not 0 <= code <= 255
+        ):
+            raise error
+        if not isinstance(rule["when"], (list, tuple)):
+            raise error
 
-    # Start With a Full Map
-    result = np.full(coverage.shape, models[2])
+        conditions = []
+        for condition in rule["when"]:
+            if not isinstance(condition, (list, tuple)) or len(condition) != 3:
+                raise error
+            left, operator, right = condition
+            if operator not in OPERATORS:
+                raise error
+            for operand in (left, right):
+                if isinstance(operand, str):
+                    if operand not in operands:
+                        raise error
+                elif isinstance(operand, bool) or not isinstance(operand, (int, float)):
+                    raise error
+            conditions.append((left, OPERATORS[operator], right))
+        table.append((code, conditions))
 
-    # Assign Leafy Vegetation Value (Trees)
-    if sub_coverage_average > (100 / 3):
-        result = np.where(height >= tree_height, models[1], result)  # Trees + Shrubbery
-    else:
-        result = np.where(height >= tree_height, models[0], result)  # Trees
-
-    # Assign Bare Soil
-    result = np.where(distance >= math.floor(distance.max()), 99, result)
-    result = np.where(
-        np.logical_and(
-            distance >= (math.floor(distance.max() * 0.95)),
-            distance < (math.floor(distance.max())),
+    return table
+
+
+def _sweep(
+    layers: Dict[str, np.ndarray],
+    table: list,
+    models: list,
+    tree_heights: list,
+) -> Iterator[Tuple[float, np.ndarray, np.ndarray]]:
+    # Classify Into Rule Positions, Which a Table per Set of Fuel Models Relabels
+    statistics = _statistics(
+        layers["coverage"], layers["height"], layers["distance"], tree_heights
+    )
+    unmatched = len(table)
+    positions = [
+        (position, conditions) for position, (_, conditions) in enumerate(table)
+    ]
+    split = next(
+        (
+            position
+            for position, (_, conditions) in enumerate(table)
+            if any(
+                operand in SCENARIO_REFERENCES
+                for left, _, right in conditions
+                for operand in (left, right)
+                if isinstance(operand, str)
+            )
         ),
-        224,
-        result,
+        unmatched,
     )
+    shape = layers["coverage"].shape
+    dtype = np.min_scalar_type(unmatched)
 
-    # Assign Artificial Structures
-    result = np.where(np.logical_and(artificial > 0, result == 99), 91, result)
+    # Rules Ahead of the First Scenario Dependent One Hold for Every Scenario
+    base = np.empty(shape, dtype=dtype)
+    _classify(
+        layers,
+        positions[:split] + [(unmatched, [])],
+        _references(statistics, tree_heights[0]),
+        None,
+        base,
+    )
+    claimed = base != unmatched
 
-    # Assign Water
-    result = np.where(water > 0, 98, result)
+    lut = np.zeros((unmatched + 1, len(models)), dtype=np.uint8)
+    for position, (code, _) in enumerate(table):
+        for band, scenario in enumerate(models):
+            lut[position, band] = (
+                scenario[FUEL_CODES[code]] if isinstance(code, str) else code
+            )
 
-    if alpha is not None:
-        result = np.dstack([result, alpha])
+    index = np.empty(shape, dtype=dtype)
+    for tree_height in tree_heights:
+        _classify(
+            layers,
+            positions[split:] + [(unmatched, [])],
+            _references(statistics, tree_height),
+            None,
+            index,
+        )
+        np.copyto(index, base, where=claimed)
+        yield tree_height, index, lut
+
+
+def _statistics(
+    coverage: np.ndarray,
+    height: np.ndarray,
+    distance: np.ndarray,
+    tree_heights: list,
+) -> Dict[str, Any]:
+    # Global Reductions, With Partial Sums of the Sub-Canopy Coverage per Tree Height
+    sums = {value: [] for value in tree_heights}
+    for block in row_blocks(coverage.shape):
+        for value, parts in sums.items():
+            parts.append(np.sum(coverage[block], where=height[block] < value).item())
+    return {"count": coverage.size, "distance_max": distance.max(), "sums": sums}
+
+
+def _merge_statistics(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Reductions of a Raster From Those of Its Tiles
+    return {
+        "count": sum(part["count"] for part in parts),
+        "distance_max": max(part["distance_max"] for part in parts),
+        "sums": {
+            value: [item for part in parts for item in part["sums"][value]]
+            for value in parts[0]["sums"]
+        },
+    }
+
+
+def _references(statistics: Dict[str, Any], tree_height: float) -> Dict[str, Any]:
+    # Integer Coverage Is Summed Exactly, and Floating-Point Coverage With fsum
+    parts = statistics["sums"][tree_height]
+    if all(isinstance(item, int) for item in parts):
+        total = sum(parts)
+    else:
+        total = math.fsum(parts)
+    return {
+        "tree_height": tree_height,
+        "understory": total / statistics["count"],
+        "distance_max": math.floor(statistics["distance_max"]),
+        "distance_band": math.floor(statistics["distance_max"] * 0.95),
+    }
+
+
+def _classify(
+    layers: Dict[str, np.ndarray],
+    table: list,
+    references: Dict[str, Any],
+    models: Union[list, tuple],
+    result: np.ndarray,
+):
+    """
+    Classify fuel inputs with a compiled rule table into a result array.
+
+    Blocks of rows are classified in turn, evaluating every rule on a block before
+    moving to the next one, so the inputs are read once and only two block-sized masks
+    are allocated.
+
+    Args:
+      layers:
+        Dictionary with the coverage, height, distance, water and artificial arrays.
+      table:
+        Rule table returned by _compile_rules.
+      references:
+        Reference values returned by _references.
+      models:
+        Fuel models, which give the codes of named rules.
+      result:
+        Array that receives the codes, with the shape of the inputs.
+    """
+    table = _resolve_rules(table, references, models)
+
+    rows = block_rows(result.shape)
+    mask = np.empty((rows,) + result.shape[1:], dtype=bool)
+    scratch = np.empty_like(mask)
+
+    for block in row_blocks(result.shape, rows):
+        target = result[block]
+        size = target.shape[0]
+
+        # Rules Are Written From Lowest to Highest Priority, So the First Match Wins
+        for code, conditions in reversed(table):
+            if len(conditions) == 0:
+                target[...] = code
+                continue
+            for position, (left, operator, right) in enumerate(conditions):
+                left = layers[left][block] if isinstance(left, str) else left
+                right = layers[right][block] if isinstance(right, str) else right
+                if position == 0:
+                    operator(left, right, out=mask[:size])
+                else:
+                    operator(left, right, out=scratch[:size])
+                    mask[:size] &= scratch[:size]
+            np.copyto(target, code, where=mask[:size], casting="unsafe")
+
+
+def _resolve_rules(table: list, references: Dict[str, Any], models: Union[list, tuple]):
+    # Replace References With Their Values and Settle Conditions Without Inputs
+    resolved = []
+    for code, conditions in table:
+        if isinstance(code, str):
+            code = models[FUEL_CODES[code]]
 
-    return result if as_array else Layer(result)
+        remaining = []
+        matches = True
+        for left, operator, right in conditions:
+            left = references.get(left, left)
+            right = references.get(right, right)
+            if left in FUEL_INPUTS or right in FUEL_INPUTS:
+                remaining.append((left, operator, right))
+            elif not operator(left, right):
+                matches = False
+        if matches:
+            resolved.append((code, remaining))
+            # Rules Below One Without Conditions Can Never Match
+            if len(remaining) == 0:
+                break
+    return resolved
@@ -2,15 +2,28 @@ from typing import Optional, Union
 
 import numpy as np
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.precision import cast, check_precision
+from rforge.library.tools.registry import register_process
 
 
+@register_process(halo=0, releases_gil=True)
 def height(
     dtm: Union[Layer, np.ndarray],
     dsm: Union[Layer, np.ndarray],
     alpha: Optional[Union[Layer, np.ndarray]] = None,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
 ) -> Union[np.ndarray, Layer]:
     """Calculate the height difference between the Digital Terrain Model (DTM) and the Digital Surface Model (DSM).
 
@@ -23,6 +36,14 @@ def height(
         Alpha layer. Defaults to None.
       as_array:
         If True, returns the distance field as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the DTM input. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
 
     Returns:
       Height difference raster map.
@@ -32,16 +53,18 @@ def height(
         If inputs are not of the accepted type.
     """
     # Data Validation
-    dtm = check_layer(dtm)
-    dsm = check_layer(dsm)
+    check_alignment(dtm, dsm, alpha)
+    destination = check_out(out, inplace, dtm)
+    dtype = check_precision(precision)
+    dtm = cast(check_layer(dtm), dtype)
+    dsm = cast(check_layer(dsm), dtype)
     if alpha is not None:
-        alpha = check_layer(alpha)
+        alpha = cast(check_layer(alpha), dtype)
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
 
-    result = dsm - dtm
+    buffer = output_buffer(destination, dtm.shape, alpha, np.result_type(dsm, dtm))
+    result = np.subtract(dsm, dtm, out=result_view(buffer, dtm.shape, alpha))
+    result = stack_alpha(result, alpha, buffer)
 
-    if alpha is not None:
-        result = np.dstack([result, alpha])
-
-    return result if as_array else Layer(result)
+    return deliver(result, destination, as_array)
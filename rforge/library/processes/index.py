@@ -1,12 +1,29 @@
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
 import numpy as np
 import spyndex
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.blocks import block_rows, row_blocks
+from rforge.library.tools.classification import check_breaks, classify
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.formulas import (
+    FormulaPlan,
+    compile_formulas,
+    evaluate_formulas,
+)
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.precision import cast, check_precision
+from rforge.library.tools.registry import register_process
 
 
+@register_process(halo=0, releases_gil=True)
 def index(
     index_id: str,
     parameters: dict,
@@ -14,15 +31,26 @@ def index(
     thresholds: Optional[Union[list, tuple]] = None,
     binarize: bool = False,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
+    scales: Optional[dict] = None,
+    offsets: Optional[dict] = None,
+    breaks: Optional[Union[list, tuple]] = None,
 ) -> Union[np.ndarray, Layer]:
     """
     Compute an index from the input parameters.
 
+    The formula of the index is compiled once and evaluated in blocks of pixels, in the
+    floating-point precision of the computation. Divisions by zero and other non-finite
+    values result in 0.
+
     Args:
       index_id:
         Identifier of index to compute
       parameters:
-        Dictionary of parameters required for index computation.
+        Dictionary of parameters required for index computation, with a raster for each
+        band and a number for each constant.
       alpha:
         Alpha layer. Defaults to None.
       thresholds:
@@ -31,6 +59,24 @@ def index(
         If True, binarize the result based on the thresholds defined. Defaults to False.
       as_array:
         If True, return the result as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the first raster parameter. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
+      scales:
+        Dictionary with the factor each raster parameter is multiplied by, such as the
+        reflectance scale of integer digital numbers. Defaults to None.
+      offsets:
+        Dictionary with the value added to each raster parameter after scaling. Defaults
+        to None.
+      breaks:
+        Strictly increasing list of class breaks. If given, the index is classified into
+        uint8 class codes in the same pass, from 0 below the first break to len(breaks)
+        at or above the last one. Defaults to None.
 
     Returns:
       Computed index as a numpy array.
@@ -40,11 +86,26 @@ def index(
         If inputs are not of the accepted type.
     """
     # Data Validation
-    for key, value in parameters.items():
-        aux_value = check_layer(value)
-        parameters[key] = aux_value
+    check_alignment(*parameters.values(), alpha)
+    destination = check_out(
+        out,
+        inplace,
+        next(
+            (
+                value
+                for value in parameters.values()
+                if isinstance(value, (Layer, np.ndarray))
+            ),
+            None,
+        ),
+    )
+    dtype = check_precision(precision)
+    _check_index_id(index_id, "index_id")
+    arrays, values = _check_parameters(parameters)
+    _check_scaling(scales, "scales", arrays)
+    _check_scaling(offsets, "offsets", arrays)
     if alpha is not None:
-        alpha = check_layer(alpha)
+        alpha = cast(check_layer(alpha), dtype)
     if thresholds is not None:
         if thresholds is not None and not (
             isinstance(thresholds, (list, tuple))
@@ -54,25 +115,283 @@ def index(
         ):
             raise TypeError(
                 Errors.bad_input(
-                    name="thresholds", expected_type="a tuple with two numericalw"
+                    name="thresholds", expected_type="a tuple with two numerical values"
                 )
             )
     if not isinstance(binarize, bool):
         raise TypeError(Errors.bad_input(name="binarize", expected_type="a boolean"))
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    if breaks is not None:
+        if thresholds is not None:
+            raise TypeError(
+                Errors.bad_input(
+                    name="breaks", expected_type="None when thresholds are given"
+                )
+            )
+        breaks = check_breaks(breaks)
+
+    plan, shape, dtype = _plan([index_id], arrays, values, dtype)
+
+    buffer = output_buffer(
+        destination,
+        shape,
+        alpha,
+        (
+            np.uint8
+            if breaks is not None
+            else int if binarize and thresholds is not None else dtype
+        ),
+    )
+    target = result_view(buffer, shape, alpha)
 
-    result = spyndex.computeIndex([index_id], parameters)
-    result = np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
+    if breaks is not None:
+        result = _classify(plan, values, shape, dtype, breaks, target, scales, offsets)
+        result = stack_alpha(result, alpha, buffer)
+        return deliver(result, destination, as_array)
+
+    # Evaluate Straight Into the Output When No Thresholds Apply
+    if thresholds is None and target is not None and target.dtype == dtype:
+        result = target
+    else:
+        result = np.empty(shape, dtype)
+    evaluate_formulas(plan, values, result, scales, offsets)
 
     if thresholds is not None:
         if binarize:
-            mask = np.logical_and(result >= thresholds[0], result <= thresholds[1])
-            result = np.where(mask, 1, 0)
+            mask = result >= thresholds[0]
+            mask &= result <= thresholds[1]
+            if target is None:
+                result = np.where(mask, 1, 0)
+            else:
+                np.copyto(target, mask, casting="unsafe")
+                result = target
         else:
-            result = np.clip(result, thresholds[0], thresholds[1])
+            result = np.clip(
+                result,
+                thresholds[0],
+                thresholds[1],
+                out=result if target is None else target,
+            )
+    elif target is not None and target is not result:
+        np.copyto(target, result, casting="same_kind")
+        result = target
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
 
+
+@register_process(halo=0, releases_gil=True)
+def index_batch(
+    index_ids: Union[list[str], tuple[str, ...]],
+    parameters: dict,
+    alpha: Optional[Union[Layer, np.ndarray]] = None,
+    as_array: bool = False,
+    as_dict: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    precision: Optional[str] = None,
+    scales: Optional[dict] = None,
+    offsets: Optional[dict] = None,
+) -> Union[np.ndarray, Layer, dict]:
+    """
+    Compute several indices from the same input parameters in a single pass.
+
+    The formulas of all indices are compiled together, so every band is validated and
+    read once per block of pixels, and subexpressions shared between indices, such as
+    N+R in NDVI and SAVI, are computed once.
+
+    Args:
+      index_ids:
+        List of identifiers of the indices to compute.
+      parameters:
+        Dictionary of parameters required for the computation of every index, with a
+        raster for each band and a number for each constant.
+      alpha:
+        Alpha layer. Defaults to None.
+      as_array:
+        If True, return the result as a Numpy array. Defaults to False.
+      as_dict:
+        If True, return a dictionary with the result of each index, alpha included.
+        Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with one band per index plus the
+        alpha band. Defaults to None.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
+      scales:
+        Dictionary with the factor each raster parameter is multiplied by, such as the
+        reflectance scale of integer digital numbers. Defaults to None.
+      offsets:
+        Dictionary with the value added to each raster parameter after scaling. Defaults
+        to None.
+
+    Returns:
+      Computed indices, one per band and in order, or a dictionary of computed indices
+      by identifier.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(*parameters.values(), alpha)
+    destination = check_out(out, False, None)
+    dtype = check_precision(precision)
+    if not isinstance(index_ids, (list, tuple)) or len(index_ids) == 0:
+        raise TypeError(
+            Errors.bad_input(
+                name="index_ids", expected_type="a non-empty list of index identifiers"
+            )
+        )
+    for index_id in index_ids:
+        _check_index_id(index_id, "index_ids")
+    arrays, values = _check_parameters(parameters)
+    _check_scaling(scales, "scales", arrays)
+    _check_scaling(offsets, "offsets", arrays)
     if alpha is not None:
-        result = np.dstack([result, alpha])
+        alpha = cast(check_layer(alpha), dtype)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    if not isinstance(as_dict, bool):
+        raise TypeError(Errors.bad_input(name="as_dict", expected_type="a boolean"))
+    if as_dict and out is not None:
+        raise TypeError(
+            Errors.bad_input(name="out", expected_type="None when as_dict is True")
+        )
+
+    plan, shape, dtype = _plan(index_ids, arrays, values, dtype)
+    shape = shape + (len(index_ids),)
+    buffer = output_buffer(destination, shape, alpha, dtype)
+    target = result_view(buffer, shape, alpha)
+
+    if target is not None and target.dtype == dtype:
+        result = target
+    else:
+        result = np.empty(shape, dtype)
+    evaluate_formulas(
+        plan,
+        values,
+        result[:, :, 0] if len(index_ids) == 1 else result,
+        scales,
+        offsets,
+    )
+    if target is not None and target is not result:
+        np.copyto(target, result, casting="same_kind")
+        result = target
+
+    if as_dict:
+        results = {}
+        for band, index_id in enumerate(index_ids):
+            item = stack_alpha(result[:, :, band], alpha, None)
+            results[index_id] = item if as_array else Layer(item)
+        return results
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+def _check_parameters(parameters: dict) -> Tuple[dict, dict]:
+    # Split Parameters Into Validated Bands and Numeric Scalars
+    if not isinstance(parameters, dict):
+        raise TypeError(
+            Errors.bad_input(name="parameters", expected_type="a dictionary")
+        )
+    arrays, values = {}, {}
+    for key, value in parameters.items():
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            values[key] = value
+        else:
+            arrays[key] = check_layer(value)
+    if len(arrays) == 0:
+        raise TypeError(
+            Errors.bad_input(
+                name="parameters", expected_type="a dictionary with at least one band"
+            )
+        )
+    return arrays, values
+
+
+def _check_scaling(scaling: Optional[dict], name: str, arrays: dict):
+    # Scales and Offsets Map Raster Parameters to Numbers
+    if scaling is not None and not (
+        isinstance(scaling, dict)
+        and all(key in arrays for key in scaling)
+        and all(
+            isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+            for value in scaling.values()
+        )
+    ):
+        raise TypeError(
+            Errors.bad_input(
+                name=name,
+                expected_type="a dictionary of numeric values by raster parameter",
+            )
+        )
+
+
+def _check_names(plan: FormulaPlan, values: dict):
+    # Every Scalar of the Formulas Must Be a Numeric Parameter
+    missing = [name for name in plan.scalars if name not in values]
+    if len(missing) > 0:
+        raise TypeError(
+            Errors.bad_input(
+                name="parameters",
+                provided_type=f"missing {', '.join(missing)}",
+                expected_type="a dictionary with every parameter of the index",
+            )
+        )
+
+
+def _check_index_id(index_id: str, name: str):
+    # Identifiers Must Name a spyndex Index
+    if not isinstance(index_id, str) or index_id not in spyndex.indices:
+        raise TypeError(
+            Errors.bad_input(
+                name=name, expected_type="the identifier of a spyndex index"
+            )
+        )
+
+
+def _plan(
+    index_ids: list[str], arrays: dict, values: dict, dtype: Optional[np.dtype]
+) -> Tuple[FormulaPlan, Tuple[int, ...], np.dtype]:
+    # Compile the Formulas and Resolve the Shape and Data Type of the Result
+    plan = compile_formulas(
+        tuple(spyndex.indices[index_id].formula for index_id in index_ids),
+        tuple(sorted(arrays)),
+    )
+    _check_names(plan, values)
+    shape = np.broadcast_shapes(*[array.shape for array in arrays.values()])
+    if dtype is None:
+        dtype = np.result_type(*arrays.values())
+        dtype = dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+    values.update({key: np.broadcast_to(array, shape) for key, array in arrays.items()})
+    return plan, shape, dtype
+
 
-    return result if as_array else Layer(result)
+def _classify(
+    plan: FormulaPlan,
+    values: dict,
+    shape: Tuple[int, ...],
+    dtype: np.dtype,
+    breaks: np.ndarray,
+    target: Optional[np.ndarray],
+    scales: Optional[dict],
+    offsets: Optional[dict],
+) -> np.ndarray:
+    # Evaluate the Index in Chunks of Rows and Classify Each Chunk
+    result = np.empty(shape, np.uint8) if target is None else target
+    rows = block_rows(shape)
+    scratch = np.empty((rows,) + shape[1:], dtype)
+    for block in row_blocks(shape, rows):
+        chunk = {
+            key: value[block] if np.ndim(value) > 0 else value
+            for key, value in values.items()
+        }
+        field = scratch[: block.stop - block.start]
+        evaluate_formulas(plan, chunk, field, scales, offsets)
+        classify(field, breaks, out=result[block])
+    return result
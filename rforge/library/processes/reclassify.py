@@ -0,0 +1,71 @@
+from typing import Optional, Union
+
+import numpy as np
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.classification import check_breaks, classify
+from rforge.library.tools.data_validation import check_alignment, check_layer
+from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.registry import register_process
+
+
+@register_process(halo=0, releases_gil=True)
+def reclassify(
+    layer: Union[Layer, np.ndarray],
+    breaks: Union[list, tuple],
+    alpha: Optional[Union[Layer, np.ndarray]] = None,
+    as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+) -> Union[np.ndarray, Layer]:
+    """Classify a layer into uint8 class codes delimited by a list of breaks.
+
+    The layer is classified in a single pass.
+
+    Values below the first break are in class 0, values between the i-th and the next
+    break are in class i, and values at or above the last break are in class
+    len(breaks). NaN values are in class 0.
+
+    Args:
+      layer:
+        Layer data to classify.
+      breaks:
+        Strictly increasing list of up to 255 class breaks.
+      alpha:
+        Alpha layer. Defaults to None.
+      as_array:
+        If True, returns the class codes as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the input layer. Defaults to False.
+
+    Returns:
+      Class code layer.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(layer, alpha)
+    destination = check_out(out, inplace, layer)
+    array = check_layer(layer)
+    if alpha is not None:
+        alpha = check_layer(alpha)
+    breaks = check_breaks(breaks)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+
+    buffer = output_buffer(destination, array.shape, alpha, np.uint8)
+    result = classify(array, breaks, out=result_view(buffer, array.shape, alpha))
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
@@ -1,16 +1,30 @@
-from typing import Optional, Union
+import math
+from typing import Optional, Sequence, Union
 
 import numpy as np
 from rforge.library.containers.layer import Layer
-from rforge.library.tools.data_validation import check_layer
+from rforge.library.tools.data_validation import check_alignment, check_layer
 from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import (
+    check_out,
+    deliver,
+    output_buffer,
+    result_view,
+    stack_alpha,
+)
+from rforge.library.tools.precision import cast, check_precision
+from rforge.library.tools.registry import register_process
 
 
+@register_process(halo=1, releases_gil=True)
 def slope(
     dem: Union[Layer, np.ndarray],
     units: str = "degrees",
     alpha: Optional[Union[Layer, np.ndarray]] = None,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
 ) -> Union[np.ndarray, Layer]:
     """Calculate the slope of a terrain based on a Digital Elevation Model (DEM).
 
@@ -23,6 +37,14 @@ def slope(
         Alpha layer. Defaults to None.
       as_array:
         If True, return the result as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the DEM input. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
 
     Returns:
       Slope map in the desired unit.
@@ -31,9 +53,13 @@ def slope(
       TypeError:
         If inputs are not of the accepted type.
     """
-    array = check_layer(dem)
+    # Data Validation
+    check_alignment(dem, alpha)
+    destination = check_out(out, inplace, dem)
+    dtype = check_precision(precision)
+    array = cast(check_layer(dem), dtype)
     if alpha is not None:
-        alpha = check_layer(alpha)
+        alpha = cast(check_layer(alpha), dtype)
     if units not in ["degrees", "radians"]:
         raise TypeError(
             Errors.bad_input(name="units", expected_type="'degrees' or 'radians'")
@@ -41,27 +67,33 @@ def slope(
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
 
-    result = np.arctan(
-        np.sqrt(
-            np.power(np.gradient(array, axis=(0, 1))[0], 2)
-            + np.power(np.gradient(array, axis=(0, 1))[1], 2)
-        )
-    )
+    buffer = output_buffer(destination, array.shape, alpha, _gradient_type(array))
+
+    # Gradient Temporaries Are Reused for the Intermediate Results
+    gradient_y, gradient_x = np.gradient(array, axis=(0, 1))
+    np.power(gradient_y, 2, out=gradient_y)
+    np.power(gradient_x, 2, out=gradient_x)
+    np.add(gradient_y, gradient_x, out=gradient_y)
+    np.sqrt(gradient_y, out=gradient_y)
+    result = np.arctan(gradient_y, out=result_view(buffer, array.shape, alpha))
 
     if units == "degrees":
-        result = np.degrees(result)
+        np.degrees(result, out=result)
 
-    if alpha is not None:
-        result = np.dstack([result, alpha])
+    result = stack_alpha(result, alpha, buffer)
 
-    return result if as_array else Layer(result)
+    return deliver(result, destination, as_array)
 
 
+@register_process(halo=1, releases_gil=True)
 def aspect(
     dem: Union[Layer, np.ndarray],
     units: str = "degrees",
     alpha: Optional[Union[Layer, np.ndarray]] = None,
     as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
 ) -> Union[np.ndarray, Layer]:
     """Calculate the aspect of a terrain slope based on a Digital Elevation Model (DEM).
 
@@ -74,13 +106,25 @@ def aspect(
         Alpha layer. Defaults to None.
       as_array:
         If True, return the result as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the DEM input. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
 
     Returns:
       Aspect map in the desired unit.
     """
-    array = check_layer(dem)
+    # Data Validation
+    check_alignment(dem, alpha)
+    destination = check_out(out, inplace, dem)
+    dtype = check_precision(precision)
+    array = cast(check_layer(dem), dtype)
     if alpha is not None:
-        alpha = check_layer(alpha)
+        alpha = cast(check_layer(alpha), dtype)
     if units not in ["degrees", "radians"]:
         raise TypeError(
             Errors.bad_input(name="units", expected_type="'degrees' or 'radians'")
@@ -88,12 +132,210 @@ def aspect(
     if not isinstance(as_array, bool):
         raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
 
-    result = np.arctan2(-np.gradient(array, axis=0), np.gradient(array, axis=1))
+    buffer = output_buffer(destination, array.shape, alpha, _gradient_type(array))
+
+    gradient_y, gradient_x = np.gradient(array, axis=(0, 1))
+    result = np.arctan2(
+        np.negative(gradient_y, out=gradient_y),
+        gradient_x,
+        out=result_view(buffer, array.shape, alpha),
+    )
 
     if units == "degrees":
-        result = np.degrees(result)
+        np.degrees(result, out=result)
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
+
+TERRAIN_OUTPUTS = ["slope", "aspect", "hillshade", "curvature", "roughness"]
+
+
+@register_process(halo=1, releases_gil=True)
+def terrain(
+    dem: Union[Layer, np.ndarray],
+    outputs: Sequence[str] = ("slope", "aspect"),
+    method: str = "horn",
+    units: str = "degrees",
+    azimuth: Union[int, float] = 315,
+    altitude: Union[int, float] = 45,
+    alpha: Optional[Union[Layer, np.ndarray]] = None,
+    as_array: bool = False,
+    out: Optional[Union[Layer, np.ndarray]] = None,
+    inplace: bool = False,
+    precision: Optional[str] = None,
+) -> Union[np.ndarray, Layer]:
+    """Calculate several terrain features of a Digital Elevation Model (DEM) at once.
+
+    The 3x3 neighbourhood of every cell is read once and the surface gradients are
+    derived from it with the Horn or Zevenbergen-Thorne stencil, using the pixel
+    resolution of the DEM transform (or 1 if the DEM has no transform). Cells on the
+    border of the DEM use their nearest neighbour for the missing cells.
+
+    The features are:
+      - slope: Steepest angle of the surface.
+      - aspect: Compass direction the surface faces, clockwise from north.
+      - hillshade: Illumination of the surface (0 to 255) by a light at the given
+        azimuth and altitude.
+      - curvature: Zevenbergen-Thorne curvature, positive where the surface is convex.
+      - roughness: Largest elevation difference in the neighbourhood.
+
+    Args:
+      dem:
+        Digital elevation model data representing the terrain.
+      outputs:
+        Features to compute, in the order of the result bands. Can include 'slope',
+        'aspect', 'hillshade', 'curvature' and 'roughness'. Defaults to ('slope',
+        'aspect').
+      method:
+        Stencil used for the gradients. Can be 'horn' or 'zevenbergen-thorne'. Defaults
+        to 'horn'.
+      units:
+        Units for the slope and aspect. Can be 'degrees' or 'radians'. Defaults to
+        'degrees'.
+      azimuth:
+        Compass direction of the light source used for the hillshade, in degrees.
+        Defaults to 315.
+      altitude:
+        Angle of the light source above the horizon used for the hillshade, in degrees.
+        Defaults to 45.
+      alpha:
+        Alpha layer. Defaults to None.
+      as_array:
+        If True, return the result as a Numpy array. Defaults to False.
+      out:
+        Layer or NumPy array that receives the result, with the shape of the result.
+        Defaults to None.
+      inplace:
+        If True, writes the result into the DEM input. Defaults to False.
+      precision:
+        Floating-point precision of the computation, 'float32' or 'float64'. Defaults to
+        None, in which case the global precision is used.
 
+    Returns:
+      Terrain map with one band per requested feature. A single feature gives a
+      single-band map.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    # Data Validation
+    check_alignment(dem, alpha)
+    destination = check_out(out, inplace, dem)
+    dtype = check_precision(precision)
+    array = cast(check_layer(dem), dtype)
     if alpha is not None:
-        result = np.dstack([result, alpha])
+        alpha = cast(check_layer(alpha), dtype)
+    if not (
+        isinstance(outputs, (list, tuple))
+        and len(outputs) > 0
+        and len(set(outputs)) == len(outputs)
+        and all(output in TERRAIN_OUTPUTS for output in outputs)
+    ):
+        raise TypeError(
+            Errors.bad_input(
+                name="outputs",
+                expected_type=f"a list of unique features among {TERRAIN_OUTPUTS}",
+            )
+        )
+    if method not in ["horn", "zevenbergen-thorne"]:
+        raise TypeError(
+            Errors.bad_input(
+                name="method", expected_type="'horn' or 'zevenbergen-thorne'"
+            )
+        )
+    if units not in ["degrees", "radians"]:
+        raise TypeError(
+            Errors.bad_input(name="units", expected_type="'degrees' or 'radians'")
+        )
+    if not all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for value in [azimuth, altitude]
+    ):
+        raise TypeError(
+            Errors.bad_input(name="azimuth and altitude", expected_type="numbers")
+        )
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+
+    # Pixel Resolution
+    x_resolution, y_resolution = 1.0, 1.0
+    if isinstance(dem, Layer) and dem.transform is not None:
+        x_resolution, y_resolution = abs(dem.transform[1]), abs(dem.transform[5])
+
+    # Neighbourhood (Rows Grow Southwards, Columns Grow Eastwards)
+    padded = np.pad(
+        array.astype(np.float64 if dtype is None else dtype, copy=False), 1, mode="edge"
+    )
+    a, b, c = padded[:-2, :-2], padded[:-2, 1:-1], padded[:-2, 2:]
+    d, e, f = padded[1:-1, :-2], padded[1:-1, 1:-1], padded[1:-1, 2:]
+    g, h, i = padded[2:, :-2], padded[2:, 1:-1], padded[2:, 2:]
+
+    # Gradients
+    if method == "horn":
+        gradient_x = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * x_resolution)
+        gradient_y = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * y_resolution)
+    else:
+        gradient_x = (f - d) / (2 * x_resolution)
+        gradient_y = (h - b) / (2 * y_resolution)
+
+    features = {}
+    if "slope" in outputs or "hillshade" in outputs:
+        features["slope"] = np.arctan(np.hypot(gradient_x, gradient_y))
+    if "aspect" in outputs or "hillshade" in outputs:
+        features["aspect"] = np.mod(np.arctan2(-gradient_x, gradient_y), 2 * np.pi)
+
+    if "hillshade" in outputs:
+        zenith = math.radians(90 - altitude)
+        features["hillshade"] = 255 * np.clip(
+            math.cos(zenith) * np.cos(features["slope"])
+            + math.sin(zenith)
+            * np.sin(features["slope"])
+            * np.cos(math.radians(azimuth) - features["aspect"]),
+            0,
+            1,
+        )
+    if "curvature" in outputs:
+        features["curvature"] = -2 * (
+            ((d + f) / 2 - e) / x_resolution**2 + ((b + h) / 2 - e) / y_resolution**2
+        )
+    if "roughness" in outputs:
+        neighbourhood = [a, b, c, d, e, f, g, h, i]
+        features["roughness"] = np.maximum.reduce(neighbourhood) - np.minimum.reduce(
+            neighbourhood
+        )
+
+    if units == "degrees":
+        for feature in ["slope", "aspect"]:
+            if feature in features:
+                features[feature] = np.degrees(features[feature])
+
+    shape = array.shape[:2] if len(outputs) == 1 else array.shape[:2] + (len(outputs),)
+    buffer = output_buffer(destination, shape, alpha, padded.dtype)
+
+    if buffer is None:
+        result = (
+            features[outputs[0]]
+            if len(outputs) == 1
+            else np.dstack([features[output] for output in outputs])
+        )
+    else:
+        result = result_view(buffer, shape, alpha)
+        for band, output in enumerate(outputs):
+            if len(outputs) == 1:
+                result[...] = features[output]
+            else:
+                result[:, :, band] = features[output]
+
+    result = stack_alpha(result, alpha, buffer)
+
+    return deliver(result, destination, as_array)
+
 
-    return result if as_array else Layer(result)
+def _gradient_type(array: np.ndarray) -> np.dtype:
+    # NumPy Gradients of Integer Data Are float64
+    if np.issubdtype(array.dtype, np.floating):
+        return array.dtype
+    return np.dtype(np.float64)
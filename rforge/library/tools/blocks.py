@@ -0,0 +1,41 @@
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+BLOCK_SIZE = 1 << 16
+
+
+def block_rows(shape: Tuple[int, ...]) -> int:
+    """
+    Get the number of whole rows of an array that hold about BLOCK_SIZE elements.
+
+    Args:
+      shape:
+        Shape of the array.
+
+    Returns:
+      The number of rows of each block, at least 1.
+    """
+    return max(1, BLOCK_SIZE // max(1, int(np.prod(shape[1:]))))
+
+
+def row_blocks(shape: Tuple[int, ...], rows: Optional[int] = None) -> Iterator[slice]:
+    """
+    Iterate over an array one block of whole rows at a time.
+
+    Processes that work block by block keep their temporary arrays block-sized, so
+    they stay in cache and no full-size temporary array is allocated.
+
+    Args:
+      shape:
+        Shape of the array.
+      rows:
+        Number of rows of each block. Defaults to None, in which case it is given by
+        block_rows.
+
+    Yields:
+      Slices of the rows of each block. The last block can be shorter than the others.
+    """
+    rows = block_rows(shape) if rows is None else rows
+    for start in range(0, shape[0], rows):
+        yield slice(start, min(start + rows, shape[0]))
@@ -0,0 +1,549 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from importlib import metadata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.precision import get_precision
+
+
+class ResultCache:
+    """Represents an in-memory cache of process results with LRU eviction.
+
+    Results are stored as private read-only copies, so the result handed to the caller
+    that computed it stays writable, and are counted by the size of their pixel data.
+    When the memory budget is exceeded, the least recently used results are evicted.
+
+    Attributes:
+        _max_bytes (int): Memory budget of the cache, in bytes.
+        _entries (OrderedDict[str, Union[np.ndarray, Layer]]): Cached results, from
+            least to most recently used.
+        _sizes (Dict[str, int]): Size of each cached result, in bytes.
+        _bytes (int): Total size of the cached results, in bytes.
+        _hits (int): Number of lookups that found a result.
+        _misses (int): Number of lookups that found no result.
+        _evictions (int): Number of results evicted to respect the budget.
+        _lock (threading.Lock): Lock guarding the cache state.
+
+    Methods:
+        __init__: Initializes a ResultCache instance.
+        __len__: Returns the number of cached results.
+        get: Looks up a result.
+        put: Stores a result.
+        clear: Removes all results and resets the statistics.
+        max_bytes: Getter and setter for the memory budget.
+        stats: Getter for the cache statistics.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2):
+        self._entries: "OrderedDict[str, Union[np.ndarray, Layer]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Union[np.ndarray, Layer]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return value.copy() if isinstance(value, Layer) else value
+
+    def put(self, key: str, value: Union[np.ndarray, Layer]):
+        size = _size(value)
+        if size > self._max_bytes:
+            return
+
+        stored = _private(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._sizes[key]
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        if not (isinstance(value, int) and value >= 0):
+            raise TypeError(
+                Errors.bad_input(
+                    name="max_bytes", expected_type="a non-negative integer"
+                )
+            )
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+            }
+
+    def _evict(self):
+        while self._bytes > self._max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self._evictions += 1
+
+
+class DiskCache:
+    """Represents a persistent, content-addressed cache of process results on disk.
+
+    Each result is stored as a compressed NumPy archive named after the fingerprint of
+    the call and the library version. Files are written to a temporary name and moved
+    into place atomically, so several processes can share a directory: readers never see
+    partial files and concurrent writes of the same result are harmless. When the size
+    cap is exceeded, the least recently used files are removed.
+
+    Attributes:
+        _directory (str): Directory holding the cached results.
+        _max_bytes (int): Size cap of the directory, in bytes.
+        _hits (int): Number of lookups that found a result in this process.
+        _misses (int): Number of lookups that found no result in this process.
+        _evictions (int): Number of results evicted by this process.
+        _lock (threading.Lock): Lock guarding the statistics.
+
+    Methods:
+        __init__: Initializes a DiskCache instance.
+        __len__: Returns the number of cached results.
+        get: Looks up a result.
+        put: Stores a result.
+        clear: Removes all results and resets the statistics.
+        directory: Getter for the cache directory.
+        max_bytes: Getter and setter for the size cap.
+        stats: Getter for the cache statistics.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024**3):
+        if not isinstance(directory, (str, os.PathLike)):
+            raise TypeError(Errors.bad_input(name="directory", expected_type="a path"))
+        self._directory = os.fspath(directory)
+        os.makedirs(self._directory, exist_ok=True)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def get(self, key: str) -> Optional[Union[np.ndarray, Layer]]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                array = archive["array"]
+                attributes = json.loads(str(archive["metadata"]))
+                mask = archive["mask"] if "mask" in archive.files else None
+            # Reads Refresh the Modification Time Used for Eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            with self._lock:
+                self._misses += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+        if attributes is None:
+            return array
+        if attributes["transform"] is not None:
+            attributes["transform"] = tuple(attributes["transform"])
+        return Layer(array=None if array.size == 0 else array, mask=mask, **attributes)
+
+    def put(self, key: str, value: Union[np.ndarray, Layer]):
+        if isinstance(value, Layer):
+            array = value.array if value.array is not None else np.empty(0)
+            attributes = {
+                "bounds": value.bounds,
+                "crs": value.crs,
+                "driver": value.driver,
+                "no_data": value.no_data,
+                "transform": value.transform,
+                "units": value.units,
+            }
+            masks = {} if value.mask is None else {"mask": value.mask}
+        else:
+            array = value
+            attributes = None
+            masks = {}
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez_compressed(
+                    file,
+                    array=array,
+                    metadata=np.array(json.dumps(attributes, default=_item)),
+                    **masks,
+                )
+            os.replace(temporary, path)
+        except OSError:
+            # A Result That Can't Be Written Is Simply Not Cached
+            _remove(temporary)
+            return
+        except BaseException:
+            _remove(temporary)
+            raise
+        self._evict()
+
+    def clear(self):
+        for path, _, _ in self._files():
+            _remove(path)
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int):
+        if not (isinstance(value, int) and value >= 0):
+            raise TypeError(
+                Errors.bad_input(
+                    name="max_bytes", expected_type="a non-negative integer"
+                )
+            )
+        self._max_bytes = value
+        self._evict()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        files = self._files()
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(files),
+                "bytes": sum(size for _, size, _ in files),
+                "max_bytes": self._max_bytes,
+            }
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.blake2b(f"{key}:{_VERSION}".encode(), digest_size=20)
+        name = digest.hexdigest()
+        return os.path.join(self._directory, name[:2], f"{name}.npz")
+
+    def _files(self) -> List[Tuple[str, int, float]]:
+        files = []
+        for root, _, names in os.walk(self._directory):
+            for name in names:
+                if not name.endswith(".npz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, status.st_size, status.st_mtime))
+        return files
+
+    def _evict(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in sorted(files, key=lambda file: file[2]):
+            if total <= self._max_bytes:
+                break
+            # Another Process May Have Removed the File Already
+            if _remove(path):
+                with self._lock:
+                    self._evictions += 1
+            total -= size
+
+
+try:
+    _VERSION = metadata.version("raster-forge")
+except metadata.PackageNotFoundError:
+    _VERSION = "unknown"
+
+_CACHE: Optional[ResultCache] = None
+_DISK_CACHE: Optional[DiskCache] = None
+
+
+def enable_cache(max_bytes: int = 256 * 1024**2) -> ResultCache:
+    """
+    Enable the in-memory cache of process results.
+
+    While enabled, calling a process with the same inputs and parameters as a previous
+    call returns the stored result instead of recomputing it. Inputs are identified by
+    a fingerprint of their content, so modified arrays are never served stale results.
+    Cached results are read-only: arrays can't be written to and Layers copy their data
+    on modification.
+
+    Args:
+      max_bytes:
+        Memory budget of the cache, in bytes. Defaults to 256 MiB.
+
+    Returns:
+      The cache, which exposes its statistics. If the cache is already enabled, its
+      budget is updated and its results are kept.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResultCache(max_bytes)
+    else:
+        _CACHE.max_bytes = max_bytes
+    return _CACHE
+
+
+def disable_cache():
+    """
+    Disable the in-memory cache of process results and release the stored results.
+    """
+    global _CACHE
+    _CACHE = None
+
+
+def get_cache() -> Optional[ResultCache]:
+    """
+    Get the in-memory cache of process results.
+
+    Returns:
+      The cache, or None if it is disabled.
+    """
+    return _CACHE
+
+
+def enable_disk_cache(directory: str, max_bytes: int = 1024**3) -> DiskCache:
+    """
+    Enable the persistent cache of process results on local disk.
+
+    Results are keyed by the content of the inputs (pixels and grid), the process name,
+    its parameters and the library version, so unchanged inputs reuse the results of
+    previous runs. The directory can be shared by several processes. When the in-memory
+    cache is also enabled, it is looked up first.
+
+    Args:
+      directory:
+        Directory holding the cached results. It is created if it does not exist.
+      max_bytes:
+        Size cap of the directory, in bytes. Defaults to 1 GiB.
+
+    Returns:
+      The cache, which exposes its statistics.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    global _DISK_CACHE
+    _DISK_CACHE = DiskCache(directory, max_bytes)
+    return _DISK_CACHE
+
+
+def disable_disk_cache():
+    """
+    Disable the persistent cache of process results. Stored files are kept.
+    """
+    global _DISK_CACHE
+    _DISK_CACHE = None
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """
+    Get the persistent cache of process results.
+
+    Returns:
+      The cache, or None if it is disabled.
+    """
+    return _DISK_CACHE
+
+
+def fingerprint(name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Compute the fingerprint of a process call from the content of its arguments.
+
+    Args:
+      name:
+        Name of the process.
+      arguments:
+        Arguments of the call, by parameter name.
+
+    Returns:
+      Hexadecimal digest of the call, or None if an argument can't be fingerprinted.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(name.encode())
+    for key in sorted(arguments):
+        digest.update(key.encode())
+        if not _update(digest, arguments[key]):
+            return None
+    return digest.hexdigest()
+
+
+def cached(function: Callable, name: str) -> Callable:
+    """
+    Wrap a process so its results are served from the caches while they are enabled.
+
+    Args:
+      function:
+        Process function.
+      name:
+        Name of the process.
+
+    Returns:
+      The wrapped process.
+    """
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache, disk_cache = _CACHE, _DISK_CACHE
+        if cache is None and disk_cache is None:
+            return function(*args, **kwargs)
+
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            return function(*args, **kwargs)
+        bound.apply_defaults()
+
+        # Results Written Into a Destination Are Never Cached
+        if bound.arguments.get("out") is not None or bound.arguments.get("inplace"):
+            return function(*args, **kwargs)
+
+        # The Global Precision Changes Results Without Changing Arguments
+        key = fingerprint(f"{name}:{get_precision()}", bound.arguments)
+        if key is None:
+            return function(*args, **kwargs)
+
+        if cache is not None:
+            result = cache.get(key)
+            if result is not None:
+                return result
+
+        result = None if disk_cache is None else disk_cache.get(key)
+        if result is None:
+            result = function(*args, **kwargs)
+            if not isinstance(result, (np.ndarray, Layer)):
+                return result
+            if disk_cache is not None:
+                disk_cache.put(key, result)
+        if cache is not None:
+            cache.put(key, result)
+        return result
+
+    return wrapper
+
+
+def _update(digest: "hashlib.blake2b", value: Any) -> bool:
+    if isinstance(value, np.ndarray):
+        digest.update(f"ndarray:{value.dtype.str}:{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, Layer):
+        digest.update(
+            f"Layer:{value.bounds}:{value.crs}:{value.driver}:{value.no_data}:"
+            f"{value.transform}:{value.units}".encode()
+        )
+        # Masks Become the Alpha Channel of Rendered Composites
+        return _update(digest, value.mask) and _update(digest, value.array)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}:{len(value)}".encode())
+        return all(_update(digest, item) for item in value)
+    elif isinstance(value, dict):
+        digest.update(f"dict:{len(value)}".encode())
+        for key in sorted(value, key=repr):
+            digest.update(repr(key).encode())
+            if not _update(digest, value[key]):
+                return False
+    elif value is None or isinstance(value, (bool, int, float, str, np.generic)):
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    else:
+        return False
+    return True
+
+
+def _size(value: Union[np.ndarray, Layer]) -> int:
+    if isinstance(value, Layer):
+        return 0 if value.array is None else value.array.nbytes
+    return value.nbytes
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _private(value: Union[np.ndarray, Layer]) -> Union[np.ndarray, Layer]:
+    # Read-Only Copy Owned by the Cache, Leaving the Result of the Caller Untouched
+    if not isinstance(value, Layer):
+        return _read_only(value.copy())
+    return Layer(
+        array=None if value.array is None else _read_only(value.array.copy()),
+        bounds=None if value.bounds is None else dict(value.bounds),
+        crs=value.crs,
+        driver=value.driver,
+        no_data=value.no_data,
+        transform=value.transform,
+        units=value.units,
+        mask=value.mask,
+    )
+
+
+def _item(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
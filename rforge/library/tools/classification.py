@@ -0,0 +1,94 @@
+from typing import Optional, Union
+
+import numpy as np
+from rforge.library.tools.blocks import block_rows, row_blocks
+from rforge.library.tools.exceptions import Errors
+
+COMPARISONS = 32
+
+
+def check_breaks(breaks: Union[list, tuple]) -> np.ndarray:
+    """
+    Check a list of class breaks.
+
+    Args:
+      breaks:
+        Strictly increasing list of numeric values, with at most 255 elements.
+
+    Returns:
+      The breaks as a float64 NumPy array.
+
+    Raises:
+      TypeError:
+        If the breaks are not valid.
+    """
+    if not (
+        isinstance(breaks, (list, tuple))
+        and 0 < len(breaks) < 256
+        and all(
+            isinstance(item, (int, float, np.number)) and not isinstance(item, bool)
+            for item in breaks
+        )
+        and all(np.isfinite(breaks))
+        and all(np.diff(breaks) > 0)
+    ):
+        raise TypeError(
+            Errors.bad_input(
+                name="breaks",
+                expected_type="a strictly increasing list of up to 255 numeric values",
+            )
+        )
+    return np.asarray(breaks, dtype=np.float64)
+
+
+def classify(
+    array: np.ndarray,
+    breaks: np.ndarray,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Assign to every value the number of class breaks lower or equal to it.
+
+    The number is the uint8 class code of the value.
+
+    Values below the first break are in class 0 and values at or above the last break
+    are in class len(breaks). NaN values are in class 0. The array is classified one
+    block of rows at a time, by accumulating comparisons for short lists of breaks and
+    with a binary search for long ones, so no full-size temporary array is created.
+
+    Args:
+      array:
+        Input array.
+      breaks:
+        Breaks returned by check_breaks.
+      out:
+        Array receiving the class codes, with the shape of the input. Defaults to None,
+        in which case a uint8 array is allocated.
+
+    Returns:
+      The class codes.
+    """
+    if out is None:
+        out = np.empty(array.shape, dtype=np.uint8)
+    rows = block_rows(array.shape)
+    mask = np.empty((rows,) + array.shape[1:], dtype=bool)
+    codes = np.empty((rows,) + array.shape[1:], dtype=np.uint8)
+
+    for block in row_blocks(array.shape, rows):
+        values = array[block]
+        count = values.shape[0]
+        code = codes[:count]
+        if len(breaks) <= COMPARISONS:
+            code.fill(0)
+            for value in breaks:
+                np.add(
+                    code, np.greater_equal(values, value, out=mask[:count]), out=code
+                )
+        else:
+            np.copyto(
+                code, np.searchsorted(breaks, values, side="right"), casting="unsafe"
+            )
+            if np.issubdtype(values.dtype, np.floating):
+                np.copyto(code, 0, where=np.isnan(values, out=mask[:count]))
+        np.copyto(out[block], code, casting="unsafe")
+    return out
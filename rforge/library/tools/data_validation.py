@@ -1,7 +1,9 @@
 from typing import Union
 
 import numpy as np
+from rforge.library.containers.grid import GridSpec
 from rforge.library.containers.layer import Layer
+from rforge.library.tools.exceptions import Errors
 
 
 def check_layer(layer: Union[Layer, np.ndarray]):
@@ -17,7 +19,8 @@ def check_layer(layer: Union[Layer, np.ndarray]):
 
     Raises:
       TypeError:
-        If the input is not a non-empty Layer object or a non-empty numerical NumPy array.
+        If the input is not a non-empty Layer object or a non-empty numerical NumPy
+        array.
     """
     if (
         isinstance(layer, Layer)
@@ -31,3 +34,51 @@ def check_layer(layer: Union[Layer, np.ndarray]):
         raise TypeError(
             "Layer must be a non-empty Layer object or a non-empty numerical Numpy array."
         )
+
+
+def check_alignment(*layers: Union[Layer, np.ndarray, None]):
+    """
+    Check if the given inputs, Layer objects or NumPy arrays, lie on the same grid.
+
+    Inputs that are not Layer objects, NumPy arrays or objects exposing a grid (e.g.
+    None) are ignored, since their validation is left to check_layer.
+
+    Args:
+      layers:
+        Input data, which can be Layer objects or NumPy arrays.
+
+    Returns:
+      The shared grid, or None if no grid could be determined.
+
+    Raises:
+      TypeError:
+        If the inputs are not co-registered.
+    """
+    reference = None
+    for layer in layers:
+        if isinstance(layer, np.ndarray) and len(layer.shape) >= 2:
+            grid = GridSpec(layer.shape[:2])
+        elif isinstance(layer, Layer) or isinstance(
+            getattr(layer, "grid", None), GridSpec
+        ):
+            grid = layer.grid
+        else:
+            continue
+
+        if grid is None:
+            continue
+        if reference is None:
+            reference = grid
+        elif grid is not reference and not reference.aligned(grid):
+            raise TypeError(
+                Errors.bad_input(
+                    name="layers",
+                    provided_type=f"on grids {reference} and {grid}",
+                    expected_type="aligned on the same grid",
+                )
+            )
+        elif (reference.transform is None and grid.transform is not None) or (
+            reference.crs is None and grid.crs is not None
+        ):
+            reference = grid
+    return reference
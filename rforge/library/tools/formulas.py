@@ -0,0 +1,308 @@
+import ast
+import functools
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from rforge.library.tools.blocks import block_rows, row_blocks
+from rforge.library.tools.exceptions import Errors
+
+OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+    ast.USub: np.negative,
+}
+
+COMMUTATIVE = (np.add, np.multiply)
+
+
+class FormulaPlan:
+    """Represents band formulas compiled into NumPy operations over blocks of pixels.
+
+    Operands are references: ('band', name) and ('scalar', name) for parameters,
+    ('constant', value) for literals, ('setup', position) for the result of a setup
+    operation and ('array', position) for the result of a program operation.
+
+    Attributes:
+        formulas (Tuple[str, ...]): Compiled formulas, in order.
+        bands (Tuple[str, ...]): Names of the parameters that are arrays.
+        scalars (Tuple[str, ...]): Names of the parameters that are numeric values.
+        setup (List[tuple]): Operations on scalars only, as (ufunc, operands) pairs,
+            evaluated once per call.
+        program (List[tuple]): Operations on blocks, as (ufunc, operands, slot) triples,
+            where a ufunc of None loads a band and the slot is the scratch buffer
+            receiving the result.
+        outputs (List[tuple]): Reference to the result of each formula.
+        slots (int): Number of scratch buffers.
+
+    Methods:
+        __init__: Initializes a FormulaPlan instance.
+    """
+
+    def __init__(
+        self,
+        formulas: Tuple[str, ...],
+        bands: Tuple[str, ...],
+        scalars: Tuple[str, ...],
+        setup: List[tuple],
+        program: List[tuple],
+        outputs: List[tuple],
+        slots: int,
+    ):
+        self.formulas = formulas
+        self.bands = bands
+        self.scalars = scalars
+        self.setup = setup
+        self.program = program
+        self.outputs = outputs
+        self.slots = slots
+
+
+@functools.lru_cache(maxsize=256)
+def compile_formulas(formulas: Tuple[str, ...], bands: Tuple[str, ...]) -> FormulaPlan:
+    """
+    Compile band formulas, such as the ones of spyndex, into a plan.
+
+    The plan is evaluated by evaluate_formulas.
+
+    Plans are cached, so each combination of formulas and bands is only parsed once.
+    Subexpressions shared within or across formulas, such as N+R in several indices, are
+    computed once per block, and powers of 2 and 0.5 become squares and square roots.
+
+    Args:
+      formulas:
+        Formulas with arithmetic operators, numeric literals and parameter names.
+      bands:
+        Names of the parameters that are arrays. Every other name is a scalar parameter.
+
+    Returns:
+      The compiled plan.
+
+    Raises:
+      TypeError:
+        If a formula is not valid.
+    """
+    references: Dict[tuple, tuple] = {}
+    names: Dict[str, None] = {}
+    setup: List[tuple] = []
+    program: List[tuple] = []
+
+    def visit(node: ast.AST) -> tuple:
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return ("constant", float(node.value))
+        if isinstance(node, ast.Name):
+            names[node.id] = None
+            if node.id not in bands:
+                return ("scalar", node.id)
+            return emit(None, (("band", node.id),))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            return visit(node.operand)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            return emit(OPERATORS[type(node.op)], (visit(node.operand),))
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            ufunc = OPERATORS[type(node.op)]
+            left, right = visit(node.left), visit(node.right)
+            if ufunc is np.power and right == ("constant", 2.0):
+                return emit(np.square, (left,))
+            if ufunc is np.power and right == ("constant", 0.5):
+                return emit(np.sqrt, (left,))
+            return emit(ufunc, (left, right))
+        raise TypeError(
+            Errors.bad_input(
+                name="formula",
+                provided_type=f"'{ast.unparse(node)}'",
+                expected_type=(
+                    "made of arithmetic operators, numbers and parameter names"
+                ),
+            )
+        )
+
+    def emit(ufunc: Optional[np.ufunc], operands: Tuple[tuple, ...]) -> tuple:
+        key = (ufunc, tuple(sorted(operands)) if ufunc in COMMUTATIVE else operands)
+        if key in references:
+            return references[key]
+
+        # Fold Literals and Hoist Operations on Scalars Out of the Blocks
+        if ufunc is not None and all(kind == "constant" for kind, _ in operands):
+            with np.errstate(all="ignore"):
+                value = float(ufunc(*[value for _, value in operands]))
+            reference = ("constant", value)
+        elif ufunc is not None and all(kind != "array" for kind, _ in operands):
+            setup.append((ufunc, operands))
+            reference = ("setup", len(setup) - 1)
+        else:
+            program.append([ufunc, operands, None])
+            reference = ("array", len(program) - 1)
+        references[key] = reference
+        return reference
+
+    outputs = []
+    for formula in formulas:
+        try:
+            tree = ast.parse(formula, mode="eval")
+        except (SyntaxError, ValueError):
+            raise TypeError(
+                Errors.bad_input(name="formula", expected_type="a valid expression")
+            )
+        outputs.append(visit(tree.body))
+
+    # Reuse the Scratch Buffer of Every Value After Its Last Use
+    last_use = {}
+    for position, (_, operands, _) in enumerate(program):
+        for kind, value in operands:
+            if kind == "array":
+                last_use[value] = position
+    for kind, value in outputs:
+        if kind == "array":
+            last_use[value] = len(program)
+
+    free: List[int] = []
+    slots = 0
+    for position, instruction in enumerate(program):
+        for kind, value in set(instruction[1]):
+            if kind == "array" and last_use[value] == position:
+                free.append(program[value][2])
+        if free:
+            instruction[2] = free.pop()
+        else:
+            instruction[2] = slots
+            slots += 1
+        if position not in last_use:
+            free.append(instruction[2])
+
+    return FormulaPlan(
+        formulas=formulas,
+        bands=tuple(name for name in names if name in bands),
+        scalars=tuple(name for name in names if name not in bands),
+        setup=setup,
+        program=[tuple(instruction) for instruction in program],
+        outputs=outputs,
+        slots=slots,
+    )
+
+
+def evaluate_formulas(
+    plan: FormulaPlan,
+    parameters: Dict[str, Union[np.ndarray, int, float]],
+    out: np.ndarray,
+    scales: Optional[Dict[str, float]] = None,
+    offsets: Optional[Dict[str, float]] = None,
+):
+    """
+    Evaluate a compiled plan block by block, in the data type of the output.
+
+    Bands are converted to the data type of the output and scaled one block at a time,
+    so integer inputs are never copied as a whole, and intermediate values stay in small
+    scratch buffers. Divisions by zero and any other non-finite results are set to 0.
+
+    Args:
+      plan:
+        Plan returned by compile_formulas.
+      parameters:
+        Arrays of the bands, all with the same shape, and values of the scalars.
+      out:
+        Floating-point array receiving the results, with the shape of the bands for a
+        single formula or with one more axis holding the result of each formula.
+      scales:
+        Factor each band is multiplied by when it is loaded, by name. Defaults to None.
+      offsets:
+        Value added to each band after scaling, by name. Defaults to None.
+    """
+    dtype = out.dtype
+    scales = {} if scales is None else scales
+    offsets = {} if offsets is None else offsets
+    shape = out.shape if len(plan.outputs) == 1 else out.shape[:-1]
+    scalars: List[np.generic] = []
+
+    def resolve(reference: tuple, values: list):
+        kind, value = reference
+        if kind == "constant":
+            return dtype.type(value)
+        if kind == "scalar":
+            return dtype.type(parameters[value])
+        if kind == "setup":
+            return scalars[value]
+        return values[value]
+
+    with np.errstate(all="ignore"):
+        for ufunc, operands in plan.setup:
+            scalars.append(dtype.type(ufunc(*[resolve(item, []) for item in operands])))
+
+        rows = block_rows(shape)
+        buffers = [np.empty((rows,) + shape[1:], dtype) for _ in range(plan.slots)]
+        mask = np.empty((rows,) + out.shape[1:], bool)
+
+        for block in row_blocks(shape, rows):
+            count = block.stop - block.start
+            values = []
+            for ufunc, operands, slot in plan.program:
+                target = buffers[slot][:count]
+                if ufunc is None:
+                    name = operands[0][1]
+                    array = parameters[name][block]
+                    scale, offset = scales.get(name), offsets.get(name)
+                    if array.dtype != dtype or scale is not None or offset is not None:
+                        array = _load(target, array, scale, offset)
+                    values.append(array)
+                else:
+                    arguments = [resolve(item, values) for item in operands]
+                    values.append(ufunc(*arguments, out=target))
+
+            results = [resolve(item, values) for item in plan.outputs]
+            if len(results) == 1:
+                np.copyto(out[block], results[0])
+            else:
+                size = (count,) + shape[1:]
+                results = [np.broadcast_to(item, size) for item in results]
+                np.stack(results, axis=-1, out=out[block])
+
+            # Set Divisions by Zero and Other Non-Finite Values to 0
+            invalid = np.isfinite(out[block], out=mask[:count])
+            np.logical_not(invalid, out=invalid)
+            np.copyto(out[block], 0, where=invalid)
+
+
+def convert_band(
+    out: np.ndarray,
+    array: np.ndarray,
+    scale: Optional[float] = None,
+    offset: Optional[float] = None,
+):
+    """
+    Convert a band into the data type of an output array, with a scale and an offset.
+
+    The band is converted one block of rows at a time.
+
+    Integer inputs, such as digital numbers with a reflectance scale factor, are never
+    converted as a whole, so the only full-size floating-point array is the output.
+
+    Args:
+      out:
+        Array receiving the band, with the shape of the band. It can be a view of a band
+        of a larger array.
+      array:
+        Input band.
+      scale:
+        Factor the band is multiplied by. Defaults to None.
+      offset:
+        Value added to the band after scaling. Defaults to None.
+    """
+    for block in row_blocks(out.shape):
+        _load(out[block], array[block], scale, offset)
+
+
+def _load(
+    target: np.ndarray,
+    array: np.ndarray,
+    scale: Optional[float],
+    offset: Optional[float],
+) -> np.ndarray:
+    # Convert a Block in Place, Then Scale and Shift It in Its Data Type
+    np.copyto(target, array, casting="unsafe")
+    if scale is not None:
+        np.multiply(target, scale, out=target, casting="unsafe")
+    if offset is not None:
+        np.add(target, offset, out=target, casting="unsafe")
+    return target
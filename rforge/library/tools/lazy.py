@@ -0,0 +1,289 @@
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from rforge.library.containers.grid import GridSpec
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.data_validation import check_alignment
+from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.registry import ProcessInfo, call_halo, get_process
+from rforge.library.tools.tiling import (
+    Window,
+    check_tile_size,
+    expand_window,
+    raster_inputs,
+    tile_windows,
+    window_inputs,
+    write_tile,
+)
+
+
+class Node:
+    """Represents a deferred call of a registered process.
+
+    Nodes are created by the functions returned by defer and can be passed as inputs of
+    other deferred calls, forming an expression graph. Nothing is computed until the
+    graph is evaluated with compute, which runs the whole chain tile by tile.
+
+    Attributes:
+        _info (ProcessInfo): Registry entry of the process.
+        _kwargs (Dict[str, Any]): Arguments of the call, which may contain other nodes.
+
+    Methods:
+        __init__: Initializes a Node instance.
+        __repr__: Returns a readable representation of the call.
+        name: Getter for the name of the process.
+        halo: Computes the halo of the whole chain ending at this node.
+        grid: Computes the grid shared by the raster inputs of the chain.
+        compute: Evaluates the node.
+    """
+
+    def __init__(self, info: ProcessInfo, kwargs: Dict[str, Any]):
+        self._info = info
+        self._kwargs = kwargs
+
+    def __repr__(self) -> str:
+        return f"Node({self._info['name']}, {sorted(self._kwargs)})"
+
+    @property
+    def name(self) -> str:
+        return self._info["name"]
+
+    @property
+    def halo(self) -> Optional[int]:
+        own = call_halo(self._info, self._kwargs)
+        if own is None:
+            return None
+
+        halo = 0
+        for node in _nodes(self._kwargs):
+            if node.halo is None:
+                return None
+            halo = max(halo, node.halo)
+        return own + halo
+
+    @property
+    def grid(self) -> Optional[GridSpec]:
+        return check_alignment(*_leaves(self))
+
+    def compute(
+        self,
+        tile_size: Union[int, Tuple[int, int]] = 512,
+        destination: Optional[Any] = None,
+        as_array: bool = False,
+    ) -> Union[np.ndarray, Layer, Any]:
+        return compute(
+            self,
+            tile_size=tile_size,
+            destinations=None if destination is None else [destination],
+            as_array=as_array,
+        )
+
+
+def defer(process: Union[str, Callable]) -> Callable[..., Node]:
+    """
+    Turn a registered process into a function that returns lazy nodes.
+
+    The returned function accepts the same arguments as the process, except for
+    'as_array', 'out' and 'inplace', and any raster argument can be another node.
+
+    Args:
+      process:
+        Registered process function or name.
+
+    Returns:
+      Function building a Node for each call.
+
+    Raises:
+      TypeError:
+        If the process is not registered or the arguments don't match its signature.
+    """
+    info = get_process(process)
+    signature = inspect.signature(info["function"])
+
+    def build(*args, **kwargs) -> Node:
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError as error:
+            raise TypeError(
+                Errors.bad_input(
+                    name=info["name"],
+                    provided_type=str(error),
+                    expected_type="arguments matching the process",
+                )
+            ) from None
+        for argument in ["as_array", "out", "inplace"]:
+            if argument in bound.arguments:
+                raise TypeError(
+                    Errors.bad_input(
+                        name=argument, expected_type="left unset in deferred calls"
+                    )
+                )
+        return Node(info, dict(bound.arguments))
+
+    build.__name__ = info["name"]
+    build.__doc__ = info["function"].__doc__
+    return build
+
+
+def compute(
+    *nodes: Node,
+    tile_size: Union[int, Tuple[int, int]] = 512,
+    destinations: Optional[List[Any]] = None,
+    as_array: bool = False,
+) -> Union[np.ndarray, Layer, Any, Tuple[Union[np.ndarray, Layer, Any], ...]]:
+    """
+    Evaluate one or more nodes tile by tile, materializing only their results.
+
+    Each tile of a node is computed by evaluating its inputs over the tile grown by the
+    halo of the process, recursively, so intermediate results only ever exist one tile
+    at a time. Nodes shared by several consumers (or requested outputs) are evaluated
+    once per tile. Processes that depend on the whole raster (registered without a halo,
+    or marked as such for the arguments of the call) are barriers: their inputs are
+    stitched into full arrays first, and their result is kept in memory for the rest of
+    the graph.
+
+    Args:
+      nodes:
+        Nodes to evaluate.
+      tile_size:
+        Number of rows and columns of each tile, or a single value for square tiles.
+        Defaults to 512.
+      destinations:
+        List with a destination for each node, each being a Layer, a NumPy array (e.g. a
+        memory map), a rasterio dataset opened for writing or None. Defaults to None, in
+        which case all results are allocated in memory.
+      as_array:
+        If True, results allocated in memory are returned as NumPy arrays. Defaults to
+        False.
+
+    Returns:
+      The result of the node, or a tuple with the result of each node if several are
+      given. Results written to a destination are returned as the destination.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    if len(nodes) == 0 or not all(isinstance(node, Node) for node in nodes):
+        raise TypeError(Errors.bad_input(name="nodes", expected_type="Node objects"))
+    if destinations is None:
+        destinations = [None] * len(nodes)
+    if not (isinstance(destinations, list) and len(destinations) == len(nodes)):
+        raise TypeError(
+            Errors.bad_input(
+                name="destinations", expected_type="a list with one entry per node"
+            )
+        )
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    check_tile_size(tile_size)
+
+    grid = check_alignment(*[leaf for node in nodes for leaf in _leaves(node)])
+    if grid is None:
+        raise TypeError(
+            Errors.bad_input(name="inputs", expected_type="at least one raster layer")
+        )
+
+    # Barriers Are Replaced by Their Full Results Before Tiling the Rest of the Graph
+    barriers = {}
+    roots = [_resolve_barriers(node, grid.shape, tile_size, barriers) for node in nodes]
+
+    targets = [
+        destination.modify() if isinstance(destination, Layer) else destination
+        for destination in destinations
+    ]
+    _tile_graph(roots, grid.shape, tile_size, targets)
+
+    results = []
+    for destination, target in zip(destinations, targets):
+        if destination is not None:
+            if isinstance(destination, Layer):
+                destination.array = target
+            results.append(destination)
+        else:
+            results.append(target if as_array else Layer(target))
+    return results[0] if len(results) == 1 else tuple(results)
+
+
+def _tile_graph(
+    roots: List[Union[Node, np.ndarray]],
+    shape: Tuple[int, int],
+    tile_size: Union[int, Tuple[int, int]],
+    targets: List[Any],
+):
+    for window in tile_windows(shape, tile_size):
+        cache = {}
+        for position, root in enumerate(roots):
+            tile = _evaluate(root, shape, window, cache)
+            if targets[position] is None:
+                targets[position] = np.empty(shape + tile.shape[2:], dtype=tile.dtype)
+            write_tile(targets[position], window, tile)
+
+
+def _evaluate(
+    value: Any, shape: Tuple[int, int], window: Window, cache: Dict[tuple, Any]
+) -> Any:
+    if not isinstance(value, Node):
+        return window_inputs(value, shape, window)
+
+    key = (id(value), window)
+    if key not in cache:
+        outer, inner = expand_window(
+            window, call_halo(value._info, value._kwargs), shape
+        )
+        kwargs = _map(value._kwargs, lambda item: _evaluate(item, shape, outer, cache))
+        cache[key] = value._info["function"](**kwargs, as_array=True)[inner]
+    return cache[key]
+
+
+def _resolve_barriers(
+    value: Any,
+    shape: Tuple[int, int],
+    tile_size: Union[int, Tuple[int, int]],
+    barriers: Dict[int, Any],
+) -> Any:
+    if not isinstance(value, Node):
+        return value
+    if id(value) in barriers:
+        return barriers[id(value)]
+
+    kwargs = _map(
+        value._kwargs,
+        lambda item: _resolve_barriers(item, shape, tile_size, barriers),
+    )
+    if call_halo(value._info, value._kwargs) is None:
+        # Node Inputs of a Barrier Are Stitched Tile by Tile into Full Arrays
+        inputs = list(dict.fromkeys(_nodes(kwargs)))
+        targets = [None] * len(inputs)
+        _tile_graph(inputs, shape, tile_size, targets)
+        full = dict(zip([id(item) for item in inputs], targets))
+
+        kwargs = _map(kwargs, lambda item: full.get(id(item), item))
+        resolved = value._info["function"](**kwargs, as_array=True)
+    else:
+        resolved = Node(value._info, kwargs)
+
+    barriers[id(value)] = resolved
+    return resolved
+
+
+def _map(value: Any, function: Callable) -> Any:
+    if isinstance(value, dict):
+        return {key: _map(item, function) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(_map(item, function) for item in value)
+    return function(value)
+
+
+def _nodes(value: Any) -> List[Node]:
+    nodes = []
+    _map(value, lambda item: nodes.append(item) if isinstance(item, Node) else None)
+    return nodes
+
+
+def _leaves(node: Node) -> list:
+    leaves = raster_inputs(node._kwargs)
+    for child in _nodes(node._kwargs):
+        leaves += _leaves(child)
+    return leaves
@@ -0,0 +1,263 @@
+from typing import Any, Iterable, Optional, Tuple, Union
+
+import numpy as np
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.exceptions import Errors
+
+
+def check_out(
+    out: Optional[Union[Layer, np.ndarray]],
+    inplace: bool,
+    source: Optional[Union[Layer, np.ndarray]],
+) -> Optional[Union[Layer, np.ndarray]]:
+    """
+    Check the output destination of a process and resolve in-place execution.
+
+    Args:
+      out:
+        Destination of the result, which can be a Layer object, a NumPy array or None.
+      inplace:
+        If True, the result is written into the primary input of the process.
+      source:
+        Primary input of the process.
+
+    Returns:
+      The destination of the result, or None if the result must be allocated.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    if not isinstance(inplace, bool):
+        raise TypeError(Errors.bad_input(name="inplace", expected_type="a boolean"))
+    if out is not None and not isinstance(out, (Layer, np.ndarray)):
+        raise TypeError(
+            Errors.bad_input(
+                name="out", expected_type="a Layer object, a NumPy array or None"
+            )
+        )
+    if inplace:
+        if out is not None:
+            raise TypeError(
+                Errors.bad_input(name="out", expected_type="None when inplace is True")
+            )
+        if not isinstance(source, (Layer, np.ndarray)):
+            raise TypeError(
+                Errors.bad_input(
+                    name="inplace",
+                    expected_type="used with a Layer or NumPy array input",
+                )
+            )
+        return source
+    return out
+
+
+def output_buffer(
+    destination: Optional[Union[Layer, np.ndarray]],
+    shape: Tuple[int, ...],
+    alpha: Optional[np.ndarray] = None,
+    dtype: Optional[Union[np.dtype, type]] = None,
+) -> Optional[np.ndarray]:
+    """
+    Get the array a process writes its result into.
+
+    Layer destinations are modified through Layer.modify, so layers sharing their data
+    are left untouched.
+
+    Args:
+      destination:
+        Destination returned by check_out.
+      shape:
+        Shape of the result, without the alpha band.
+      alpha:
+        Alpha data of the process, which adds a band to the result. Defaults to None.
+      dtype:
+        Data type of the result, which must be castable to the destination within the
+        same kind, so that floating-point results are not written into integer inputs.
+        Defaults to None, in which case it is not checked.
+
+    Returns:
+      The writable destination array, or None if the result must be allocated.
+
+    Raises:
+      TypeError:
+        If the destination can't hold the result.
+    """
+    if destination is None:
+        return None
+    if isinstance(destination, Layer):
+        if destination.array is None:
+            return None
+        buffer = destination.modify()
+    else:
+        buffer = destination
+
+    if alpha is not None:
+        shape = tuple(shape[:2]) + ((shape[2] if len(shape) > 2 else 1) + 1,)
+    if buffer.shape != tuple(shape) or not buffer.flags.writeable:
+        raise TypeError(
+            Errors.bad_input(
+                name="out",
+                provided_type=(
+                    f"{'writable' if buffer.flags.writeable else 'read-only'}"
+                    f" with shape {buffer.shape}"
+                ),
+                expected_type=f"a writable array with shape {tuple(shape)}",
+            )
+        )
+    if dtype is not None and not np.can_cast(dtype, buffer.dtype, "same_kind"):
+        raise TypeError(
+            Errors.bad_input(
+                name="out",
+                provided_type=f"an array of {buffer.dtype}",
+                expected_type=(
+                    f"an array the {np.dtype(dtype)} result can be cast to, and so"
+                    " must an input written in place"
+                ),
+            )
+        )
+    return buffer
+
+
+def result_view(
+    buffer: Optional[np.ndarray],
+    shape: Tuple[int, ...],
+    alpha: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """
+    Get the part of the output buffer that holds the result, leaving out the alpha band.
+
+    Args:
+      buffer:
+        Array returned by output_buffer.
+      shape:
+        Shape of the result, without the alpha band.
+      alpha:
+        Alpha data of the process. Defaults to None.
+
+    Returns:
+      View of the result in the buffer, or None if there is no buffer.
+    """
+    if buffer is None or alpha is None:
+        return buffer
+    return buffer[:, :, 0] if len(shape) == 2 else buffer[:, :, : shape[2]]
+
+
+def stack_alpha(
+    result: np.ndarray, alpha: Optional[np.ndarray], buffer: Optional[np.ndarray]
+) -> np.ndarray:
+    """
+    Append the alpha band to a result, in the output buffer if there is one.
+
+    This serves the alpha argument of the processes, whose results keep their stacked
+    alpha band. Masks of input Layers are not stacked but shared with share_mask.
+
+    Args:
+      result:
+        Result of the process.
+      alpha:
+        Alpha data of the process, or None.
+      buffer:
+        Array returned by output_buffer.
+
+    Returns:
+      The result with its alpha band.
+    """
+    if alpha is None:
+        return result
+    if buffer is None:
+        return np.dstack([result, alpha])
+
+    buffer[:, :, -1] = alpha
+    return buffer
+
+
+def deliver(
+    result: np.ndarray,
+    destination: Optional[Union[Layer, np.ndarray]],
+    as_array: bool,
+) -> Union[np.ndarray, Layer]:
+    """
+    Store the result of a process in its destination and return it.
+
+    Args:
+      result:
+        Result of the process.
+      destination:
+        Destination returned by check_out.
+      as_array:
+        If True, the result is returned as a NumPy array.
+
+    Returns:
+      The result as a NumPy array or a Layer. A Layer destination is returned as is.
+    """
+    if destination is None:
+        return result if as_array else Layer(result)
+
+    if isinstance(destination, Layer):
+        if destination.array is None:
+            destination.array = result
+        elif destination.array is not result:
+            np.copyto(destination.array, result, casting="same_kind")
+        return destination.array if as_array else destination
+
+    if destination is not result:
+        np.copyto(destination, result, casting="same_kind")
+    return destination if as_array else Layer(destination)
+
+
+def input_mask(arguments: Iterable[Any]) -> Optional[np.ndarray]:
+    """
+    Find the mask of the first masked layer among the arguments of a process.
+
+    Args:
+      arguments:
+        Arguments of the process. Layers are searched directly and inside lists, tuples
+        and dictionaries.
+
+    Returns:
+      The mask, or None if no input layer has one.
+    """
+    for argument in arguments:
+        items = argument
+        if isinstance(argument, dict):
+            items = argument.values()
+        elif not isinstance(argument, (list, tuple)):
+            items = [argument]
+        for item in items:
+            if isinstance(item, Layer) and item.mask is not None:
+                return item.mask
+    return None
+
+
+def share_mask(result: Any, mask: Optional[np.ndarray]) -> Any:
+    """
+    Attach a mask to the layers returned by a process, by reference.
+
+    The mask is shared rather than stacked into the result, so it is stored once however
+    many processes it goes through. Results that already have a mask, or whose rows and
+    columns differ from the mask, are left untouched.
+
+    Args:
+      result:
+        Result of the process, which can be a Layer, a dictionary of Layers or anything
+        else.
+      mask:
+        Mask returned by input_mask.
+
+    Returns:
+      The result.
+    """
+    if mask is None:
+        return result
+    layers = [result] if isinstance(result, Layer) else []
+    if isinstance(result, dict):
+        layers = [value for value in result.values() if isinstance(value, Layer)]
+    for layer in layers:
+        if (
+            layer.mask is None
+            and layer.array is not None
+            and layer.array.shape[:2] == mask.shape
+        ):
+            layer.mask = mask
+    return result
@@ -0,0 +1,88 @@
+from typing import Optional
+
+import numpy as np
+from rforge.library.tools.exceptions import Errors
+
+PRECISIONS = {"float32": np.dtype(np.float32), "float64": np.dtype(np.float64)}
+
+_PRECISION: Optional[str] = None
+
+
+def set_precision(precision: Optional[str]):
+    """
+    Set the floating-point precision used by the processes that don't receive one.
+
+    In 'float32' mode, inputs are converted once and the whole computation stays in
+    single precision, which halves the memory traffic of per-pixel arithmetic. Results
+    then match the 'float64' path within a relative tolerance of about 1e-5 (1e-3 for
+    slopes and aspects of nearly flat terrain, where gradients cancel out).
+
+    Args:
+      precision:
+        Either 'float32', 'float64' or None to restore the native NumPy promotion rules.
+
+    Raises:
+      TypeError:
+        If the precision is not valid.
+    """
+    global _PRECISION
+    check_precision(precision)
+    _PRECISION = precision
+
+
+def get_precision() -> Optional[str]:
+    """
+    Get the floating-point precision used by the processes that don't receive one.
+
+    Returns:
+      Either 'float32', 'float64' or None if the native NumPy promotion rules are used.
+    """
+    return _PRECISION
+
+
+def check_precision(precision: Optional[str]) -> Optional[np.dtype]:
+    """
+    Check a precision argument and resolve it against the global precision.
+
+    Args:
+      precision:
+        Either 'float32', 'float64' or None to use the global precision.
+
+    Returns:
+      The floating-point data type of the computation, or None for the native NumPy
+      promotion rules.
+
+    Raises:
+      TypeError:
+        If the precision is not valid.
+    """
+    if precision is not None and precision not in PRECISIONS:
+        raise TypeError(
+            Errors.bad_input(
+                name="precision", expected_type="'float32', 'float64' or None"
+            )
+        )
+    precision = precision if precision is not None else _PRECISION
+    return None if precision is None else PRECISIONS[precision]
+
+
+def cast(
+    array: Optional[np.ndarray], dtype: Optional[np.dtype]
+) -> Optional[np.ndarray]:
+    """
+    Convert an array to the data type of the computation.
+
+    The array is not copied if it already matches.
+
+    Args:
+      array:
+        Input array, or None.
+      dtype:
+        Data type returned by check_precision.
+
+    Returns:
+      The converted array.
+    """
+    if array is None or dtype is None:
+        return array
+    return array.astype(dtype, copy=False)
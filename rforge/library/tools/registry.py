@@ -0,0 +1,116 @@
+import functools
+from typing import Any, Callable, Dict, Optional, TypedDict, Union
+
+from rforge.library.tools.cache import cached
+from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.outputs import input_mask, share_mask
+
+
+class ProcessInfo(TypedDict):
+    name: str
+    function: Callable
+    halo: Optional[int]
+    releases_gil: bool
+    whole_raster: Optional[Callable[[Dict[str, Any]], bool]]
+
+
+PROCESSES: Dict[str, ProcessInfo] = {}
+
+
+def register_process(
+    halo: Optional[int] = 0,
+    name: Optional[str] = None,
+    releases_gil: bool = False,
+    whole_raster: Optional[Callable[[Dict[str, Any]], bool]] = None,
+):
+    """
+    Register a process so it can be run by the tiled executors and its results cached.
+
+    Args:
+      halo:
+        Number of pixels of context each tile needs around it. Use 0 for per-pixel
+        processes and None for processes that depend on the whole raster and can't be
+        tiled. Defaults to 0.
+      name:
+        Name under which the process is registered. Defaults to the function name.
+      releases_gil:
+        Whether the process spends most of its time in NumPy or OpenCV kernels that
+        release the GIL, so its tiles run concurrently in threads. Defaults to False.
+      whole_raster:
+        Function of the arguments of a call, by parameter name, that returns True when
+        that call depends on the whole raster despite the halo of the process, for
+        example because it derives statistics from the data. Defaults to None.
+
+    Returns:
+      Decorator that registers the function and returns it wrapped by the result cache.
+      The wrapper also hands the mask of the input layers on to the result, by
+      reference. The registry keeps the unwrapped function, which the tiled executors
+      call.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        key = name if name is not None else function.__name__
+        PROCESSES[key] = {
+            "name": key,
+            "function": function,
+            "halo": halo,
+            "releases_gil": releases_gil,
+            "whole_raster": whole_raster,
+        }
+        process = cached(function, key)
+
+        @functools.wraps(process)
+        def wrapper(*args, **kwargs):
+            mask = input_mask(list(args) + list(kwargs.values()))
+            return share_mask(process(*args, **kwargs), mask)
+
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    return decorator
+
+
+def get_process(process: Union[str, Callable]) -> ProcessInfo:
+    """
+    Look up the registry entry of a process.
+
+    Args:
+      process:
+        Registered process function or name.
+
+    Returns:
+      Registry entry of the process.
+
+    Raises:
+      TypeError:
+        If the process is not registered.
+    """
+    for info in PROCESSES.values():
+        if (
+            info["name"] == process
+            or info["function"] is process
+            or info["function"] is getattr(process, "__wrapped__", None)
+        ):
+            return info
+    raise TypeError(
+        Errors.bad_input(name="process", expected_type="a registered process")
+    )
+
+
+def call_halo(info: ProcessInfo, arguments: Dict[str, Any]) -> Optional[int]:
+    """
+    Get the halo of a call of a process.
+
+    Args:
+      info:
+        Registry entry of the process.
+      arguments:
+        Arguments of the call, by parameter name.
+
+    Returns:
+      Halo of the process, or None if the process or this call depends on the whole
+      raster.
+    """
+    if info["whole_raster"] is not None and info["whole_raster"](arguments):
+        return None
+    return info["halo"]
@@ -0,0 +1,249 @@
+import ctypes
+import sys
+from multiprocessing import shared_memory
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from rforge.library.containers.layer import Layer
+
+_ATTACHED: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedArray:
+    """Describes a NumPy array stored in a named shared memory block.
+
+    Descriptors are small and cheap to pickle, so they can be sent to worker processes,
+    which attach to the block instead of receiving a copy of the data.
+
+    Attributes:
+        _name (str): Name of the shared memory block.
+        _shape (Tuple[int, ...]): Shape of the array.
+        _dtype (np.dtype): Data type of the array.
+        _writeable (bool): Whether the attached array can be written to.
+
+    Methods:
+        __init__: Initializes a SharedArray instance.
+        create: Allocates a new shared memory block for an array.
+        open: Returns the array, attaching to the block if needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        writeable: bool = True,
+    ):
+        self._name = name
+        self._shape = shape
+        self._dtype = np.dtype(dtype)
+        self._writeable = writeable
+
+    @classmethod
+    def create(
+        cls,
+        shape: Tuple[int, ...],
+        dtype: np.dtype,
+        handles: List[shared_memory.SharedMemory],
+        writeable: bool = True,
+    ) -> Tuple["SharedArray", np.ndarray]:
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        handles.append(block)
+        _ATTACHED[block.name] = block
+
+        descriptor = cls(block.name, shape, dtype, writeable)
+        return descriptor, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def open(self) -> np.ndarray:
+        block = _ATTACHED.get(self._name)
+        if block is None:
+            block = _attach(self._name)
+            _ATTACHED[self._name] = block
+
+        array = np.ndarray(self._shape, dtype=self._dtype, buffer=block.buf)
+        array.flags.writeable = self._writeable
+        return array
+
+
+class MappedArray:
+    """Describes a NumPy memory map, which worker processes re-open from its file.
+
+    Attributes:
+        _filename (str): Path of the mapped file.
+        _shape (Tuple[int, ...]): Shape of the array.
+        _dtype (np.dtype): Data type of the array.
+        _offset (int): Offset of the array in the file.
+        _order (str): Memory layout of the array.
+        _writeable (bool): Whether the re-opened memory map can be written to.
+
+    Methods:
+        __init__: Initializes a MappedArray instance.
+        open: Returns a memory map of the file, read-only unless created as writeable.
+    """
+
+    def __init__(self, array: np.memmap, writeable: bool = False):
+        self._filename = array.filename
+        self._shape = array.shape
+        self._dtype = array.dtype
+        self._offset = array.offset
+        self._order = (
+            "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+        )
+        self._writeable = writeable
+
+    def open(self) -> np.ndarray:
+        return np.memmap(
+            self._filename,
+            dtype=self._dtype,
+            mode="r+" if self._writeable else "r",
+            offset=self._offset,
+            shape=self._shape,
+            order=self._order,
+        )
+
+
+class InheritedArray:
+    """Describes a NumPy array in shared memory handed to worker processes at start.
+
+    The memory belongs to the arrays opened from the descriptor rather than to a named
+    block, so data written by the workers outlives the pool without being copied out.
+    Descriptors can only be passed to worker processes when they are started, e.g.
+    through the initializer of a process pool.
+
+    Attributes:
+        _shape (Tuple[int, ...]): Shape of the array.
+        _dtype (np.dtype): Data type of the array.
+        _buffer (ctypes.Array): Shared memory holding the array.
+
+    Methods:
+        __init__: Allocates the shared memory of the array.
+        open: Returns the writable array.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype):
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self._buffer = RawArray(
+            ctypes.c_char, max(int(np.prod(shape)) * self._dtype.itemsize, 1)
+        )
+
+    def open(self) -> np.ndarray:
+        return np.frombuffer(
+            self._buffer, dtype=self._dtype, count=int(np.prod(self._shape))
+        ).reshape(self._shape)
+
+
+class SharedLayer:
+    """Describes a Layer whose array is passed to worker processes without pickling.
+
+    Attributes:
+        _array (Optional[SharedArray | MappedArray]): Descriptor of the layer array.
+        _metadata (Dict[str, Any]): Remaining layer attributes.
+        _mask (Optional[SharedArray | MappedArray]): Descriptor of the layer mask.
+
+    Methods:
+        __init__: Initializes a SharedLayer instance.
+        open: Returns the Layer, attaching to its array.
+    """
+
+    def __init__(self, array: Any, metadata: Dict[str, Any], mask: Any = None):
+        self._array = array
+        self._metadata = metadata
+        self._mask = mask
+
+    def open(self) -> Layer:
+        return Layer(
+            array=None if self._array is None else self._array.open(),
+            mask=None if self._mask is None else self._mask.open(),
+            **self._metadata,
+        )
+
+
+def share(value: Any, handles: List[shared_memory.SharedMemory]) -> Any:
+    """
+    Replace the arrays found in a process argument by shared memory descriptors.
+
+    In-memory arrays are copied once into shared memory blocks, memory maps are
+    described by their file and Layers keep their metadata and mask. Lists, tuples and
+    dictionaries are searched recursively and every other value is returned unchanged.
+
+    Args:
+      value:
+        Process argument.
+      handles:
+        List that receives the shared memory blocks created, to be released with
+        release.
+
+    Returns:
+      The argument with its arrays replaced by descriptors.
+    """
+    if isinstance(value, np.memmap) and value.filename is not None:
+        return MappedArray(value)
+    elif isinstance(value, np.ndarray):
+        descriptor, array = SharedArray.create(
+            value.shape, value.dtype, handles, writeable=False
+        )
+        array[...] = value
+        return descriptor
+    elif isinstance(value, Layer):
+        return SharedLayer(
+            None if value.array is None else share(value.array, handles),
+            {
+                "bounds": value.bounds,
+                "crs": value.crs,
+                "driver": value.driver,
+                "no_data": value.no_data,
+                "transform": value.transform,
+                "units": value.units,
+            },
+            None if value.mask is None else share(value.mask, handles),
+        )
+    elif isinstance(value, dict):
+        return {key: share(item, handles) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(share(item, handles) for item in value)
+    return value
+
+
+def attach(value: Any) -> Any:
+    """
+    Replace the shared memory descriptors found in a process argument by their data.
+
+    Args:
+      value:
+        Process argument produced by share.
+
+    Returns:
+      The argument with its descriptors replaced by arrays and Layers.
+    """
+    if isinstance(value, (SharedArray, MappedArray, SharedLayer)):
+        return value.open()
+    elif isinstance(value, dict):
+        return {key: attach(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(attach(item) for item in value)
+    return value
+
+
+def release(handles: List[shared_memory.SharedMemory]):
+    """
+    Close and remove the shared memory blocks created by share.
+
+    Args:
+      handles:
+        List of shared memory blocks.
+    """
+    for block in handles:
+        _ATTACHED.pop(block.name, None)
+        block.close()
+        block.unlink()
+    handles.clear()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Workers Share the Resource Tracker of the Creating Process, Which Owns the Blocks
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,550 @@
+import importlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window as RasterioWindow
+from rforge.library.containers.grid import GridSpec
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.data_validation import check_alignment
+from rforge.library.tools.exceptions import Errors
+from rforge.library.tools.precision import get_precision, set_precision
+from rforge.library.tools.registry import ProcessInfo, call_halo, get_process
+from rforge.library.tools.shared_arrays import (
+    InheritedArray,
+    MappedArray,
+    attach,
+    release,
+    share,
+)
+
+Window = Tuple[int, int, int, int]
+
+# Output of the Tiles Computed by a Worker Process, Opened When the Worker Starts
+_OUTPUT: Optional[np.ndarray] = None
+
+
+class DatasetBand:
+    """Represents a band of an open rasterio dataset that is read window by window.
+
+    Attributes:
+        _dataset: Open rasterio dataset.
+        _band (int): Index of the band (starting at 1).
+        _lock (threading.Lock): Serializes reads, since datasets are not thread-safe.
+
+    Methods:
+        __init__: Initializes a DatasetBand instance.
+        __reduce__: Pickles the band as the path of its dataset.
+        __getitem__: Reads the pixels covered by a pair of slices.
+        shape: Getter for the band shape.
+        dtype: Getter for the band data type.
+        grid: Getter for the grid of the dataset.
+    """
+
+    def __init__(self, dataset, band: int = 1):
+        if not (isinstance(band, int) and 1 <= band <= dataset.count):
+            raise TypeError(
+                Errors.bad_input(name="band", expected_type="a valid band index")
+            )
+        self._dataset = dataset
+        self._band = band
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Worker Processes Re-Open the Dataset from Its Path
+        return _open_band, (self._dataset.name, self._band)
+
+    def __getitem__(self, key: Tuple[slice, slice]) -> np.ndarray:
+        rows, cols = key
+        row_off, row_end, _ = rows.indices(self._dataset.height)
+        col_off, col_end, _ = cols.indices(self._dataset.width)
+
+        with self._lock:
+            return self._dataset.read(
+                self._band,
+                window=RasterioWindow(
+                    col_off, row_off, col_end - col_off, row_end - row_off
+                ),
+            )
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self._dataset.height, self._dataset.width)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self._dataset.dtypes[self._band - 1])
+
+    @property
+    def grid(self) -> GridSpec:
+        transform = self._dataset.transform
+        return GridSpec(
+            self.shape,
+            (
+                transform.c,
+                transform.a,
+                transform.b,
+                transform.f,
+                transform.d,
+                transform.e,
+            ),
+            (
+                str(self._dataset.crs.to_epsg())
+                if self._dataset.crs.to_epsg() is not None
+                else "4326"
+            ),
+        )
+
+
+def check_tile_size(tile_size: Union[int, Tuple[int, int]]):
+    """
+    Check if a given tile size is a positive integer or a pair of positive integers.
+
+    Args:
+      tile_size:
+        Number of rows and columns of each tile, or a single value for square tiles.
+
+    Raises:
+      TypeError:
+        If the tile size is not valid.
+    """
+    if not (
+        (isinstance(tile_size, int) and tile_size > 0)
+        or (
+            isinstance(tile_size, tuple)
+            and len(tile_size) == 2
+            and all(isinstance(value, int) and value > 0 for value in tile_size)
+        )
+    ):
+        raise TypeError(
+            Errors.bad_input(
+                name="tile_size", expected_type="a positive integer or pair of integers"
+            )
+        )
+
+
+def tile_windows(
+    shape: Tuple[int, int], tile_size: Union[int, Tuple[int, int]]
+) -> Iterator[Window]:
+    """
+    Split a grid into tiles, in row-major order.
+
+    Args:
+      shape:
+        Number of rows and columns of the grid.
+      tile_size:
+        Number of rows and columns of each tile, or a single value for square tiles.
+
+    Returns:
+      Iterator over the (row_off, col_off, height, width) windows of the tiles.
+    """
+    tile_rows, tile_cols = (
+        (tile_size, tile_size) if isinstance(tile_size, int) else tile_size
+    )
+    for row_off in range(0, shape[0], tile_rows):
+        for col_off in range(0, shape[1], tile_cols):
+            yield (
+                row_off,
+                col_off,
+                min(tile_rows, shape[0] - row_off),
+                min(tile_cols, shape[1] - col_off),
+            )
+
+
+def expand_window(
+    window: Window, halo: int, shape: Tuple[int, int]
+) -> Tuple[Window, Tuple[slice, slice]]:
+    """
+    Grow a window by a halo, clipped to the grid.
+
+    Args:
+      window:
+        The (row_off, col_off, height, width) window to grow.
+      halo:
+        Number of pixels to add on each side.
+      shape:
+        Number of rows and columns of the grid.
+
+    Returns:
+      The grown window and the slices that crop it back to the original window.
+    """
+    row_off, col_off, height, width = window
+    top = min(halo, row_off)
+    left = min(halo, col_off)
+    bottom = min(halo, shape[0] - row_off - height)
+    right = min(halo, shape[1] - col_off - width)
+
+    outer = (row_off - top, col_off - left, height + top + bottom, width + left + right)
+    inner = (slice(top, top + height), slice(left, left + width))
+
+    return outer, inner
+
+
+def window_inputs(value: Any, shape: Tuple[int, int], window: Window) -> Any:
+    """
+    Cut the raster inputs of a process down to a window.
+
+    Layers, NumPy arrays and dataset bands lying on a grid of the given shape are
+    windowed. Lists, tuples and dictionaries are searched recursively and every other
+    value is returned unchanged.
+
+    Args:
+      value:
+        Process argument.
+      shape:
+        Number of rows and columns of the grid the window refers to.
+      window:
+        The (row_off, col_off, height, width) window.
+
+    Returns:
+      The argument restricted to the window.
+    """
+    row_off, col_off, height, width = window
+    rows = slice(row_off, row_off + height)
+    cols = slice(col_off, col_off + width)
+
+    if isinstance(value, Layer):
+        if value.array is not None and value.array.shape[:2] == shape:
+            return value.window(row_off, col_off, height, width)
+        return value
+    elif isinstance(value, np.ndarray):
+        if len(value.shape) >= 2 and value.shape[:2] == shape:
+            return value[rows, cols]
+        return value
+    elif isinstance(value, DatasetBand):
+        return value[rows, cols] if value.shape == shape else value
+    elif isinstance(value, dict):
+        return {key: window_inputs(item, shape, window) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return type(value)(window_inputs(item, shape, window) for item in value)
+    return value
+
+
+def raster_inputs(value: Any) -> list:
+    """
+    Collect the raster inputs of a process.
+
+    Args:
+      value:
+        Process argument. Lists, tuples and dictionaries are searched recursively.
+
+    Returns:
+      List with the Layers, NumPy arrays and dataset bands found.
+    """
+    if isinstance(value, (Layer, np.ndarray, DatasetBand)):
+        return [value]
+    elif isinstance(value, dict):
+        return [item for element in value.values() for item in raster_inputs(element)]
+    elif isinstance(value, (list, tuple)):
+        return [item for element in value for item in raster_inputs(element)]
+    return []
+
+
+def write_tile(destination: Any, window: Window, tile: np.ndarray):
+    """
+    Write a tile into a destination array or an open rasterio dataset.
+
+    Args:
+      destination:
+        NumPy array (or array-like supporting slice assignment) or rasterio dataset
+        opened for writing.
+      window:
+        The (row_off, col_off, height, width) window of the tile.
+      tile:
+        Tile data, with bands along the last axis.
+    """
+    row_off, col_off, height, width = window
+
+    if not isinstance(destination, np.ndarray) and hasattr(destination, "write"):
+        dataset_window = RasterioWindow(col_off, row_off, width, height)
+        if len(tile.shape) == 2:
+            destination.write(tile, 1, window=dataset_window)
+        else:
+            destination.write(np.moveaxis(tile, 2, 0), window=dataset_window)
+    else:
+        destination[row_off : row_off + height, col_off : col_off + width] = tile
+
+
+def run_tiled(
+    process: Union[str, Callable],
+    tile_size: Union[int, Tuple[int, int]] = 512,
+    destination: Optional[Any] = None,
+    backend: str = "serial",
+    workers: Optional[int] = None,
+    **kwargs,
+) -> Union[np.ndarray, Layer, Any]:
+    """
+    Run a registered process tile by tile and stitch the tiles into a destination.
+
+    Each tile is computed from a window of the inputs grown by the halo of the process,
+    so the stitched result matches running the process over the whole raster while peak
+    memory scales with the tile size. Processes registered without a halo, and calls the
+    process marks as depending on the whole raster, are run as a single tile.
+
+    With the 'process' backend, tiles are spread over a pool of worker processes. Input
+    arrays are copied once into shared memory (memory maps and dataset bands are
+    re-opened from their files), so workers never receive pickled pixels. Workers write
+    their tiles straight into memory map destinations, and otherwise into shared memory
+    that is returned as the result, so it is not copied once the tiles are done. The
+    'thread' backend runs tiles concurrently in a pool of threads of the current
+    process, which avoids the startup and transfer costs of processes and scales when
+    the process spends its time in kernels that release the GIL. The 'auto' backend
+    picks threads for processes registered as releasing the GIL and processes
+    otherwise.
+
+    Args:
+      process:
+        Registered process function or name.
+      tile_size:
+        Number of rows and columns of each tile, or a single value for square tiles.
+        Defaults to 512.
+      destination:
+        Layer, NumPy array (e.g. a memory map) or rasterio dataset opened for writing
+        that receives the result. Defaults to None, in which case the result is
+        allocated in memory.
+      backend:
+        Execution backend, either 'serial', 'thread', 'process' or 'auto'. Defaults to
+        'serial'.
+      workers:
+        Maximum number of worker threads or processes. Defaults to None, in which case
+        it is derived from the number of CPUs.
+      **kwargs:
+        Arguments of the process. Raster inputs can be Layers, NumPy arrays or
+        DatasetBand objects.
+
+    Returns:
+      The destination if one was given. Otherwise, the stitched result as a Layer, or as
+      a NumPy array if the 'as_array' argument is True.
+
+    Raises:
+      TypeError:
+        If inputs are not of the accepted type.
+    """
+    info = get_process(process)
+    as_array = kwargs.pop("as_array", False)
+    if not isinstance(as_array, bool):
+        raise TypeError(Errors.bad_input(name="as_array", expected_type="a boolean"))
+    if "out" in kwargs or "inplace" in kwargs:
+        raise TypeError(
+            Errors.bad_input(
+                name="out and inplace", expected_type="replaced by the destination"
+            )
+        )
+    check_tile_size(tile_size)
+    if backend not in ["serial", "thread", "process", "auto"]:
+        raise TypeError(
+            Errors.bad_input(
+                name="backend", expected_type="'serial', 'thread', 'process' or 'auto'"
+            )
+        )
+    if workers is not None and not (isinstance(workers, int) and workers > 0):
+        raise TypeError(
+            Errors.bad_input(name="workers", expected_type="a positive integer")
+        )
+    grid = check_alignment(*raster_inputs(kwargs))
+    if grid is None:
+        raise TypeError(
+            Errors.bad_input(name="inputs", expected_type="at least one raster layer")
+        )
+
+    halo = call_halo(info, kwargs)
+    windows = (
+        list(tile_windows(grid.shape, tile_size))
+        if halo is not None
+        else [(0, 0, grid.height, grid.width)]
+    )
+
+    if backend == "auto":
+        backend = "thread" if info["releases_gil"] else "process"
+
+    target = destination.modify() if isinstance(destination, Layer) else destination
+    if backend == "process" and len(windows) > 1:
+        target = _run_processes(
+            info, kwargs, grid.shape, windows, halo, workers, target
+        )
+    elif backend == "thread" and len(windows) > 1:
+        target = _run_threads(
+            info["function"], kwargs, grid.shape, windows, halo, workers, target
+        )
+    else:
+        for window in windows:
+            tile = compute_tile(
+                info["function"], kwargs, grid.shape, window, halo, target
+            )
+            if target is None:
+                target = np.empty(grid.shape + tile.shape[2:], dtype=tile.dtype)
+            if tile is not None:
+                write_tile(target, window, tile)
+
+    if destination is not None:
+        if isinstance(destination, Layer):
+            destination.array = target
+        return destination
+    return target if as_array else Layer(target)
+
+
+def compute_tile(
+    function: Callable,
+    kwargs: dict,
+    shape: Tuple[int, int],
+    window: Window,
+    halo: Optional[int],
+    target: Optional[Any] = None,
+) -> Optional[np.ndarray]:
+    """
+    Compute a single tile of a process.
+
+    Processes without a halo write the tile straight into a NumPy array target through
+    their 'out' argument, so no tile-sized result is allocated.
+
+    Args:
+      function:
+        Process function.
+      kwargs:
+        Arguments of the process, covering the whole grid.
+      shape:
+        Number of rows and columns of the grid.
+      window:
+        The (row_off, col_off, height, width) window of the tile.
+      halo:
+        Number of pixels of context the process needs around the tile.
+      target:
+        Array holding the whole result, if already allocated. Defaults to None.
+
+    Returns:
+      Tile data, cropped back to the window, or None if it was written into the target.
+    """
+    if halo == 0 and isinstance(target, np.ndarray):
+        row_off, col_off, height, width = window
+        function(
+            **window_inputs(kwargs, shape, window),
+            as_array=True,
+            out=target[row_off : row_off + height, col_off : col_off + width],
+        )
+        return None
+
+    outer, inner = expand_window(window, halo or 0, shape)
+    return function(**window_inputs(kwargs, shape, outer), as_array=True)[inner]
+
+
+def _run_threads(
+    function: Callable,
+    kwargs: dict,
+    shape: Tuple[int, int],
+    windows: List[Window],
+    halo: Optional[int],
+    workers: Optional[int],
+    target: Any,
+) -> Any:
+    # The First Tile Sets the Data Type and Bands of the Output
+    tile = compute_tile(function, kwargs, shape, windows[0], halo)
+    if target is None:
+        target = np.empty(shape + tile.shape[2:], dtype=tile.dtype)
+    write_tile(target, windows[0], tile)
+
+    # Tiles Are Disjoint, so Only Writes to Datasets Need to Be Serialized
+    lock = threading.Lock()
+
+    def run(window: Window):
+        tile = compute_tile(function, kwargs, shape, window, halo, target)
+        if tile is None:
+            return
+        if isinstance(target, np.ndarray):
+            write_tile(target, window, tile)
+        else:
+            with lock:
+                write_tile(target, window, tile)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(run, windows[1:]):
+            pass
+    return target
+
+
+def _run_processes(
+    info: ProcessInfo,
+    kwargs: dict,
+    shape: Tuple[int, int],
+    windows: List[Window],
+    halo: Optional[int],
+    workers: Optional[int],
+    target: Any,
+) -> Any:
+    # Workers Look the Process Up by Name After Importing Its Module
+    process = (info["function"].__module__, info["name"])
+
+    # The First Tile Sets the Data Type and Bands of the Output
+    tile = compute_tile(info["function"], kwargs, shape, windows[0], halo)
+
+    # Workers Write Straight Into Memory Map Destinations and Otherwise Into Shared
+    # Memory That Becomes the Result, so Neither Is Copied Once the Tiles Are Done
+    if (
+        isinstance(target, np.memmap)
+        and target.filename is not None
+        and target.flags.writeable
+        and (target.flags.c_contiguous or target.flags.f_contiguous)
+    ):
+        output, buffer = MappedArray(target, writeable=True), target
+    else:
+        output = InheritedArray(shape + tile.shape[2:], tile.dtype)
+        buffer = output.open()
+    write_tile(buffer, windows[0], tile)
+
+    handles = []
+    try:
+        shared = share(kwargs, handles)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_open_output, initargs=(output,)
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _process_tile,
+                    process,
+                    shared,
+                    shape,
+                    window,
+                    halo,
+                    get_precision(),
+                )
+                for window in windows[1:]
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        release(handles)
+
+    if target is None or buffer is target:
+        return buffer
+    write_tile(target, (0, 0) + shape, buffer)
+    return target
+
+
+def _open_output(output: Union[InheritedArray, MappedArray]):
+    # Workers Open the Output Once, When the Pool Starts Them
+    global _OUTPUT
+    _OUTPUT = output.open()
+
+
+def _process_tile(
+    process: Tuple[str, str],
+    kwargs: dict,
+    shape: Tuple[int, int],
+    window: Window,
+    halo: Optional[int],
+    precision: Optional[str],
+):
+    # Workers Don't Inherit the Global Precision Under Spawn
+    set_precision(precision)
+    module, name = process
+    importlib.import_module(module)
+    function = get_process(name)["function"]
+
+    tile = compute_tile(function, attach(kwargs), shape, window, halo, _OUTPUT)
+    if tile is not None:
+        write_tile(_OUTPUT, window, tile)
+
+
+def _open_band(path: str, band: int) -> DatasetBand:
+    return DatasetBand(rasterio.open(path), band)
@@ -1,7 +1,6 @@
 import numpy as np
 import pytest
 
-
 np.random.seed(42)
 
 
@@ -0,0 +1,86 @@
+import pickle
+
+import numpy as np
+import pytest
+from rforge.library.containers.grid import GridSpec
+from rforge.library.containers.layer import Layer
+from rforge.library.tools.data_validation import check_alignment
+
+
+def test_init(transform, crs):
+    """Test GridSpec initialization, interning and hashing."""
+    g = GridSpec((7, 7), transform, crs)
+
+    assert isinstance(g, GridSpec)
+    assert g.shape == (7, 7)
+    assert g.transform == transform
+    assert g.crs == crs
+    assert g.resolution == transform[1]
+    assert GridSpec((7, 7), transform, crs) is g
+    assert hash(GridSpec((7, 7), transform, crs)) == hash(g)
+    assert pickle.loads(pickle.dumps(g)) is g
+    assert GridSpec((7, 8), transform, crs) != g
+    with pytest.raises(AttributeError):
+        g._crs = "EEEE"
+
+
+def test_init_transform_error(transform_error):
+    """Test GridSpec initialization function for expected errors."""
+    with pytest.raises(transform_error[1]):
+        GridSpec((7, 7), transform_error[0])
+
+
+def test_init_crs_error(crs_error):
+    """Test GridSpec initialization function for expected errors."""
+    with pytest.raises(crs_error[1]):
+        GridSpec((7, 7), None, crs_error[0])
+
+
+def test_window(transform, crs):
+    """Test sub-grid derivation from a window."""
+    g = GridSpec((7, 7), transform, crs)
+    w = g.window(2, 3, 4, 4)
+
+    assert w.shape == (4, 4)
+    assert w.crs == crs
+    assert w.transform[0] == transform[0] + transform[1] * 3 + transform[2] * 2
+    assert w.transform[3] == transform[3] + transform[4] * 3 + transform[5] * 2
+    assert g.window(0, 0, 7, 7) is g
+    with pytest.raises(TypeError):
+        g.window(5, 5, 4, 4)
+
+
+def test_layer_grid(array, transform, crs):
+    """Test that layers on the same grid share a single GridSpec."""
+    a = Layer(array=array, transform=transform, crs=crs)
+    b = Layer(array=array.copy(), transform=transform, crs=crs)
+
+    assert a.grid is b.grid
+    assert a.grid.bounds["left"] <= a.grid.bounds["right"]
+    assert a.grid.bounds["bottom"] <= a.grid.bounds["top"]
+    assert Layer().grid is None
+
+    # The Grid Is Stored and Follows the Setters
+    grid = a.grid
+    assert a.grid is grid and a.copy().grid is grid
+    assert a.window(0, 0, 2, 2).grid is grid.window(0, 0, 2, 2)
+    assert pickle.loads(pickle.dumps(a)).grid is grid
+    a.crs = "1234"
+    assert a.grid.crs == "1234" and a.grid is not grid
+    a.array = array[:2]
+    assert a.grid.shape == array[:2].shape[:2]
+    assert Layer(array=array, transform=transform, crs=crs, grid=grid).grid is grid
+    with pytest.raises(TypeError):
+        Layer(array=array[:2], transform=transform, crs=crs, grid=grid)
+
+
+def test_alignment(array, transform, crs):
+    """Test alignment checks between layers and arrays."""
+    a = Layer(array=array, transform=transform, crs=crs)
+    b = Layer(array=array, transform=transform, crs=crs)
+
+    assert check_alignment(a, b, array, None) is a.grid
+    with pytest.raises(TypeError):
+        check_alignment(a, np.zeros((3, 3)))
+    with pytest.raises(TypeError):
+        check_alignment(a, Layer(array=array, transform=transform, crs="EEEE"))
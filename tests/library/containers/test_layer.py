@@ -295,3 +295,94 @@ def test_import_error(data_import_error):
     with pytest.raises(error):
         l = Layer()
         l.import_layer(data_path, 1, scale)
+
+
+def test_coordinates(array, transform):
+    """Test batch conversion between world coordinates and pixel indices."""
+    l = Layer(array=array, transform=transform)
+    rows, cols = np.meshgrid(np.arange(l.height), np.arange(l.width), indexing="ij")
+
+    xs, ys = l.pixel_to_world(rows, cols)
+    new_rows, new_cols = l.world_to_pixel(xs, ys)
+
+    assert np.array_equal(new_rows, rows)
+    assert np.array_equal(new_cols, cols)
+    assert np.array_equal(l.sample(xs, ys), array)
+
+
+def test_coordinates_error(array):
+    """Test coordinate conversion for expected errors."""
+    l = Layer(array=array)
+    with pytest.raises(TypeError):
+        l.world_to_pixel([0.0], [0.0])
+
+
+def test_sample_outside(array, transform):
+    """Test sampling of points that fall outside the layer."""
+    l = Layer(array=array, transform=transform, no_data=-1)
+    xs, ys = l.pixel_to_world([0, -1, 7], [0, 0, 3])
+
+    values = l.sample(xs, ys)
+
+    assert values[0] == array[0, 0]
+    assert values[1] == -1 and values[2] == -1
+    assert np.isnan(l.sample(xs, ys, fill=np.nan)[1])
+
+
+def test_copy(array, bounds, crs, transform):
+    """Test copy-on-write duplication of layers."""
+    data = array.copy()
+    l = Layer(array=data, bounds=bounds, crs=crs, transform=transform)
+    c = l.copy()
+    d = l.copy()
+
+    assert np.shares_memory(c.array, data) and np.shares_memory(d.array, data)
+    assert not c.array.flags.writeable
+    with pytest.raises(ValueError):
+        c.array[0, 0] = 0
+
+    c.modify()[0, 0] = 0
+
+    assert c.array[0, 0] == 0
+    assert d.array[0, 0] == array[0, 0]
+    assert not np.shares_memory(c.array, data)
+    assert c.modify() is c.array
+
+    # The Original Stays Writable, Leaving Its Duplicates Untouched
+    assert d == l
+    assert l.array.flags.writeable
+    l.array[0, 0] = 0
+    assert l.array[0, 0] == 0
+    assert d.array[0, 0] == array[0, 0]
+    assert c.array[0, 0] == 0
+    assert l.array is l.modify()
+
+    # Without Duplicates Left the Original Keeps Its Own Buffer
+    m = Layer(array=data, transform=transform)
+    m.copy()
+    assert m.array is data
+
+
+def test_mask():
+    """Test that masks are stored apart from the data and shared by reference."""
+    array = np.arange(48, dtype=np.float32).reshape(6, 8)
+    mask = array > 10
+    l = Layer(array=array, transform=(1.0, 0.0, 0.0, 0.0, -1.0, 0.0), mask=mask)
+
+    assert np.shares_memory(l.mask, mask) and not l.mask.flags.writeable
+    assert l.copy().mask is l.mask
+    assert l.copy() == l
+    assert l != Layer(array=array, transform=l.transform)
+    assert np.array_equal(l.window(1, 2, 3, 4).mask, mask[1:4, 2:6])
+
+    stacked = l.stack_mask()
+    assert stacked.shape == (6, 8, 2)
+    assert np.array_equal(stacked[:, :, 1], np.where(mask, 255, 0))
+    l.mask = None
+    assert l.stack_mask() is l.array
+
+    for mask_error in [mask.astype(np.float32), mask[:3], [True], mask[:, :, None]]:
+        with pytest.raises(TypeError):
+            Layer(array=array, mask=mask_error)
+        with pytest.raises(TypeError):
+            l.mask = mask_error
@@ -1,7 +1,10 @@
 import json
 from itertools import combinations
 
+import numpy as np
 import pytest
+from rforge.library.containers.grid import GridSpec
+from rforge.library.containers.layer import Layer
 from rforge.library.containers.raster import Raster
 
 
@@ -132,6 +135,13 @@ def test_import(data_import):
         else:
             assert r.count == info["band_num"]
 
+        # Every Layer Owns Its Bounds
+        layers = list(r.layers.values())
+        left = layers[0].bounds["left"]
+        layers[0].bounds["left"] += 1
+        assert all(layer.bounds["left"] == left for layer in layers[1:])
+        assert all(layer.grid is layers[0].grid for layer in layers)
+
 
 def test_import_errors(data_import_error):
     data_path = data_import_error.get("data_path", None)
@@ -141,3 +151,49 @@ def test_import_errors(data_import_error):
     with pytest.raises(error):
         r = Raster(scale)
         r.import_layers(data_path, None)
+
+
+def test_group_by_grid(scale, layer_dict):
+    r = Raster(scale, layer_dict)
+    groups = r.group_by_grid()
+
+    assert sorted(sum(groups.values(), [])) == sorted(layer_dict.keys())
+    for grid, names in groups.items():
+        assert all(r.layers[name].grid is grid for name in names)
+
+
+def test_sample(scale, layer_dict, transform):
+    layers = {
+        name: Layer(array=layer.array, transform=transform)
+        for name, layer in layer_dict.items()
+    }
+    r = Raster(scale, layers)
+    xs, ys = GridSpec((7, 7), transform).pixel_to_world([0, 3, 6], [6, 3, 0])
+
+    values = r.sample(xs, ys)
+
+    assert sorted(values.keys()) == sorted(layers.keys())
+    for name, layer in layers.items():
+        assert np.array_equal(values[name], layer.array[[0, 3, 6], [6, 3, 0]])
+
+
+def test_duplicate(scale, layer_dict_name, layer_dict_name_alt, layer_dict_value):
+    data = layer_dict_value.array.copy()
+    r = Raster(scale, {layer_dict_name: Layer(data)})
+    r.duplicate_layer(layer_dict_name, layer_dict_name_alt)
+
+    assert r.count == 2
+    assert np.shares_memory(r.layers[layer_dict_name_alt].array, data)
+    assert r.layers[layer_dict_name_alt] == r.layers[layer_dict_name]
+    assert r.layers[layer_dict_name].array.flags.writeable
+
+
+def test_duplicate_error(
+    scale, layer_dict_name, layer_dict_name_alt, layer_dict_value, layer_dict_name_error
+):
+    r = Raster(scale, {layer_dict_name: layer_dict_value})
+
+    with pytest.raises(layer_dict_name_error[1]):
+        r.duplicate_layer(layer_dict_name, layer_dict_name_error[0])
+    with pytest.raises(layer_dict_name_error[1]):
+        r.duplicate_layer(layer_dict_name_error[0], layer_dict_name_alt)
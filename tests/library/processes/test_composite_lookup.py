@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+
+np.random.seed(42)
+
+SIZE = (50, 35)
+
+
+def test_lookup():
+    """Test that gamma keeps unsigned 8 and 16-bit types through lookup tables."""
+    gamma = (0.5, 1, 2.2)
+    for dtype in (np.uint8, np.uint16):
+        maximum = np.iinfo(dtype).max
+        layers = [np.random.randint(0, maximum + 1, SIZE).astype(dtype) for _ in gamma]
+        result = composite(layers, gamma=gamma, as_array=True)
+        assert result.dtype == dtype
+        expected = maximum * np.power(np.dstack(layers) / maximum, np.array(gamma))
+        assert np.array_equal(result, np.round(expected))
+        assert np.array_equal(result[:, :, 1], layers[1])
+
+
+def test_lookup_outputs():
+    """Test lookup tables with alpha, output buffers and mixed unsigned types."""
+    red = np.random.randint(0, 256, SIZE).astype(np.uint8)
+    nir = np.random.randint(0, 65536, SIZE).astype(np.uint16)
+    alpha = np.full(SIZE, 255, dtype=np.uint8)
+
+    result = composite([red, nir], alpha=alpha, gamma=[2, 0.5], as_array=True)
+    assert result.dtype == np.uint16
+    assert np.array_equal(result[:, :, 0], np.round(255 * (red / 255) ** 2))
+    assert np.array_equal(result[:, :, 1], np.round(65535 * (nir / 65535) ** 0.5))
+    assert np.array_equal(result[:, :, 2], alpha)
+
+    out = Layer(np.zeros(SIZE + (3,), dtype=np.uint16))
+    assert composite([red, nir], alpha=alpha, gamma=[2, 0.5], out=out) is out
+    assert np.array_equal(out.array, result)
+
+
+def test_float_gamma():
+    """Test that float layers, precisions and scales keep the power path."""
+    layers = [np.random.uniform(0, 1, SIZE) for _ in range(2)]
+    result = composite(layers, gamma=(0.5, 2), as_array=True)
+    assert np.allclose(result, np.dstack([layers[0] ** 0.5, layers[1] ** 2]))
+
+    red = np.random.randint(0, 256, SIZE).astype(np.uint8)
+    result = composite([red], gamma=[2], as_array=True, precision="float64")
+    assert result.dtype == np.float64
+    assert np.allclose(result[:, :, 0], red.astype(np.float64) ** 2)
+
+    result = composite([red], gamma=[2], scales=[1 / 255], as_array=True)
+    assert np.allclose(result[:, :, 0], (red / 255) ** 2)
+
+    with pytest.raises(TypeError):
+        composite([red], gamma=["2"])
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+
+np.random.seed(42)
+
+SIZE = (40, 55)
+
+red = np.random.uniform(0, 0.3, SIZE)
+green = np.random.uniform(0.1, 0.5, SIZE)
+blue = np.random.uniform(-1, 1, SIZE)
+
+
+def _expected(array, low, high, gamma=1.0):
+    values = np.clip((array - low) / (high - low), 0, 1) ** gamma
+    return np.floor(values * 255 + 0.5).astype(np.uint8)
+
+
+def test_render():
+    """Test that layers are stretched, corrected and interleaved as RGBA and BGRA."""
+    alpha = np.random.randint(0, 300, SIZE)
+    result = composite(
+        [red, green, blue], alpha=alpha, gamma=(1, 0.5, 2), render="RGBA", as_array=True
+    )
+    assert result.dtype == np.uint8
+    assert result.shape == SIZE + (4,)
+    expected = [
+        _expected(red, red.min(), red.max()),
+        _expected(green, green.min(), green.max(), 0.5),
+        _expected(blue, blue.min(), blue.max(), 2),
+    ]
+    for channel in range(3):
+        assert np.abs(result[:, :, channel].astype(int) - expected[channel]).max() <= 1
+    assert np.array_equal(result[:, :, 3], np.clip(alpha, 0, 255))
+
+    bgra = composite(
+        [red, green, blue], alpha=alpha, gamma=(1, 0.5, 2), render="BGRA", as_array=True
+    )
+    assert np.array_equal(bgra, result[:, :, [2, 1, 0, 3]])
+
+
+def test_render_stretch():
+    """Test fixed stretches, scales and NaN values in rendered images."""
+    values = red.copy()
+    values[0, 0] = np.nan
+    result = composite(
+        [values, green, blue],
+        stretch=[(0, 0.2), (0.2, 0.4), (-0.5, 0.5)],
+        scales=[1, 1, 0.5],
+        render="RGBA",
+        precision="float64",
+        as_array=True,
+    )
+    assert np.array_equal(result[1:, :, 0], _expected(values[1:], 0, 0.2))
+    assert result[0, 0, 0] == 0
+    assert np.array_equal(result[:, :, 1], _expected(green, 0.2, 0.4))
+    assert np.array_equal(result[:, :, 2], _expected(blue * 0.5, -0.5, 0.5))
+    assert np.all(result[:, :, 3] == 255)
+
+
+def test_render_lookup():
+    """Test that unsigned integer layers are rendered through lookup tables."""
+    for dtype in (np.uint8, np.uint16):
+        maximum = np.iinfo(dtype).max
+        gray = np.random.randint(0, maximum + 1, SIZE).astype(dtype)
+        result = composite([gray], gamma=[0.8], render="BGRA", as_array=True)
+        expected = _expected(gray.astype(np.float64), gray.min(), gray.max(), 0.8)
+        for channel in range(3):
+            assert np.array_equal(result[:, :, channel], expected)
+
+        result = composite([gray], stretch=[(0, maximum)], render="RGBA", as_array=True)
+        assert np.array_equal(result[:, :, 0], _expected(gray, 0, maximum))
+
+
+def test_render_out():
+    """Test that rendered images are written into preallocated buffers."""
+    out = np.zeros(SIZE + (4,), dtype=np.uint8)
+    result = composite([red, green, blue], render="RGBA", out=out, as_array=True)
+    assert result is out
+    expected = composite([red, green, blue], render="RGBA", as_array=True)
+    assert np.array_equal(out, expected)
+
+    layer = Layer(np.zeros(SIZE + (4,), dtype=np.uint8))
+    assert composite([red, green, blue], render="RGBA", out=layer) is layer
+    assert np.array_equal(layer.array, expected)
+
+
+def test_render_error():
+    """Test that invalid render arguments are rejected."""
+    with pytest.raises(TypeError):
+        composite([red, green, blue], render="RGB")
+    with pytest.raises(TypeError):
+        composite([red, green], render="RGBA")
+    with pytest.raises(TypeError):
+        composite([red], stretch=[(0, 1)])
+    with pytest.raises(TypeError):
+        composite([red], stretch=[(1, 0)], render="RGBA")
+    with pytest.raises(TypeError):
+        composite([red, green, blue], render="RGBA", out=np.zeros(SIZE + (3,)))
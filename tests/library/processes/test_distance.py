@@ -1,9 +1,11 @@
 import hashlib
 import pickle
 
+import cv2
 import numpy as np
 import pytest
-from rforge.library.processes.distance import distance
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.distance import distance, distance_tiled
 
 from tests.files.benchmarks.test_data import DISTANCE_TEST_DATA
 
@@ -123,3 +125,213 @@ def test_as_array_errors(layer, alpha, thresholds, invert, mask_size, as_array_e
             mask_size=mask_size,
             as_array=as_array_error[0],
         )
+
+
+def test_tiled():
+    """Test that the strip-wise exact distance matches the exact in-memory path."""
+    array = np.random.rand(67, 45) * 100
+    for thresholds, invert in [((0, 5), False), ((0, 5), True), ((20, 90), False)]:
+        expected = distance(
+            array, thresholds=thresholds, invert=invert, mask_size=0, as_array=True
+        )
+        for strip_size in [1, 8, 30, 512]:
+            result = distance_tiled(
+                array,
+                thresholds=thresholds,
+                invert=invert,
+                strip_size=strip_size,
+                as_array=True,
+            )
+            assert result.dtype == np.float32
+            assert np.allclose(result, expected, rtol=1e-5, atol=1e-4)
+
+    features = np.ones((20, 30))
+    assert np.array_equal(
+        distance_tiled(features, strip_size=6, as_array=True),
+        distance(features, mask_size=0, as_array=True),
+    )
+
+
+def test_tiled_units():
+    """Test map units against a brute-force search on a grid with rectangular pixels."""
+    array = np.ones((25, 40), dtype=np.uint8)
+    array[np.random.rand(25, 40) > 0.97] = 0
+    layer = Layer(array, transform=(500, 2.0, 0, 900, 0, -3.0))
+    result = distance_tiled(layer, units="map", strip_size=4, as_array=True)
+
+    rows, cols = np.nonzero(array == 0)
+    grid_rows, grid_cols = np.mgrid[0:25, 0:40]
+    nearest = np.sqrt(
+        np.min(
+            ((grid_rows[..., None] - rows) * 3.0) ** 2
+            + ((grid_cols[..., None] - cols) * 2.0) ** 2,
+            axis=2,
+        )
+    )
+    assert np.allclose(result, np.abs(nearest.max() - nearest), atol=1e-4)
+
+
+def test_tiled_destination(tmp_path):
+    """Test strip-wise distances written into memory-mapped and Layer destinations."""
+    array = np.random.rand(40, 35) * 100
+    alpha = np.full((40, 35), 255)
+    expected = distance(
+        array, alpha=alpha, thresholds=(0, 10), mask_size=0, as_array=True
+    )
+
+    output = np.memmap(
+        tmp_path / "distance.dat", dtype=np.float64, mode="w+", shape=(40, 35, 2)
+    )
+    result = distance_tiled(
+        array,
+        alpha=alpha,
+        thresholds=(0, 10),
+        strip_size=9,
+        destination=output,
+        workspace=str(tmp_path),
+    )
+    assert result is output
+    assert np.allclose(output, expected, atol=1e-4)
+
+    layer = distance_tiled(array, thresholds=(0, 10), destination=Layer())
+    assert np.allclose(layer.array, expected[:, :, 0], atol=1e-4)
+
+
+def test_tiled_errors():
+    """Test strip-wise distance arguments for expected errors."""
+    array = np.random.rand(10, 10)
+    for kwargs in [
+        {"units": "meters"},
+        {"units": "map"},
+        {"strip_size": 0},
+        {"thresholds": (5, 1)},
+        {"invert": 1},
+        {"as_array": "yes"},
+    ]:
+        with pytest.raises(TypeError):
+            distance_tiled(array, **kwargs)
+
+
+def test_classes(layer, alpha):
+    """Test that a list of threshold ranges stacks the distance field of every range."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    low, high = float(array.min()), float(array.max())
+    step = (high - low) / 4
+    for ranges in [
+        [(low, low + step), (low + 2 * step, high)],
+        [(low, low + 3 * step), (low + step, high)],
+        [(low + step, low + 2 * step)],
+    ]:
+        for invert in [False, True]:
+            result = distance(
+                layer,
+                alpha=alpha,
+                thresholds=ranges,
+                invert=invert,
+                as_array=True,
+                workers=2,
+            )
+            bands = len(ranges) + (alpha is not None)
+            assert result.shape == array.shape + (bands,)
+            for band, thresholds in enumerate(ranges):
+                expected = distance(
+                    layer, thresholds=thresholds, invert=invert, as_array=True
+                )
+                assert np.array_equal(result[:, :, band], expected)
+
+    out = np.zeros(array.shape + (2,), dtype=np.float64)
+    ranges = [(low, low + step), (low + step, high)]
+    assert distance(layer, thresholds=ranges, as_array=True, out=out) is out
+    assert np.array_equal(out, distance(layer, thresholds=ranges, as_array=True))
+
+
+def test_classes_labels():
+    """Test the single-pass labeling of 8 and 16-bit layers against separate ranges."""
+    for array in [
+        np.random.randint(0, 256, (30, 40)).astype(np.uint8),
+        np.random.randint(-500, 500, (30, 40)).astype(np.int16),
+    ]:
+        low, high = int(array.min()), int(array.max())
+        ranges = [(low, low + 40), (low + 41, low + 90), (high - 60, high)]
+        for invert in [False, True]:
+            result = distance(array, thresholds=ranges, invert=invert, as_array=True)
+            for band, thresholds in enumerate(ranges):
+                expected = distance(
+                    array, thresholds=thresholds, invert=invert, as_array=True
+                )
+                assert np.array_equal(result[:, :, band], expected)
+
+
+def test_classes_errors():
+    """Test threshold ranges and workers for expected errors."""
+    array = np.random.rand(10, 10)
+    for kwargs in [
+        {"thresholds": []},
+        {"thresholds": [(0, 0.5), (0.7, 0.2)]},
+        {"thresholds": [(0, 0.5), "A"]},
+        {"thresholds": [(0, 0.5)], "workers": 0},
+    ]:
+        with pytest.raises(TypeError):
+            distance(array, **kwargs)
+    with pytest.raises(TypeError):
+        distance_tiled(array, thresholds=[(0, 0.5), (0.6, 1)])
+
+
+def test_labels(layer, alpha):
+    """Test that labels append the nearest feature component and the components."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    thresholds = (float(array.min()), float(np.median(array)))
+    result = distance(
+        layer, alpha=alpha, thresholds=thresholds, labels=True, as_array=True
+    )
+    assert result.shape == array.shape + (3 + (alpha is not None),)
+    assert np.array_equal(
+        result[:, :, 0], distance(layer, thresholds=thresholds, as_array=True)
+    )
+
+    features = ~((array >= thresholds[0]) & (array <= thresholds[1]))
+    allocation, components = result[:, :, 1], result[:, :, 2]
+    assert np.array_equal(components[features], allocation[features])
+    assert np.all(components[~features] == 0)
+
+
+def test_allocation():
+    """Test the allocation band against a brute-force nearest feature search."""
+    array = np.ones((60, 80), dtype=np.uint8)
+    array[np.random.rand(60, 80) > 0.98] = 0
+    array[10:14, 20:30] = 0
+    result = distance(array, mask_size=5, labels=True, as_array=True)
+    allocation, components = result[:, :, 1], result[:, :, 2]
+
+    # Delivered and Preallocated Results Share the float32 Type
+    assert result.dtype == np.float32
+    out = np.zeros(result.shape, dtype=np.float32)
+    distance(array, mask_size=5, labels=True, out=out)
+    assert np.array_equal(out, result)
+
+    # Components Are the 8-Connected Groups of Features, Numbered From 1
+    count, groups = cv2.connectedComponents((array == 0).astype(np.uint8), 8)
+    assert components.max() == count - 1
+    for group in range(1, count):
+        assert len(np.unique(components[groups == group])) == 1
+
+    # Every Pixel Is Allocated to a Component Holding a Nearest Feature
+    rows, cols = np.nonzero(array == 0)
+    grid_rows, grid_cols = np.mgrid[0:60, 0:80]
+    gaps = np.hypot(grid_rows[..., None] - rows, grid_cols[..., None] - cols)
+    nearest = gaps.min(axis=2)
+    allocated = np.where(components[rows, cols] == allocation[..., None], gaps, np.inf)
+    assert np.all(allocated.min(axis=2) <= nearest + 1)
+
+    assert np.allclose(
+        result[:, :, 0], distance(array, mask_size=5, as_array=True), atol=1e-3
+    )
+
+
+def test_labels_errors():
+    """Test labels arguments for expected errors."""
+    array = np.random.rand(10, 10)
+    with pytest.raises(TypeError):
+        distance(array, labels=1)
+    with pytest.raises(TypeError):
+        distance(array, thresholds=[(0, 0.2), (0.5, 1)], labels=True)
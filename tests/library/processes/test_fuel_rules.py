@@ -0,0 +1,275 @@
+import numpy as np
+import pytest
+from rasterio.io import MemoryFile
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.fuel import (
+    fuel,
+    fuel_sweep,
+    fuel_tiled,
+    iter_fuel_sweep,
+)
+from rforge.library.tools import blocks as blocks_module
+from rforge.library.tools.tiling import DatasetBand
+
+np.random.seed(42)
+
+SIZE = (90, 70)
+
+coverage = np.random.uniform(0, 100, SIZE)
+height = np.random.uniform(0, 25, SIZE)
+distance = np.random.uniform(0, 60, SIZE)
+water = (np.random.rand(*SIZE) > 0.9).astype(np.uint8)
+artificial = (np.random.rand(*SIZE) > 0.8).astype(np.uint8)
+
+INPUTS = {
+    "coverage": coverage,
+    "height": height,
+    "distance": distance,
+    "water": water,
+    "artificial": artificial,
+}
+
+
+def test_default_rules():
+    """Test that the default rule table reproduces the fuel classification."""
+    models = (1, 4, 7)
+    tree_height = 8.5
+    result = fuel(**INPUTS, models=models, tree_height=tree_height, as_array=True)
+    assert result.dtype == np.uint8
+
+    maximum = np.floor(distance.max())
+    band = np.floor(distance.max() * 0.95)
+    understory = np.mean(np.where(height < tree_height, coverage, 0))
+    expected = np.full(SIZE, models[2])
+    expected[height >= tree_height] = models[1] if understory > 100 / 3 else models[0]
+    expected[distance >= maximum] = 99
+    expected[(distance >= band) & (distance < maximum)] = 224
+    expected[(artificial > 0) & (expected == 99)] = 91
+    expected[water > 0] = 98
+    assert np.array_equal(result, expected)
+
+
+def test_custom_rules():
+    """Test that a custom rule table takes the code of the first matching rule."""
+    rules = [
+        {"code": 10, "when": [("water", "==", 1)]},
+        {"code": 20, "when": [("height", ">", "tree_height"), ("coverage", ">", 50)]},
+        {"code": "trees", "when": [("height", ">", "tree_height")]},
+        {"code": 30, "when": [("understory", "<", 0)]},
+        {"code": "background", "when": []},
+    ]
+    result = fuel(
+        **INPUTS, models=(1, 2, 3), tree_height=10, rules=rules, as_array=True
+    )
+
+    expected = np.full(SIZE, 3, dtype=np.uint8)
+    expected[height > 10] = 1
+    expected[(height > 10) & (coverage > 50)] = 20
+    expected[water == 1] = 10
+    assert np.array_equal(result, expected)
+
+
+def test_blocks():
+    """Test that the classification doesn't depend on the size of the blocks."""
+    expected = fuel(**INPUTS, models=(1, 2, 3), tree_height=5, as_array=True)
+    block_size = blocks_module.BLOCK_SIZE
+    try:
+        for value in (1, 100, 71, 10**6):
+            blocks_module.BLOCK_SIZE = value
+            result = fuel(**INPUTS, models=(1, 2, 3), tree_height=5, as_array=True)
+            assert np.array_equal(result, expected)
+    finally:
+        blocks_module.BLOCK_SIZE = block_size
+
+
+def test_rules_error():
+    """Test that invalid rule tables and models are rejected."""
+    for rules in [
+        [],
+        "rules",
+        [{"code": 1}],
+        [{"code": 256, "when": []}],
+        [{"code": "grass", "when": []}],
+        [{"code": 1, "when": [("slope", ">", 0)]}],
+        [{"code": 1, "when": [("height", "=>", 0)]}],
+        [{"code": 1, "when": [("height", ">")]}],
+    ]:
+        with pytest.raises(TypeError):
+            fuel(**INPUTS, models=(1, 2, 3), tree_height=5, rules=rules)
+    with pytest.raises(TypeError):
+        fuel(**INPUTS, models=(1, 2, 300), tree_height=5)
+
+
+def test_sweep():
+    """Test that a sweep stacks the fuel maps of every scenario in order."""
+    models = [(1, 2, 3), (4, 5, 6)]
+    tree_heights = [3, 12.5, 20]
+    alpha = np.full(SIZE, 255)
+    result = fuel_sweep(**INPUTS, models=models, tree_heights=tree_heights, alpha=alpha)
+    assert isinstance(result, Layer)
+    assert result.array.shape == SIZE + (7,)
+    assert np.array_equal(result.array[:, :, -1], alpha)
+
+    band = 0
+    for tree_height in tree_heights:
+        for scenario in models:
+            expected = fuel(
+                **INPUTS, models=scenario, tree_height=tree_height, as_array=True
+            )
+            assert np.array_equal(result.array[:, :, band], expected)
+            band += 1
+
+
+def test_iter_sweep():
+    """Test that streamed scenarios match single fuel maps, including custom rules."""
+    rules = [
+        {"code": "shrubs", "when": [("height", ">", "tree_height")]},
+        {"code": 50, "when": [("distance", "<", 10)]},
+        {"code": "background", "when": [("coverage", ">", "understory")]},
+    ]
+    models = [(1, 2, 3), (7, 8, 9), (4, 5, 6)]
+    scenarios = list(
+        iter_fuel_sweep(**INPUTS, models=models, tree_heights=[6, 9], rules=rules)
+    )
+    assert [item[:2] for item in scenarios] == [
+        (tree_height, scenario) for tree_height in [6, 9] for scenario in models
+    ]
+    for tree_height, scenario, result in scenarios:
+        expected = fuel(
+            **INPUTS,
+            models=scenario,
+            tree_height=tree_height,
+            rules=rules,
+            as_array=True,
+        )
+        assert result.dtype == np.uint8
+        assert np.array_equal(result, expected)
+
+
+def test_sweep_error():
+    """Test that invalid scenarios are rejected."""
+    for models, tree_heights in [
+        ([], [5]),
+        ((1, 2, 3), [5]),
+        ([(1, 2, 3)], []),
+        ([(1, 2, 3)], 5),
+        ([(1, 2, 3)], ["5"]),
+        ([(1, 2, 3), (1, 2)], [5]),
+    ]:
+        with pytest.raises(TypeError):
+            fuel_sweep(**INPUTS, models=models, tree_heights=tree_heights)
+        with pytest.raises(TypeError):
+            iter_fuel_sweep(**INPUTS, models=models, tree_heights=tree_heights)
+
+
+def test_tiled():
+    """Test that two-pass tiled fuel maps match the in-memory result."""
+    for coverage_input in [coverage, np.round(coverage).astype(np.int32)]:
+        inputs = dict(INPUTS, coverage=coverage_input)
+        for tree_height in [2, 7.5, 16]:
+            expected = fuel(
+                **inputs, models=(1, 2, 3), tree_height=tree_height, as_array=True
+            )
+            for tile_size in [5, 13, (7, 40), 512]:
+                result = fuel_tiled(
+                    **inputs,
+                    models=(1, 2, 3),
+                    tree_height=tree_height,
+                    tile_size=tile_size,
+                    as_array=True,
+                )
+                assert np.array_equal(result, expected)
+
+
+def test_tiled_dataset():
+    """Test tiled fuel maps read from and written into rasterio datasets."""
+    alpha = np.full(SIZE, 255, dtype=np.uint8)
+    expected = fuel(**INPUTS, models=(4, 5, 6), tree_height=9, alpha=alpha)
+
+    with MemoryFile() as source, MemoryFile() as target:
+        with source.open(
+            driver="GTiff",
+            count=5,
+            dtype=np.float64,
+            width=SIZE[1],
+            height=SIZE[0],
+        ) as dataset:
+            for band, array in enumerate(INPUTS.values(), start=1):
+                dataset.write(array.astype(np.float64), band)
+        with source.open() as dataset, target.open(
+            driver="GTiff",
+            count=2,
+            dtype=np.uint8,
+            width=SIZE[1],
+            height=SIZE[0],
+        ) as output:
+            bands = {
+                name: DatasetBand(dataset, band)
+                for band, name in enumerate(INPUTS, start=1)
+            }
+            fuel_tiled(
+                **bands,
+                models=(4, 5, 6),
+                tree_height=9,
+                alpha=alpha,
+                tile_size=32,
+                destination=output,
+            )
+            assert np.array_equal(output.read(1), expected.array[:, :, 0])
+            assert np.array_equal(output.read(2), alpha)
+
+    layer = fuel_tiled(
+        **INPUTS, models=(4, 5, 6), tree_height=9, tile_size=32, destination=Layer()
+    )
+    assert np.array_equal(layer.array, expected.array[:, :, 0])
+
+
+def test_tiled_reads():
+    """Test that the reduction pass only reads the inputs it needs."""
+    reads = {name: 0 for name in INPUTS}
+
+    class CountedBand(DatasetBand):
+        def __getitem__(self, key):
+            reads[self.name] += 1
+            return super().__getitem__(key)
+
+    with MemoryFile() as source:
+        with source.open(
+            driver="GTiff",
+            count=5,
+            dtype=np.float64,
+            crs="EPSG:4326",
+            width=SIZE[1],
+            height=SIZE[0],
+        ) as dataset:
+            for band, array in enumerate(INPUTS.values(), start=1):
+                dataset.write(array.astype(np.float64), band)
+        with source.open() as dataset:
+            bands = {}
+            for band, name in enumerate(INPUTS, start=1):
+                bands[name] = CountedBand(dataset, band)
+                bands[name].name = name
+            result = fuel_tiled(
+                **bands, models=(1, 2, 3), tree_height=5, tile_size=32, as_array=True
+            )
+
+    assert np.array_equal(
+        result, fuel(**INPUTS, models=(1, 2, 3), tree_height=5, as_array=True)
+    )
+    tiles = 3 * 3
+    assert reads["water"] == reads["artificial"] == tiles
+    assert reads["coverage"] == reads["height"] == reads["distance"] == 2 * tiles
+
+
+def test_tiled_error():
+    """Test that invalid tiled fuel arguments are rejected."""
+    with pytest.raises(TypeError):
+        fuel_tiled(**INPUTS, models=(1, 2, 3), tree_height=5, tile_size=0)
+    with pytest.raises(TypeError):
+        fuel_tiled(**INPUTS, models=(1, 2), tree_height=5)
+    with pytest.raises(TypeError):
+        fuel_tiled(**INPUTS, models=(1, 2, 3), tree_height="5")
+    with pytest.raises(TypeError):
+        fuel_tiled(**INPUTS, models=(1, 2, 3), tree_height=5, as_array=1)
+    with pytest.raises(TypeError):
+        fuel_tiled(**{name: None for name in INPUTS}, models=(1, 2, 3), tree_height=5)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import spyndex
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.index import index, index_batch
+from rforge.library.tools.cache import disable_cache, enable_cache
+from rforge.library.tools.formulas import compile_formulas
+
+np.random.seed(42)
+
+SIZE = (40, 30)
+
+PARAMETERS = {
+    band: np.random.uniform(0.01, 1, SIZE) for band in ("N", "R", "G", "B", "S1", "S2")
+}
+PARAMETERS.update({"L": 0.5, "g": 2.5, "C1": 6.0, "C2": 7.5})
+
+INDICES = ["NDVI", "NDWI", "SAVI", "EVI", "NBR", "NDMI", "MSAVI", "CVI"]
+
+
+def test_batch():
+    """Test that a batch stacks the same results as separate index computations."""
+    result = index_batch(INDICES, PARAMETERS)
+    assert isinstance(result, Layer)
+    assert result.array.shape == SIZE + (len(INDICES),)
+    for band, index_id in enumerate(INDICES):
+        parameters = {
+            name: PARAMETERS[name] for name in spyndex.indices[index_id].bands
+        }
+        expected = index(index_id, parameters, as_array=True)
+        assert np.array_equal(result.array[:, :, band], expected)
+
+
+def test_shared():
+    """Test that subexpressions shared by the indices are computed once."""
+    formulas = tuple(spyndex.indices[index_id].formula for index_id in INDICES)
+    bands = tuple(sorted(["N", "R", "G", "B", "S1", "S2"]))
+    plan = compile_formulas(formulas, bands)
+    separate = sum(
+        len(compile_formulas((formula,), bands).program) for formula in formulas
+    )
+    assert len(plan.program) < separate
+    assert len([ufunc for ufunc, _, _ in plan.program if ufunc is None]) == 6
+
+
+def test_dict(alpha):
+    """Test that a batch can be returned as a dictionary of results with alpha."""
+    alpha_array = alpha.array if isinstance(alpha, Layer) else alpha
+    alpha_array = None if alpha_array is None else np.resize(alpha_array, SIZE)
+    result = index_batch(
+        ["NDVI", "NBR"], PARAMETERS, alpha=alpha_array, as_dict=True, as_array=True
+    )
+    assert list(result) == ["NDVI", "NBR"]
+    expected = index("NBR", PARAMETERS, alpha=alpha_array, as_array=True)
+    assert np.array_equal(result["NBR"], expected)
+
+    result = index_batch(["NDVI"], PARAMETERS, as_dict=True)
+    assert isinstance(result["NDVI"], Layer)
+
+
+def test_out():
+    """Test that a batch is written into the output array in the requested precision."""
+    alpha = np.full(SIZE, 255.0)
+    out = np.zeros(SIZE + (4,), dtype=np.float32)
+    result = index_batch(
+        ["NDVI", "SAVI", "NDWI"],
+        PARAMETERS,
+        alpha=alpha,
+        out=out,
+        as_array=True,
+        precision="float32",
+    )
+    assert result is out
+    expected = index_batch(["NDVI", "SAVI", "NDWI"], PARAMETERS, as_array=True)
+    assert np.allclose(out[:, :, :3], expected, rtol=1e-5, atol=1e-6)
+    assert np.array_equal(out[:, :, 3], alpha)
+
+
+def test_parameters_untouched():
+    """Test that the parameters of the caller are left untouched, so cache keys hold."""
+    parameters = {"N": Layer(PARAMETERS["N"]), "R": Layer(PARAMETERS["R"])}
+    layers = dict(parameters)
+    cache = enable_cache()
+    try:
+        cache.clear()
+        first = index("NDVI", parameters, as_array=True)
+        assert all(parameters[key] is layers[key] for key in layers)
+        index_batch(["NDVI"], parameters)
+        assert all(parameters[key] is layers[key] for key in layers)
+        second = index("NDVI", parameters, as_array=True)
+        assert cache.stats["hits"] == 1
+        assert np.array_equal(first, second)
+    finally:
+        disable_cache()
+
+
+def test_batch_error():
+    """Test that invalid batches are rejected."""
+    for index_ids in [[], "NDVI", ["NDVI", "AAAA"], [1]]:
+        with pytest.raises(TypeError):
+            index_batch(index_ids, PARAMETERS)
+    with pytest.raises(TypeError):
+        index_batch(["NDVI", "SAVI"], {"N": PARAMETERS["N"], "R": PARAMETERS["R"]})
+    with pytest.raises(TypeError):
+        index_batch(["NDVI"], PARAMETERS, as_dict=1)
+    with pytest.raises(TypeError):
+        index_batch(["NDVI"], PARAMETERS, as_dict=True, out=np.zeros(SIZE + (1,)))
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.distance import distance
+from rforge.library.processes.index import index
+from rforge.library.processes.reclassify import reclassify
+from rforge.library.tools import classification as classification_module
+
+np.random.seed(42)
+
+SIZE = (60, 45)
+
+nir = np.random.uniform(0, 1, SIZE)
+red = np.random.uniform(0, 1, SIZE)
+
+
+def test_reclassify(layer):
+    """Test that class codes match NumPy's digitize."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    breaks = list(np.quantile(array, [0.1, 0.3, 0.5, 0.9]))
+    result = reclassify(layer, breaks, as_array=True)
+    assert result.dtype == np.uint8
+    assert np.array_equal(result, np.digitize(array, breaks))
+
+
+def test_many_breaks():
+    """Test that the comparison and binary search paths give the same codes."""
+    values = np.random.uniform(-10, 10, SIZE)
+    values[0, :3] = np.nan
+    for breaks in [[-1, 0, 1], list(np.linspace(-9, 9, 200))]:
+        expected = np.digitize(values, breaks)
+        expected[0, :3] = 0
+        comparisons = classification_module.COMPARISONS
+        try:
+            for value in (0, 255):
+                classification_module.COMPARISONS = value
+                assert np.array_equal(
+                    reclassify(values, breaks, as_array=True), expected
+                )
+        finally:
+            classification_module.COMPARISONS = comparisons
+
+
+def test_outputs(alpha):
+    """Test class codes with alpha, output buffers and in-place execution."""
+    alpha_array = alpha.array if isinstance(alpha, Layer) else alpha
+    alpha_array = None if alpha_array is None else np.resize(alpha_array, SIZE)
+    expected = np.digitize(nir, [0.25, 0.5])
+    result = reclassify(nir, [0.25, 0.5], alpha=alpha_array, as_array=True)
+    assert np.array_equal(result[:, :, 0] if alpha is not None else result, expected)
+
+    out = np.zeros(SIZE, dtype=np.uint8)
+    assert reclassify(nir, (0.25, 0.5), out=out, as_array=True) is out
+    assert np.array_equal(out, expected)
+
+    layer = Layer(nir.copy())
+    reclassify(layer, [0.25, 0.5], inplace=True)
+    assert np.array_equal(layer.array, expected)
+
+
+def test_index_breaks():
+    """Test that indices are classified in the same pass as their evaluation."""
+    breaks = [-0.5, -0.1, 0, 0.1, 0.5]
+    expected = index("NDVI", {"N": nir, "R": red}, as_array=True)
+    result = index("NDVI", {"N": nir, "R": red}, breaks=breaks, as_array=True)
+    assert result.dtype == np.uint8
+    assert np.array_equal(result, np.digitize(expected, breaks))
+
+    alpha = np.full(SIZE, 255)
+    out = np.zeros(SIZE + (2,), dtype=np.uint8)
+    index("NDVI", {"N": nir, "R": red}, alpha=alpha, breaks=breaks, out=out)
+    assert np.array_equal(out[:, :, 0], np.digitize(expected, breaks))
+    assert np.array_equal(out[:, :, 1], alpha)
+
+
+def test_distance_breaks():
+    """Test that distance fields are classified into distance bands."""
+    layer = (np.random.rand(*SIZE) > 0.97).astype(np.uint8)
+    breaks = [2, 5, 10]
+    expected = distance(layer, thresholds=(0.5, 1), as_array=True)
+    result = distance(layer, thresholds=(0.5, 1), breaks=breaks, as_array=True)
+    assert result.dtype == np.uint8
+    assert np.array_equal(result, np.digitize(expected, breaks))
+
+    ranges = [(0.5, 1), (0, 0.5)]
+    expected = distance(layer, thresholds=ranges, as_array=True)
+    result = distance(layer, thresholds=ranges, breaks=breaks, as_array=True)
+    assert np.array_equal(result, np.digitize(expected, breaks))
+
+
+def test_breaks_error():
+    """Test that invalid breaks are rejected."""
+    for breaks in [[], [1, 1], [2, 1], ["1"], [True], list(range(256)), 5, [np.nan]]:
+        with pytest.raises(TypeError):
+            reclassify(nir, breaks)
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": nir, "R": red}, thresholds=(0, 1), breaks=[0.5])
+    with pytest.raises(TypeError):
+        distance(nir, thresholds=(0, 0.5), labels=True, breaks=[0.5])
+    with pytest.raises(TypeError):
+        reclassify(nir, [0.5], as_array=1)
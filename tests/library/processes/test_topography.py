@@ -3,7 +3,8 @@ import pickle
 
 import numpy as np
 import pytest
-from rforge.library.processes.topography import aspect, slope
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.topography import aspect, slope, terrain
 
 from tests.files.benchmarks.test_data import SLOPE_TEST_DATA, ASPECT_TEST_DATA
 
@@ -121,3 +122,58 @@ def test_as_array_error(layer, angle_units, alpha, as_array_error):
             alpha=alpha,
             as_array=as_array_error[0],
         )
+
+
+def test_terrain(layer, angle_units, alpha):
+    """Test the single-pass terrain features against the slope and aspect maps."""
+    t = terrain(
+        dem=layer,
+        outputs=["slope", "aspect", "roughness"],
+        method="zevenbergen-thorne",
+        units=angle_units,
+        alpha=alpha,
+        as_array=True,
+    )
+    s = slope(dem=layer, units=angle_units, as_array=True)
+
+    assert t.shape[2] == (3 if alpha is None else 4)
+    assert np.allclose(t[1:-1, 1:-1, 0], s[1:-1, 1:-1])
+    assert (t[:, :, 1] >= 0).all() and (t[:, :, 2] >= 0).all()
+    assert np.array_equal(
+        terrain(dem=layer, outputs=["aspect"], units=angle_units, as_array=True),
+        terrain(dem=layer, units=angle_units, as_array=True)[:, :, 1],
+    )
+
+
+def test_terrain_plane():
+    """Test the terrain features of an inclined plane with a known answer."""
+    rows, cols = np.mgrid[0:7, 0:7]
+    dem = Layer(20.0 * cols - 10.0 * rows, transform=(0, 10, 0, 0, 0, -10))
+
+    for method in ["horn", "zevenbergen-thorne"]:
+        t = terrain(
+            dem,
+            outputs=["slope", "aspect", "hillshade", "curvature", "roughness"],
+            method=method,
+            as_array=True,
+        )
+        assert np.allclose(t[3, 3, 0], np.degrees(np.arctan(np.sqrt(5))))
+        assert np.allclose(t[3, 3, 1], np.degrees(np.arctan2(-2, -1)) + 360)
+        assert 0 <= t[3, 3, 2] <= 255
+        assert np.allclose(t[1:-1, 1:-1, 3], 0)
+        assert np.allclose(t[3, 3, 4], 60)
+
+
+def test_terrain_error(layer):
+    """Test terrain feature creation for expected errors."""
+    for kwargs in [
+        {"outputs": []},
+        {"outputs": ["slope", "slope"]},
+        {"outputs": ["height"]},
+        {"method": "sobel"},
+        {"units": "gradians"},
+        {"azimuth": "north"},
+        {"as_array": None},
+    ]:
+        with pytest.raises(TypeError):
+            terrain(dem=layer, **kwargs)
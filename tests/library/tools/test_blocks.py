@@ -0,0 +1,32 @@
+import numpy as np
+from rforge.library.tools import blocks as blocks_module
+from rforge.library.tools.blocks import block_rows, row_blocks
+
+
+def test_row_blocks():
+    """Test that blocks of rows cover an array exactly once."""
+    for shape in [(0, 5), (1, 1), (7, 9), (300, 400), (300, 400, 3)]:
+        coverage = np.zeros(shape[0], dtype=int)
+        blocks = list(row_blocks(shape))
+        for block in blocks:
+            coverage[block] += 1
+            assert 0 < block.stop - block.start <= block_rows(shape)
+        assert (coverage == 1).all()
+        assert all(
+            block.stop - block.start == block_rows(shape) for block in blocks[:-1]
+        )
+
+    assert [block.stop for block in row_blocks((10, 4), 3)] == [3, 6, 9, 10]
+
+
+def test_block_rows():
+    """Test the number of rows of each block against the block size."""
+    block_size = blocks_module.BLOCK_SIZE
+    try:
+        blocks_module.BLOCK_SIZE = 100
+        assert block_rows((50, 10)) == 10
+        assert block_rows((50, 10, 3)) == 3
+        assert block_rows((50, 1000)) == 1
+        assert block_rows((50,)) == 100
+    finally:
+        blocks_module.BLOCK_SIZE = block_size
@@ -0,0 +1,202 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+from rforge.library.processes.distance import distance
+from rforge.library.processes.height import height
+from rforge.library.processes.topography import slope
+from rforge.library.tools.cache import (
+    DiskCache,
+    ResultCache,
+    disable_cache,
+    disable_disk_cache,
+    enable_cache,
+    enable_disk_cache,
+    fingerprint,
+    get_cache,
+)
+
+np.random.seed(42)
+
+
+def test_hits(layer, angle_units):
+    """Test that repeated process calls are served from the cache."""
+    cache = enable_cache()
+    try:
+        cache.clear()
+        first = slope(layer, units=angle_units)
+        second = slope(layer, units=angle_units)
+        assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+        assert first == second
+
+        slope(layer, units="radians" if angle_units == "degrees" else "degrees")
+        assert cache.stats["misses"] == 2
+    finally:
+        disable_cache()
+    assert get_cache() is None
+
+
+def test_read_only(dtm, dsm):
+    """Test that computed results stay writable and cached results are read-only."""
+    cache = enable_cache()
+    try:
+        cache.clear()
+        array = height(dtm, dsm, as_array=True)
+        expected = array.copy()
+        array[0, 0] = expected[0, 0] + 1
+
+        cached = height(dtm, dsm, as_array=True)
+        assert cache.stats["hits"] == 1
+        assert np.array_equal(cached, expected)
+        with pytest.raises(ValueError):
+            cached[0, 0] = 0
+
+        layer = height(dtm, dsm, precision="float32")
+        layer.array[0, 0] = 0
+        cached = height(dtm, dsm, precision="float32")
+        assert cache.stats["hits"] == 2
+        assert cached != layer
+        with pytest.raises(ValueError):
+            cached.array[0, 0] = 0
+        cached.modify()[0, 0] = 0
+        assert height(dtm, dsm, precision="float32") != cached
+    finally:
+        disable_cache()
+
+
+def test_content_key():
+    """Test that cache keys follow the content of the inputs."""
+    array = np.random.rand(7, 7)
+    key = fingerprint("slope", {"dem": array, "units": "degrees"})
+    assert key == fingerprint("slope", {"dem": array.copy(), "units": "degrees"})
+    assert key != fingerprint("slope", {"dem": array + 1, "units": "degrees"})
+    assert key != fingerprint("aspect", {"dem": array, "units": "degrees"})
+    assert key != fingerprint(
+        "slope",
+        {"dem": Layer(array, transform=(0, 2, 0, 0, 0, -2)), "units": "degrees"},
+    )
+    assert fingerprint("slope", {"dem": object()}) is None
+
+
+def test_mask_key():
+    """Test that cache keys follow the mask of the inputs."""
+    array = np.random.rand(7, 7)
+    visible = Layer(array, mask=np.ones((7, 7), dtype=bool))
+    hidden = Layer(array, mask=np.zeros((7, 7), dtype=bool))
+    assert fingerprint("slope", {"dem": visible}) != fingerprint(
+        "slope", {"dem": hidden}
+    )
+    assert fingerprint("slope", {"dem": hidden}) == fingerprint(
+        "slope", {"dem": Layer(array, mask=np.zeros((7, 7), dtype=bool))}
+    )
+
+    cache = enable_cache()
+    try:
+        cache.clear()
+        first = composite([visible], render="RGBA", as_array=True)
+        second = composite([hidden], render="RGBA", as_array=True)
+        assert cache.stats["hits"] == 0
+        assert np.all(first[:, :, 3] == 255) and np.all(second[:, :, 3] == 0)
+    finally:
+        disable_cache()
+
+
+def test_eviction():
+    """Test least-recently-used eviction within the memory budget."""
+    arrays = [np.full((10, 10), value, dtype=np.float64) for value in range(3)]
+    cache = ResultCache(max_bytes=2 * arrays[0].nbytes)
+    cache.put("a", arrays[0])
+    cache.put("b", arrays[1])
+    assert cache.get("a") is not None
+    cache.put("c", arrays[2])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["bytes"] == 2 * arrays[0].nbytes
+
+    cache.max_bytes = 0
+    assert len(cache) == 0
+
+
+def test_disk_hits(tmp_path, layer, thresholds):
+    """Test that results are stored on disk and reused by later runs."""
+    dem = Layer(np.random.rand(7, 7), transform=(0, 2, 0, 0, 0, -2), crs="4326")
+    cache = enable_disk_cache(tmp_path / "cache")
+    try:
+        first = distance(layer, thresholds=thresholds, as_array=True)
+        layer_result = slope(dem)
+        assert cache.stats["misses"] == 2 and len(cache) == 2
+
+        # A New Cache on the Same Directory Simulates a Later Run
+        cache = enable_disk_cache(tmp_path / "cache")
+        assert np.array_equal(
+            distance(layer, thresholds=thresholds, as_array=True), first
+        )
+        assert slope(dem) == layer_result
+        assert cache.stats["hits"] == 2 and cache.stats["misses"] == 0
+
+        cache.clear()
+        assert len(cache) == 0
+    finally:
+        disable_disk_cache()
+
+
+def test_disk_eviction(tmp_path):
+    """Test that the least recently used files are removed to respect the size cap."""
+    cache = DiskCache(tmp_path)
+    arrays = [np.random.rand(20, 20) for _ in range(3)]
+    for key, array in zip("abc", arrays):
+        cache.put(key, array)
+    sizes = cache.stats["bytes"]
+
+    cache.max_bytes = sizes - 1
+    assert cache.get("a") is None
+    assert np.array_equal(cache.get("b"), arrays[1])
+    assert cache.stats["evictions"] == 1
+
+
+def test_disk_mask(tmp_path):
+    """Test that layer masks are stored on disk with the results."""
+    cache = DiskCache(tmp_path)
+    mask = np.random.rand(7, 7) > 0.5
+    cache.put("masked", Layer(np.random.rand(7, 7), mask=mask))
+    cache.put("unmasked", Layer(np.random.rand(7, 7)))
+    assert np.array_equal(cache.get("masked").mask, mask)
+    assert cache.get("unmasked").mask is None
+
+
+def _cached_slope(directory: str, array: np.ndarray) -> np.ndarray:
+    enable_disk_cache(directory)
+    return slope(array, as_array=True)
+
+
+def test_disk_shared(tmp_path):
+    """Test that several processes can share a cache directory."""
+    array = np.random.rand(50, 50)
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_cached_slope, [str(tmp_path)] * 8, [array] * 8))
+
+    expected = slope(array, as_array=True)
+    assert all(np.array_equal(result, expected) for result in results)
+    assert len(DiskCache(tmp_path)) == 1
+
+
+def test_errors(layer, thresholds):
+    """Test the cache for expected errors."""
+    with pytest.raises(TypeError):
+        ResultCache(max_bytes=-1)
+    with pytest.raises(TypeError):
+        enable_cache(max_bytes="1 GB")
+    with pytest.raises(TypeError):
+        DiskCache(None)
+    disable_cache()
+
+    enable_cache()
+    try:
+        with pytest.raises(TypeError):
+            distance(layer, thresholds=thresholds, mask_size=4)
+    finally:
+        disable_cache()
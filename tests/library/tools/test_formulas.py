@@ -0,0 +1,175 @@
+import warnings
+
+import numpy as np
+import pytest
+import spyndex
+from rforge.library.processes.composite import composite
+from rforge.library.processes.index import index, index_batch
+from rforge.library.tools import blocks as blocks_module
+from rforge.library.tools.formulas import compile_formulas, evaluate_formulas
+
+np.random.seed(42)
+
+SIZE = (23, 19)
+
+
+def test_spyndex():
+    """Test that every spyndex index matches spyndex with non-finite values set to 0."""
+    for index_id, spectral_index in spyndex.indices.items():
+        parameters = {
+            band: np.random.uniform(0.01, 1, SIZE) for band in spectral_index.bands
+        }
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            expected = spyndex.computeIndex([index_id], dict(parameters))
+        expected = np.nan_to_num(expected, nan=0.0, posinf=0.0, neginf=0.0)
+        result = index(index_id, parameters, as_array=True)
+        assert np.allclose(result, expected, rtol=1e-9, atol=1e-12), index_id
+
+
+def test_plan():
+    """Test that plans are cached and share repeated subexpressions."""
+    plan = compile_formulas(("(N-R)/(N+R)", "(N-R)/(R+N+L)"), ("N", "R"))
+    assert compile_formulas(("(N-R)/(N+R)", "(N-R)/(R+N+L)"), ("N", "R")) is plan
+    assert plan.bands == ("N", "R")
+    assert plan.scalars == ("L",)
+    assert len(plan.program) == 7
+    assert plan.slots < len(plan.program)
+
+    plan = compile_formulas(("N**2.0+N**0.5+(2*3)",), ("N",))
+    assert [ufunc for ufunc, _, _ in plan.program] == [
+        None,
+        np.square,
+        np.sqrt,
+        np.add,
+        np.add,
+    ]
+
+
+def test_scalars():
+    """Test that scalar parameters are applied and evaluated once per call."""
+    nir = np.random.uniform(0, 1, SIZE)
+    red = np.random.uniform(0, 1, SIZE)
+    result = index("SAVI", {"N": nir, "R": red, "L": 0.5}, as_array=True)
+    expected = (1.0 + 0.5) * (nir - red) / (nir + red + 0.5)
+    assert np.allclose(result, expected)
+
+    plan = compile_formulas(("(1.0+L)*(N-R)/(N+R+L)",), ("N", "R"))
+    assert len(plan.setup) == 1
+
+
+def test_safe_division():
+    """Test that divisions by zero and other non-finite values result in 0."""
+    nir = np.array([[0.0, 1.0, 2.0], [-1.0, 0.0, 3.0]])
+    red = np.array([[0.0, -1.0, 2.0], [1.0, 0.0, 1.0]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = index("NDVI", {"N": nir, "R": red}, as_array=True)
+    assert np.array_equal(result, [[0.0, 0.0, 0.0], [0.0, 0.0, 0.5]])
+
+
+def test_integers():
+    """Test that unsigned integer bands are converted before subtracting."""
+    nir = np.array([[100, 2000]], dtype=np.uint16)
+    red = np.array([[300, 1000]], dtype=np.uint16)
+    result = index("NDVI", {"N": nir, "R": red}, as_array=True)
+    assert result.dtype == np.float64
+    assert np.allclose(result, [[-0.5, 1 / 3]])
+
+
+def test_scaled():
+    """Test that scales and offsets match indices of converted reflectances."""
+    nir = np.random.randint(0, 10000, SIZE).astype(np.uint16)
+    red = np.random.randint(0, 10000, SIZE).astype(np.uint16)
+    scales = {"N": 1e-4, "R": 2e-4}
+    offsets = {"N": -0.1}
+    expected = index(
+        "SAVI", {"N": nir * 1e-4 - 0.1, "R": red * 2e-4, "L": 0.5}, as_array=True
+    )
+    result = index(
+        "SAVI",
+        {"N": nir, "R": red, "L": 0.5},
+        scales=scales,
+        offsets=offsets,
+        as_array=True,
+    )
+    assert result.dtype == np.float64
+    assert np.allclose(result, expected)
+
+    result = index_batch(
+        ["SAVI", "NDVI"],
+        {"N": nir, "R": red, "L": 0.5},
+        scales=scales,
+        offsets=offsets,
+        as_array=True,
+        precision="float32",
+    )
+    assert result.dtype == np.float32
+    assert np.allclose(result[:, :, 0], expected, rtol=1e-5, atol=1e-5)
+
+
+def test_scaled_composite():
+    """Test that composites scale and shift integer layers into floating point."""
+    red = np.random.randint(0, 10000, SIZE).astype(np.uint16)
+    green = np.random.randint(0, 10000, SIZE).astype(np.uint16)
+    result = composite(
+        [red, green], scales=[1e-4, 1e-4], offsets=[0, -0.1], as_array=True
+    )
+    assert result.dtype == np.float64
+    assert np.allclose(result, np.dstack([red * 1e-4, green * 1e-4 - 0.1]))
+
+    result = composite(
+        [red, green], scales=(1e-4, 2e-4), gamma=(0.5, 1), precision="float32"
+    )
+    assert result.array.dtype == np.float32
+    assert np.allclose(
+        result.array, np.dstack([np.sqrt(red * 1e-4), green * 2e-4]), rtol=1e-5
+    )
+    assert composite([red, green], as_array=True).dtype == np.uint16
+
+
+def test_blocks():
+    """Test that the result doesn't depend on the size of the blocks."""
+    parameters = {
+        band: np.random.uniform(0.01, 1, SIZE).astype(np.float32)
+        for band in ("N", "R", "G")
+    }
+    plan = compile_formulas(("(N-R)/(N+R)", "G*N/R**2.0", "2.0"), ("G", "N", "R"))
+    expected = np.empty(SIZE + (3,), np.float32)
+    evaluate_formulas(plan, parameters, expected)
+    assert np.all(expected[:, :, 2] == 2)
+
+    block_size = blocks_module.BLOCK_SIZE
+    try:
+        for value in (1, 19, 50, 10**6):
+            blocks_module.BLOCK_SIZE = value
+            result = np.empty(SIZE + (3,), np.float32)
+            evaluate_formulas(plan, parameters, result)
+            assert np.array_equal(result, expected)
+    finally:
+        blocks_module.BLOCK_SIZE = block_size
+
+
+def test_errors():
+    """Test that invalid formulas, indices and parameters are rejected."""
+    for formula in ["N-", "abs(N)", "N[0]", "N > R", "'N'"]:
+        with pytest.raises(TypeError):
+            compile_formulas((formula,), ("N", "R"))
+
+    nir = np.random.uniform(0, 1, SIZE)
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": nir})
+    with pytest.raises(TypeError):
+        index("SAVI", {"N": nir, "R": nir})
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": 0.5, "R": 0.2})
+    with pytest.raises(TypeError):
+        index("AAAA", {"N": nir, "R": nir})
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": nir, "R": nir}, scales={"G": 1e-4})
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": nir, "R": nir}, offsets=[0.1, 0.1])
+    with pytest.raises(TypeError):
+        composite([nir, nir], scales=[1e-4])
+    with pytest.raises(TypeError):
+        composite([nir, nir], offsets=["0", 1])
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+from rforge.library.processes.distance import distance
+from rforge.library.processes.height import height
+from rforge.library.processes.topography import aspect, slope
+from rforge.library.tools.lazy import compute, defer
+
+np.random.seed(42)
+
+
+def test_chain(dtm, dsm):
+    """Test that a fused chain of processes matches the eager result."""
+    node = defer(aspect)(defer(slope)(defer(height)(dtm, dsm)))
+    assert node.halo == 2
+
+    expected = aspect(slope(height(dtm, dsm)), as_array=True)
+    for tile_size in [1, 3, (2, 5), 512]:
+        assert np.array_equal(
+            node.compute(tile_size=tile_size, as_array=True), expected
+        )
+
+
+def test_barrier(dtm, dsm):
+    """Test that whole-raster processes are evaluated once inside a tiled chain."""
+    difference = defer(height)(dtm, dsm)
+    field = defer(distance)(difference, thresholds=(0, 1))
+    assert field.halo is None
+
+    expected = distance(height(dtm, dsm), thresholds=(0, 1), as_array=True)
+    result, sloped = compute(field, defer(slope)(field), tile_size=3, as_array=True)
+    assert np.array_equal(result, expected)
+    assert np.array_equal(sloped, slope(expected, as_array=True))
+
+
+def test_render_barrier(dtm, dsm):
+    """Test that renders stretched by the data are evaluated over the whole raster."""
+    difference = defer(height)(dtm, dsm)
+    rendered = defer(composite)([difference], render="RGBA")
+    assert rendered.halo is None
+    assert defer(composite)([difference], render="RGBA", stretch=[(0, 1)]).halo == 0
+
+    expected = composite([height(dtm, dsm)], render="RGBA", as_array=True)
+    assert np.array_equal(compute(rendered, tile_size=3, as_array=True), expected)
+
+
+def test_destinations(dtm, dsm):
+    """Test evaluating several outputs into destinations."""
+    expected = height(dtm, dsm, as_array=True)
+    difference = defer(height)(dtm, dsm)
+    array = np.zeros(expected.shape)
+    layer, result = compute(
+        difference,
+        defer(slope)(difference),
+        tile_size=3,
+        destinations=[Layer(), array],
+    )
+    assert np.array_equal(layer.array, expected)
+    assert np.array_equal(result, slope(expected, as_array=True))
+
+
+def test_errors(dtm, dsm):
+    """Test lazy evaluation for expected errors."""
+    with pytest.raises(TypeError):
+        defer("unknown")
+    with pytest.raises(TypeError):
+        defer(height)(dtm, dsm, unknown=True)
+    with pytest.raises(TypeError):
+        defer(height)(dtm, dsm, as_array=True)
+    with pytest.raises(TypeError):
+        compute(dtm)
+    with pytest.raises(TypeError):
+        compute(defer(height)(dtm, dsm), tile_size=0)
+    with pytest.raises(TypeError):
+        compute(defer(height)(dtm, dsm), destinations=[None, None])
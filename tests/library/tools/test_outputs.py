@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+from rforge.library.processes.distance import distance
+from rforge.library.processes.fuel import fuel
+from rforge.library.processes.height import height
+from rforge.library.processes.index import index
+from rforge.library.processes.topography import aspect, slope, terrain
+
+np.random.seed(42)
+
+
+def test_out(layer, alpha):
+    """Test that processes write their results into preallocated destinations."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    for process, kwargs in [
+        (slope, {"dem": layer}),
+        (aspect, {"dem": layer}),
+        (terrain, {"dem": layer, "outputs": ["slope", "roughness"]}),
+        (height, {"dtm": layer, "dsm": array / 2}),
+        (distance, {"layer": layer, "thresholds": (0, array.mean())}),
+        (composite, {"layers": [layer, array], "gamma": (0.5, 2)}),
+        (index, {"index_id": "NDVI", "parameters": {"N": array, "R": array / 3}}),
+    ]:
+        expected = process(**kwargs, alpha=alpha, as_array=True)
+
+        out = np.zeros(expected.shape, dtype=expected.dtype)
+        result = process(**kwargs, alpha=alpha, as_array=True, out=out)
+        assert result is out
+        assert np.array_equal(out, expected)
+
+        out = Layer(np.zeros(expected.shape, dtype=expected.dtype))
+        assert process(**kwargs, alpha=alpha, out=out) is out
+        assert np.array_equal(out.array, expected)
+
+
+def test_fuel_out(coverage, height, distance, water, artificial):
+    """Test that fuel maps are written into preallocated destinations."""
+    kwargs = {
+        "coverage": coverage,
+        "height": height,
+        "distance": distance,
+        "water": water,
+        "artificial": artificial,
+        "models": [1, 2, 3],
+        "tree_height": 5,
+    }
+    expected = fuel(**kwargs, as_array=True)
+
+    out = np.zeros(expected.shape, dtype=np.uint8)
+    assert fuel(**kwargs, as_array=True, out=out) is out
+    assert np.array_equal(out, expected)
+
+
+def test_inplace(dtm, dsm):
+    """Test that in-place execution overwrites the primary input only."""
+    expected = height(dtm, dsm, as_array=True)
+
+    array = np.array(dtm.array if isinstance(dtm, Layer) else dtm, dtype=np.float64)
+    assert height(array, dsm, as_array=True, inplace=True) is array
+    assert np.array_equal(array, expected)
+
+    # Layers Sharing Their Data Are Left Untouched
+    layer = Layer(np.array(array))
+    shared = layer.copy()
+    dem = slope(shared, as_array=True)
+    assert slope(layer, inplace=True) is layer
+    assert np.array_equal(layer.array, dem)
+    assert np.array_equal(shared.array, array)
+
+
+def test_integer_inplace():
+    """Test that results are only written in place into inputs that can hold them."""
+    features = (np.random.rand(20, 30) > 0.9).astype(np.uint8) * 255
+    dem = np.random.randint(0, 100, (20, 30)).astype(np.int32)
+
+    for process, kwargs in [
+        (distance, {"layer": features.copy()}),
+        (slope, {"dem": dem.copy()}),
+        (aspect, {"dem": dem.copy()}),
+        (terrain, {"dem": dem.copy(), "outputs": ["slope"]}),
+    ]:
+        with pytest.raises(TypeError):
+            process(**kwargs, inplace=True)
+    with pytest.raises(TypeError):
+        composite([dem], inplace=True)
+    with pytest.raises(TypeError):
+        composite([dem, dem], gamma=(0.5, 2), out=np.zeros((20, 30, 2), dtype=np.int32))
+
+    # Integer Results Still Fit Integer Inputs
+    expected = distance(features, breaks=[2, 5], as_array=True)
+    array = features.copy()
+    assert distance(array, breaks=[2, 5], inplace=True, as_array=True) is array
+    assert np.array_equal(array, expected)
+    array = dem.copy()
+    assert height(array, dem * 2, inplace=True, as_array=True) is array
+    assert np.array_equal(array, dem)
+
+    out = np.zeros((20, 30, 2), dtype=np.uint16)
+    lookup = composite([dem.astype(np.uint8)] * 2, gamma=(0.5, 2), as_array=True)
+    composite([dem.astype(np.uint8)] * 2, gamma=(0.5, 2), out=out)
+    assert np.array_equal(out, lookup)
+
+
+def test_errors(layer):
+    """Test preallocated destinations for expected errors."""
+    with pytest.raises(TypeError):
+        slope(layer, out=[])
+    with pytest.raises(TypeError):
+        slope(layer, out=np.zeros((3, 3)))
+    with pytest.raises(TypeError):
+        slope(layer, out=np.zeros((7, 7)), inplace=True)
+    with pytest.raises(TypeError):
+        slope(layer, inplace="yes")
+    with pytest.raises(TypeError):
+        slope(layer, out=np.zeros((7, 7), dtype=np.int32))
+
+    read_only = np.zeros((7, 7))
+    read_only.flags.writeable = False
+    with pytest.raises(TypeError):
+        slope(layer, out=read_only)
+
+
+def test_share_mask():
+    """Test that processes hand the mask of their inputs on by reference."""
+    mask = np.random.rand(20, 30) > 0.5
+    nir = Layer(np.random.uniform(0, 1, (20, 30)), mask=mask)
+    red = Layer(np.random.uniform(0, 1, (20, 30)))
+
+    result = index("NDVI", {"N": nir, "R": red})
+    assert result.mask is nir.mask
+    assert result.array.ndim == 2
+    assert composite([red, nir]).mask is nir.mask
+    assert index("NDVI", {"N": red, "R": red}).mask is None
+
+    own = np.ones((20, 30), dtype=np.uint8)
+    out = Layer(np.zeros((20, 30)), mask=own)
+    assert index("NDVI", {"N": nir, "R": red}, out=out).mask is out.mask
+
+    rendered = composite([nir], render="RGBA", as_array=True)
+    assert np.array_equal(rendered[:, :, 3], np.where(mask, 255, 0))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+from rforge.library.processes.height import height
+from rforge.library.processes.index import index
+from rforge.library.processes.topography import aspect, slope, terrain
+from rforge.library.tools.precision import get_precision, set_precision
+from rforge.library.tools.tiling import run_tiled
+
+np.random.seed(42)
+
+rows, columns = np.mgrid[0:64, 0:80]
+dem = Layer(
+    100 + 20 * np.sin(rows / 9.0) * np.cos(columns / 13.0) + rows * 0.5,
+    transform=(0, 10, 0, 0, 0, -10),
+)
+red = np.random.uniform(0.01, 0.3, (64, 80))
+nir = np.random.uniform(0.2, 0.6, (64, 80))
+
+
+def test_float32(layer):
+    """Test that float32 results stay within tolerance of the float64 path."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    for process, kwargs, tolerance in [
+        (slope, {"dem": dem}, 1e-3),
+        (aspect, {"dem": dem}, 1e-3),
+        (terrain, {"dem": dem, "outputs": ["slope", "hillshade", "curvature"]}, 1e-3),
+        (height, {"dtm": layer, "dsm": array * 2}, 1e-5),
+        (composite, {"layers": [red, nir], "gamma": (0.5, 2)}, 1e-5),
+        (index, {"index_id": "NDVI", "parameters": {"N": nir, "R": red}}, 1e-5),
+    ]:
+        expected = process(**kwargs, as_array=True, precision="float64")
+        result = process(**kwargs, as_array=True, precision="float32")
+        assert result.dtype == np.float32
+        assert np.allclose(result, expected, rtol=tolerance, atol=tolerance)
+
+
+def test_alpha(layer, alpha):
+    """Test that the alpha band is stacked in the precision of the computation."""
+    array = layer.array if isinstance(layer, Layer) else layer
+    result = height(layer, array * 2, alpha=alpha, as_array=True, precision="float32")
+    assert result.dtype == np.float32
+    expected = height(layer, array * 2, alpha=alpha, as_array=True, precision="float64")
+    assert np.allclose(result, expected, rtol=1e-5)
+
+
+def test_default():
+    """Test that the native promotion rules apply unless a precision is set."""
+    assert get_precision() is None
+    dtm = np.arange(12).reshape(3, 4)
+    assert height(dtm, dtm * 2, as_array=True).dtype == dtm.dtype
+    assert slope(dem, as_array=True).dtype == np.float64
+
+
+def test_global():
+    """Test that the global precision applies to every call without one."""
+    try:
+        set_precision("float32")
+        assert get_precision() == "float32"
+        assert slope(dem, as_array=True).dtype == np.float32
+        assert slope(dem, as_array=True, precision="float64").dtype == np.float64
+        result = run_tiled(slope, tile_size=16, backend="process", workers=2, dem=dem)
+        assert result.array.dtype == np.float32
+        assert np.array_equal(result.array, slope(dem, as_array=True))
+    finally:
+        set_precision(None)
+    assert slope(dem, as_array=True).dtype == np.float64
+
+
+def test_errors():
+    """Test that invalid precisions are rejected."""
+    with pytest.raises(TypeError):
+        set_precision("float16")
+    with pytest.raises(TypeError):
+        slope(dem, precision="half")
+    with pytest.raises(TypeError):
+        index("NDVI", {"N": nir, "R": red}, precision=32)
+    assert get_precision() is None
@@ -0,0 +1,270 @@
+import numpy as np
+import pytest
+import rasterio
+from rasterio.io import MemoryFile
+from rforge.library.containers.layer import Layer
+from rforge.library.processes.composite import composite
+from rforge.library.processes.distance import distance
+from rforge.library.processes.height import height
+from rforge.library.processes.index import index, index_batch
+from rforge.library.processes.topography import aspect, slope
+from rforge.library.tools.registry import get_process, register_process
+from rforge.library.tools.tiling import DatasetBand, run_tiled, tile_windows
+
+np.random.seed(42)
+
+TILE_SIZES = [1, 3, (2, 5), 7, 512]
+
+
+def test_windows():
+    """Test that tile windows cover the grid exactly once."""
+    for tile_size in TILE_SIZES:
+        coverage = np.zeros((7, 9), dtype=int)
+        for row_off, col_off, rows, columns in tile_windows((7, 9), tile_size):
+            coverage[row_off : row_off + rows, col_off : col_off + columns] += 1
+        assert (coverage == 1).all()
+
+
+def test_topography(layer, angle_units, alpha):
+    """Test tiled slope and aspect map creation against the whole-raster result."""
+    for process in [slope, aspect]:
+        expected = process(dem=layer, units=angle_units, alpha=alpha, as_array=True)
+        for tile_size in TILE_SIZES:
+            result = run_tiled(
+                process,
+                tile_size=tile_size,
+                dem=layer,
+                units=angle_units,
+                alpha=alpha,
+                as_array=True,
+            )
+            assert np.array_equal(result, expected)
+
+
+def test_height(dtm, dsm):
+    """Test tiled height map creation against the whole-raster result."""
+    assert run_tiled("height", tile_size=3, dtm=dtm, dsm=dsm) == height(dtm, dsm)
+
+
+def test_composite(layer_list, alpha):
+    """Test tiled composite creation against the whole-raster result."""
+    gamma = tuple([0.5 + i * 0.25 for i in range(len(layer_list))])
+    assert run_tiled(
+        composite, tile_size=3, layers=layer_list, alpha=alpha, gamma=gamma
+    ) == composite(layer_list, alpha=alpha, gamma=gamma)
+
+
+def test_composite_render():
+    """Test tiled composite renders against the whole-raster result."""
+    layers = [np.random.uniform(0, i + 1, (40, 50)) for i in range(3)]
+    expected = composite(layers, render="RGBA", as_array=True)
+    for backend in ["serial", "thread"]:
+        assert np.array_equal(
+            run_tiled(
+                composite,
+                tile_size=16,
+                backend=backend,
+                layers=layers,
+                render="RGBA",
+                as_array=True,
+            ),
+            expected,
+        )
+
+    stretch = [(0, 1), (0, 2), (0, 3)]
+    assert np.array_equal(
+        run_tiled(
+            composite,
+            tile_size=16,
+            layers=layers,
+            render="BGRA",
+            stretch=stretch,
+            as_array=True,
+        ),
+        composite(layers, render="BGRA", stretch=stretch, as_array=True),
+    )
+
+
+def test_index(index_id, index_parameters):
+    """Test tiled multispectral index creation against the whole-raster result."""
+    assert np.allclose(
+        run_tiled(
+            index,
+            tile_size=3,
+            index_id=index_id,
+            parameters=dict(index_parameters),
+            as_array=True,
+        ),
+        index(index_id, dict(index_parameters), as_array=True),
+    )
+
+
+def test_whole_raster(layer, thresholds):
+    """Test that processes without a halo run as a single tile."""
+    assert np.array_equal(
+        run_tiled(
+            "distance", tile_size=3, layer=layer, thresholds=thresholds, as_array=True
+        ),
+        distance(layer, thresholds=thresholds, as_array=True),
+    )
+
+
+def test_destination(dtm, dsm):
+    """Test stitching into Layer, array and rasterio dataset destinations."""
+    expected = height(dtm, dsm, as_array=True)
+
+    layer = run_tiled(height, tile_size=3, destination=Layer(), dtm=dtm, dsm=dsm)
+    assert np.array_equal(layer.array, expected)
+
+    array = np.zeros(expected.shape, dtype=expected.dtype)
+    run_tiled(height, tile_size=3, destination=array, dtm=dtm, dsm=dsm)
+    assert np.array_equal(array, expected)
+
+    with MemoryFile() as memory_file:
+        with memory_file.open(
+            driver="GTiff",
+            count=1,
+            dtype=expected.dtype,
+            width=expected.shape[1],
+            height=expected.shape[0],
+        ) as dataset:
+            for backend in ["serial", "thread"]:
+                run_tiled(
+                    height,
+                    tile_size=3,
+                    destination=dataset,
+                    backend=backend,
+                    dtm=dtm,
+                    dsm=dsm,
+                )
+                assert np.array_equal(dataset.read(1), expected)
+
+
+def test_dataset_band():
+    """Test tiled processing of bands read window by window from a dataset."""
+    path = "tests/files/sample/ADSM_1.tif"
+    with rasterio.open(path) as dataset:
+        band = DatasetBand(dataset, 1)
+        result = run_tiled(slope, tile_size=16, dem=band, as_array=True)
+        assert np.array_equal(
+            run_tiled(slope, tile_size=16, backend="thread", dem=band, as_array=True),
+            result,
+        )
+        assert np.array_equal(
+            run_tiled(
+                slope,
+                tile_size=16,
+                backend="process",
+                workers=2,
+                dem=band,
+                as_array=True,
+            ),
+            result,
+        )
+
+    layer = Layer()
+    layer.import_layer(path, 1)
+    assert np.allclose(result, slope(layer, as_array=True))
+
+
+def test_process_backend(layer, alpha):
+    """Test tiled execution in worker processes against the serial result."""
+    assert np.array_equal(
+        run_tiled(
+            slope,
+            tile_size=3,
+            backend="process",
+            workers=2,
+            dem=layer,
+            alpha=alpha,
+            as_array=True,
+        ),
+        slope(layer, alpha=alpha, as_array=True),
+    )
+
+
+def test_process_mask():
+    """Test that layer masks reach the worker processes."""
+    layers = [np.random.uniform(0, 1, (30, 40)) for _ in range(3)]
+    mask = np.random.rand(30, 40) > 0.5
+    layers[0] = Layer(layers[0], mask=mask)
+    result = run_tiled(
+        composite,
+        tile_size=8,
+        backend="process",
+        workers=2,
+        layers=layers,
+        render="RGBA",
+        stretch=[(0, 1)] * 3,
+        as_array=True,
+    )
+    assert np.array_equal(result[:, :, 3], np.where(mask, 255, 0))
+
+
+def test_thread_backend(layer, alpha):
+    """Test tiled execution in worker threads against the serial result."""
+    for backend in ["thread", "auto"]:
+        assert np.array_equal(
+            run_tiled(
+                aspect,
+                tile_size=(2, 3),
+                backend=backend,
+                workers=4,
+                dem=layer,
+                alpha=alpha,
+                as_array=True,
+            ),
+            aspect(layer, alpha=alpha, as_array=True),
+        )
+
+
+def test_process_destination(dtm, dsm, tmp_path):
+    """Test stitching tiles computed in worker processes into a destination."""
+    expected = height(dtm, dsm, as_array=True)
+    array = np.zeros(expected.shape, dtype=expected.dtype)
+    mapped = np.memmap(
+        tmp_path / "height.dat", dtype=expected.dtype, mode="w+", shape=expected.shape
+    )
+    for destination, values in [
+        (array, array),
+        (mapped, mapped),
+        (Layer(mapped), mapped),
+    ]:
+        run_tiled(
+            height,
+            tile_size=(2, 5),
+            destination=destination,
+            backend="process",
+            workers=2,
+            dtm=dtm,
+            dsm=dsm,
+        )
+        assert np.array_equal(values, expected)
+        mapped[:] = 0
+
+
+def test_errors(layer):
+    """Test tiled execution for expected errors."""
+    with pytest.raises(TypeError):
+        run_tiled("unknown", dem=layer)
+    with pytest.raises(TypeError):
+        run_tiled(slope, tile_size=0, dem=layer)
+    with pytest.raises(TypeError):
+        run_tiled(height, dtm=layer, dsm=np.zeros((3, 3)))
+    with pytest.raises(TypeError):
+        run_tiled(slope, backend="cluster", dem=layer)
+    with pytest.raises(TypeError):
+        run_tiled(slope, backend="process", workers=0, dem=layer)
+
+
+def test_auto_backend():
+    """Test that the automatic backend prefers threads for GIL-releasing processes."""
+    for process in [slope, index, index_batch]:
+        assert get_process(process)["releases_gil"]
+
+    # Processes Looping in Python Keep the GIL and Run in Worker Processes
+    def python_loop(layer, as_array=False):
+        return layer
+
+    register_process(name="python_loop")(python_loop)
+    assert not get_process("python_loop")["releases_gil"]